@@ -0,0 +1,139 @@
+"""
+Created on Oct 18, 2026
+
+Runs the decision and minimization procedure over a whole directory of
+problem instance files, spreading the instances across a pool of worker
+processes.
+"""
+import os, signal, time, shutil, tempfile
+import multiprocessing
+from multiprocessing.connection import wait
+from reuseableCode import parseTypeRange, probeTempDir
+
+class batchScheduler(object):
+    '''
+    Each instance file is minimized by its own driverObj in a separate worker
+    process, which is made the leader of a new process group so that a
+    timeout can kill it together with any Enfragmo runs it has spawned.
+
+    Instances are started longest-expected-first, so that the slowest
+    instances do not end up alone at the tail of the batch. The expected
+    cost is estimated either by the size of the instance file or by the
+    number of subformulas declared on its first line.
+
+    Each job writes the instance files of its probes to a directory of its
+    own (on tmpfs where there is one), which is removed once the job is
+    reaped. A worker killed on timeout never gets to remove the files of
+    the probes it had open, so they go with the directory.
+    '''
+
+    def __init__(self, driverArgs, numWorkers=1, instanceTimeout=0, orderBy='size'):
+        '''
+        driverArgs holds the keyword arguments shared by every driverObj of the
+        batch (mainDir, theoryFileDir, theoryFileName, ...); the per-instance
+        directories and file names are filled in for each job. A timeout of 0
+        lets every instance run to completion.
+        '''
+        self.driverArgs = driverArgs
+        self.numWorkers = max(1, numWorkers)
+        self.instanceTimeout = instanceTimeout
+        self.orderBy = orderBy
+        self.jobs = []
+        self.results = []
+
+    def addInstanceDirectory(self, instanceFileDir, EnfragmoOutputDir):
+        '''
+        Adds a job for every instance file under the directory, each known
+        in the results by its path relative to the directory.
+        '''
+        for dirName, subdirList, fileList in os.walk(instanceFileDir, topdown=False):
+            for instanceFileName in fileList:
+                if instanceFileName.endswith('.I'):
+                    relativePath = os.path.relpath(os.path.join(dirName, instanceFileName), instanceFileDir)
+                    self.jobs.append((dirName+'/', instanceFileName, EnfragmoOutputDir+dirName.split('/')[-1]+'/', relativePath))
+
+    def expectedCost(self, job):
+        instanceFilePath = job[0]+job[1]
+        if self.orderBy == 'subformulas':
+            with open(instanceFilePath) as f:
+                return parseTypeRange(f.readline()) or 0
+        elif self.orderBy == 'size':
+            return os.path.getsize(instanceFilePath)
+        return 0
+
+    def run(self):
+        '''
+        Runs every job, keeping at most numWorkers of them alive at once, and
+        returns the list of (instance, minimal worlds, wall time, status)
+        records in completion order.
+        '''
+        pending = sorted(self.jobs, key=self.expectedCost, reverse=True)
+        pending.reverse()  # pop() from the end hands out the most expensive job first
+        running = {}  # sentinel -> (process, connection, job, start time)
+
+        while pending or running:
+            while pending and len(running) < self.numWorkers:
+                job = pending.pop()
+                print("\n\n Processing "+job[3]+"\n_______\n")
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                probeDir = tempfile.mkdtemp(prefix='batchJob-', dir=probeTempDir)
+                process = multiprocessing.Process(target=runInstance, args=(dict(self.driverArgs, probeDir=probeDir), job, sender))
+                process.start()
+                sender.close()
+                running[process.sentinel] = (process, receiver, job, time.time(), probeDir)
+
+            for sentinel in wait(list(running), timeout=self.timeUntilNextDeadline(running)):
+                process, receiver, job, startTime, probeDir = running.pop(sentinel)
+                process.join()
+                if receiver.poll():
+                    self.results.append(receiver.recv())
+                else:
+                    self.results.append((job[3], None, time.time()-startTime, 'failed (exit code '+str(process.exitcode)+')'))
+                receiver.close()
+                shutil.rmtree(probeDir, ignore_errors=True)
+
+            if self.instanceTimeout:
+                now = time.time()
+                for sentinel, (process, receiver, job, startTime, probeDir) in list(running.items()):
+                    if now-startTime >= self.instanceTimeout:
+                        try:
+                            os.killpg(process.pid, signal.SIGKILL)
+                        except ProcessLookupError:  # worker has not become a group leader yet
+                            process.kill()
+                        process.join()
+                        receiver.close()
+                        shutil.rmtree(probeDir, ignore_errors=True)
+                        del running[sentinel]
+                        self.results.append((job[3], None, now-startTime, 'timeout'))
+
+        return self.results
+
+    def timeUntilNextDeadline(self, running):
+        if not self.instanceTimeout:
+            return None
+        now = time.time()
+        return max(0, min(startTime+self.instanceTimeout-now for (process, receiver, job, startTime, probeDir) in running.values()))
+
+    def printSummary(self):
+        nameWidth = max([len('Instance')]+[len(result[0]) for result in self.results])
+        print("\n"+'Instance'.ljust(nameWidth)+"  Minimal worlds  Wall time (s)  Status")
+        print('-'*(nameWidth+46))
+        for name, minimalWorlds, wallTime, status in sorted(self.results, key=lambda result: result[0]):
+            print(name.ljust(nameWidth)+"  "+str('-' if minimalWorlds is None else minimalWorlds).rjust(14)+"  "+("%.2f" % wallTime).rjust(13)+"  "+status)
+
+
+def runInstance(driverArgs, job, connection):
+    '''
+    Body of a worker process: minimizes a single instance file and reports
+    (instance, minimal worlds, wall time, status) back through the connection,
+    the instance given by its path relative to the batch directory.
+    '''
+    from driverObj import driverObj  # driverObj imports this module for its main
+    os.setpgrp()
+    instanceFileDir, instanceFileName, EnfragmoOutputDir, relativePath = job
+    startTime = time.time()
+    driverForFormula = driverObj(instanceFileDir=instanceFileDir, instanceFileName=instanceFileName, EnfragmoOutputDir=EnfragmoOutputDir, EnfragmoOutputFileName=instanceFileName.split('.')[0]+'Out.txt', **driverArgs)
+    minimalWorlds = driverForFormula.runAndMinimizeModel()
+    status = 'SAT' if minimalWorlds is not None else 'no model'
+    connection.send((relativePath, minimalWorlds, time.time()-startTime, status))
+    connection.close()
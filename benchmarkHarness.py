@@ -0,0 +1,254 @@
+"""
+Created on Oct 18, 2026
+
+Runs families of Logic Work Bench formulas through the whole suite, from
+conversion to the minimal model, recording how long each phase takes.
+"""
+import os, sys, json, time, shlex, subprocess, platform
+import plac
+from formulaConversion import formulaConversion
+from driverObj import driverObj
+
+class benchmarkHarness(object):
+    '''
+    For each LWB family (k_branch, k_d4, k_dum, ...) every benchmark file of
+    the family found in the LWB directory is rewritten by formulaConversion,
+    and a problem instance file is generated for each of its formulas, by
+    the instanceGenerator or, if a parser command is given, by piping the
+    rewritten formula through that command. Every instance file of the family
+    is then minimized by a driverObj, timing each phase:
+        convert   rewriting the LWB file with formulaConversion
+        generate  producing the instance files
+        setup     constructing the driver (reading the instance, parsing the
+                  formula, estimating its bounds)
+        search    the world-count search, including drawing the final model
+        solver    the part of the search spent in the solver itself, of
+                  which unsatSolver is the part spent on probes with no model
+    along with the number of probes, the number of subformulas (the size of
+    the Subformula type the solver grounds over) and the minimal number of
+    worlds.
+
+    Results are written to a JSON file, which may later serve as the baseline
+    of a comparison.
+    '''
+
+    def __init__(self, mainDir, lwbDir, theoryFileDir, theoryFileName, driverArgs, parserCommand='', maxFormulas=0, numWorkers=1, shareSubformulas=True, simplify=True):
+        '''
+        driverArgs holds the keyword arguments given to every driverObj
+        (solverPath, searchStrategy, cacheFilePath, ...). A maxFormulas of 0
+        converts every formula of a file; LWB files hold 21 formulas of
+        increasing difficulty. Unless shareSubformulas is False, the generated
+        instances share structurally identical subformulas, and unless
+        simplify is False they are generated from the simplified formulas.
+        '''
+        self.mainDir = mainDir
+        self.lwbDir = lwbDir
+        self.theoryFileDir = theoryFileDir
+        self.theoryFileName = theoryFileName
+        self.driverArgs = driverArgs
+        self.parserCommand = parserCommand
+        self.maxFormulas = maxFormulas
+        self.numWorkers = numWorkers
+        self.shareSubformulas = shareSubformulas
+        self.simplify = simplify
+        self.results = {}
+
+    def familyDirs(self, family):
+        instanceFileDir = self.mainDir+'Instance Files/LWB/'+family+'/'
+        EnfragmoOutputDir = self.mainDir+'Output/LWB/'+family+'/'
+        return instanceFileDir, EnfragmoOutputDir
+
+    def convertFamily(self, family):
+        '''
+        Rewrites every LWB file of the family, and generates instance files
+        from the rewritten formulas. Returns the time spent on each of the two.
+        '''
+        instanceFileDir, EnfragmoOutputDir = self.familyDirs(family)
+        convertTime = generateTime = 0.0
+        for fileName in sorted(os.listdir(self.lwbDir)):
+            if not fileName.startswith(family) or os.path.isdir(self.lwbDir+fileName):
+                continue
+            startTime = time.time()
+            conversion = formulaConversion(self.lwbDir+fileName, fileName, instanceFileDir+'ModifiedFormulas/')
+            conversion.readBenchmarkFile()
+            conversion.parseBenchmarkFile()
+            if not os.path.exists(conversion.outputDir):
+                os.makedirs(conversion.outputDir)
+            conversion.printNewBenchmarkFile()
+            convertTime += time.time()-startTime
+
+            startTime = time.time()
+            if self.parserCommand != '':
+                formulas = conversion.benchmarkFileLines
+                if self.maxFormulas:
+                    formulas = formulas[:self.maxFormulas]
+                for k, formula in enumerate(formulas, 1):
+                    instance = subprocess.run(shlex.split(self.parserCommand), input=formula.strip()+'\n', stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+                    with open(instanceFileDir+fileName.split('.')[0]+'-'+str(k)+'.I', 'w') as instanceFile:
+                        instanceFile.write(instance)
+            else:
+                conversion.outputDir = instanceFileDir
+                conversion.printInstanceFiles(self.numWorkers, self.maxFormulas, self.shareSubformulas, self.simplify)
+            generateTime += time.time()-startTime
+        return convertTime, generateTime
+
+    def runFamily(self, family, convert=True):
+        '''
+        Minimizes every instance file of the family, first generating them
+        unless convert is False, in which case those of an earlier run are
+        used again.
+        '''
+        convertTime, generateTime = self.convertFamily(family) if convert else (0.0, 0.0)
+        instanceFileDir, EnfragmoOutputDir = self.familyDirs(family)
+        familyResults = self.results.setdefault(family, {})
+        instanceFileNames = sorted(name for name in os.listdir(instanceFileDir) if name.endswith('.I')) if os.path.isdir(instanceFileDir) else []
+        for instanceFileName in instanceFileNames:
+            print("\n\n Benchmarking "+family+"/"+instanceFileName+"\n_______\n")
+            startTime = time.time()
+            driverForFormula = driverObj(mainDir=self.mainDir, theoryFileDir=self.theoryFileDir, theoryFileName=self.theoryFileName, instanceFileDir=instanceFileDir, instanceFileName=instanceFileName, EnfragmoOutputDir=EnfragmoOutputDir, EnfragmoOutputFileName=instanceFileName.split('.')[0]+'Out.txt', optionalConditionsFileName='', startingNumWorlds=1, **self.driverArgs)
+            setupTime = time.time()-startTime
+            startTime = time.time()
+            minimalWorlds = driverForFormula.runAndMinimizeModel()
+            searchTime = time.time()-startTime
+            familyResults[instanceFileName] = {
+                'minimalWorlds': minimalWorlds,
+                'subformulas': driverForFormula.instanceVerifier().numTreeNodes,
+                'probes': len(driverForFormula.probeLog),
+                'cachedProbes': sum(1 for probe in driverForFormula.probeLog if probe[3]),
+                'phases': {
+                    'setup': setupTime,
+                    'search': searchTime,
+                    'solver': sum(probe[2] for probe in driverForFormula.probeLog),
+                    'unsatSolver': sum(probe[2] for probe in driverForFormula.probeLog if not probe[1]),
+                }
+            }
+        familyResults['_family'] = {'phases': {'convert': convertTime, 'generate': generateTime}}
+
+    def run(self, families, convert=True):
+        for family in families:
+            self.runFamily(family, convert)
+        return self.results
+
+    def writeResults(self, outputFilePath):
+        if not os.path.exists(os.path.dirname(outputFilePath)):
+            os.makedirs(os.path.dirname(outputFilePath))
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'theory': self.theoryFileName,
+            'driverArgs': dict((key, value) for key, value in self.driverArgs.items() if isinstance(value, (str, int, float, bool))),
+            'shareSubformulas': self.shareSubformulas,
+            'simplify': self.simplify,
+            'results': self.results,
+        }
+        with open(outputFilePath, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1, sort_keys=True)
+
+
+def compareResults(baseline, current, tolerance=0.2, noiseFloor=0.05):
+    '''
+    Compares two results dictionaries as written by benchmarkHarness, phase
+    by phase for every instance present in both. A phase is flagged as a
+    slowdown when it took more than (1+tolerance) times its baseline time,
+    and at least noiseFloor seconds longer; a change of minimal world count
+    is always flagged, since it means one of the two runs is wrong.
+
+    Returns the list of (family, instance, what, baseline, current) flags.
+    '''
+    flags = []
+    for family in sorted(set(baseline) & set(current)):
+        for instance in sorted(set(baseline[family]) & set(current[family])):
+            before, after = baseline[family][instance], current[family][instance]
+            if before.get('minimalWorlds') != after.get('minimalWorlds'):
+                flags.append((family, instance, 'minimalWorlds', before.get('minimalWorlds'), after.get('minimalWorlds')))
+            for phase in sorted(set(before['phases']) & set(after['phases'])):
+                beforeTime, afterTime = before['phases'][phase], after['phases'][phase]
+                if afterTime > beforeTime*(1+tolerance) and afterTime-beforeTime >= noiseFloor:
+                    flags.append((family, instance, phase, beforeTime, afterTime))
+    return flags
+
+
+def printSpeedups(baseline, current, phase='unsatSolver'):
+    '''
+    Prints the time each instance spent in the given phase in both runs, and
+    how many times faster the current run was, with the totals over all
+    instances present in both.
+    '''
+    print("\n"+"Family/instance".ljust(40)+"  "+"Baseline".rjust(10)+"  "+"Current".rjust(10)+"  "+"Speedup".rjust(8))
+    print('-'*74)
+    totals = [0.0, 0.0]
+    for family in sorted(set(baseline) & set(current)):
+        for instance in sorted(set(baseline[family]) & set(current[family])):
+            if phase not in baseline[family][instance]['phases']:
+                continue
+            before, after = baseline[family][instance]['phases'][phase], current[family][instance]['phases'][phase]
+            totals[0] += before
+            totals[1] += after
+            print((family+'/'+instance).ljust(40)+"  "+("%.3f" % before).rjust(10)+"  "+("%.3f" % after).rjust(10)+"  "+(("%.2fx" % (before/after)) if after > 0 else '-').rjust(8))
+    print('-'*74)
+    print("Total".ljust(40)+"  "+("%.3f" % totals[0]).rjust(10)+"  "+("%.3f" % totals[1]).rjust(10)+"  "+(("%.2fx" % (totals[0]/totals[1])) if totals[1] > 0 else '-').rjust(8))
+
+
+def printComparison(flags):
+    if not flags:
+        print("\nNo slowdowns against the baseline.\n")
+        return
+    print("\n"+"Family/instance".ljust(40)+"  "+"Phase".ljust(14)+"  "+"Baseline".rjust(10)+"  "+"Current".rjust(10))
+    print('-'*82)
+    for family, instance, what, before, after in flags:
+        if what == 'minimalWorlds':
+            print((family+'/'+instance).ljust(40)+"  "+"MINIMUM".ljust(14)+"  "+str(before).rjust(10)+"  "+str(after).rjust(10))
+        else:
+            print((family+'/'+instance).ljust(40)+"  "+what.ljust(14)+"  "+("%.3f" % before).rjust(10)+"  "+("%.3f" % after).rjust(10))
+
+
+'''
+Testing
+'''
+@plac.annotations(
+    families=("comma-separated LWB families to run", 'option', None, str),
+    lwbDir=("directory holding the LWB benchmark files, relative to mainDir", 'option', None, str),
+    parserCommand=("external command reading a rewritten formula on stdin and printing its instance file, in place of the built-in generator", 'option', None, str),
+    numWorkers=("processes generating instance files", 'option', None, int),
+    treeInstances=("give every occurrence of a subformula its own number, rather than sharing identical subformulas", 'flag', None),
+    noSimplify=("generate instances from the formulas as written", 'flag', None),
+    maxFormulas=("formulas per LWB file to generate instances for; 0 for all", 'option', None, int),
+    solverPath=("stand-in for the Enfragmo binary, for offline runs", 'option', None, str),
+    searchStrategy=("order in which world counts are probed", 'option', None, str, ['doubling', 'linear', 'galloping', 'costWeighted']),
+    backend=("answer probes by running Enfragmo, or in process by incremental SAT", 'option', None, str, ['enfragmo', 'incremental']),
+    symmetryBreaking=("number the worlds of every model in breadth-first order", 'flag', None),
+    compareSymmetryBreaking=("run every instance without and then with symmetry breaking, reporting the speedup of the probes with no model and any change of minimal world count", 'flag', None),
+    useCache=("let probes be answered by the result cache, which distorts the timings", 'flag', None),
+    outputFile=("where to write the JSON results, relative to mainDir", 'option', None, str),
+    baselineFile=("JSON results of an earlier run to compare against", 'option', None, str),
+    tolerance=("relative slowdown of a phase tolerated before it is flagged", 'option', None, float))
+def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/', families='k_branch,k_d4,k_dum', lwbDir='LWB/', theoryFileDir='Single Modality/', theoryFileName='MLDecisionProcK.T', parserCommand='', numWorkers=1, treeInstances=False, noSimplify=False, maxFormulas=3, solverPath='', searchStrategy='doubling', backend='enfragmo', symmetryBreaking=False, compareSymmetryBreaking=False, useCache=False, outputFile='Output/benchmark.json', baselineFile='', tolerance=0.2):
+    "Benchmark the decision and minimization procedure over families of LWB formulas."
+    driverArgs = dict(solverPath=solverPath, searchStrategy=searchStrategy, backend=backend, symmetryBreaking=symmetryBreaking and not compareSymmetryBreaking, cacheFilePath=mainDir+'Output/probeCache.sqlite' if useCache else '', renderPolicy='none')
+    families = [family.strip() for family in families.split(',') if family.strip() != '']
+    harness = benchmarkHarness(mainDir, mainDir+lwbDir, mainDir+'Theory Files/'+theoryFileDir, theoryFileName, driverArgs, parserCommand, maxFormulas, numWorkers, not treeInstances, not noSimplify)
+    harness.run(families)
+    harness.writeResults(mainDir+outputFile)
+
+    if compareSymmetryBreaking:
+        breakingArgs = dict(driverArgs, symmetryBreaking=True)
+        breaking = benchmarkHarness(mainDir, mainDir+lwbDir, mainDir+'Theory Files/'+theoryFileDir, theoryFileName, breakingArgs, parserCommand, maxFormulas, numWorkers, not treeInstances, not noSimplify)
+        breaking.run(families, convert=False)
+        breaking.writeResults(mainDir+outputFile.rsplit('.', 1)[0]+'-symmetryBreaking.json')
+        printSpeedups(harness.results, breaking.results, 'unsatSolver')
+        flags = [flag for flag in compareResults(harness.results, breaking.results) if flag[2] == 'minimalWorlds']
+        if flags:
+            printComparison(flags)
+            sys.exit(1)
+        print("\nSymmetry breaking left every minimal world count unchanged.\n")
+
+    if baselineFile != '':
+        with open(mainDir+baselineFile) as f:
+            baseline = json.load(f)['results']
+        flags = compareResults(baseline, harness.results, tolerance)
+        printComparison(flags)
+        if flags:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    plac.call(main)
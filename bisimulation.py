@@ -0,0 +1,189 @@
+"""
+Created on Oct 18, 2026
+
+Contracts a Kripke structure to the bisimulation quotient of the part of it
+which can be reached from a given world.
+"""
+import plac
+from array import array
+from kripkeModelConstructor import kripkeModelConstructor, KripkeStructure
+from modelChecker import modelChecker
+
+class bisimulation(object):
+    '''
+    Two worlds are bisimilar when they agree on every atom and each can match
+    the other's moves along the accessibility relation; bisimilar worlds make
+    exactly the same modal formulas true. The coarsest bisimulation is found
+    by partition refinement: starting from the worlds grouped by the atoms
+    true at them, every block B is used as a splitter, cutting each block in
+    two according to whether its worlds can access some world of B, until no
+    block can be cut any more. Both halves of a cut block go back on the
+    worklist as splitters.
+
+    Worlds and blocks are bitsets in the manner of the KripkeStructure, so
+    the worlds which can access a block take one mask test per world.
+
+    Since the worlds reachable from a world form a generated submodel, and
+    bisimilarity within a generated submodel is bisimilarity in the whole
+    structure, the partition is computed once and then restricted to whatever
+    is reachable from the root in question.
+    '''
+
+    def __init__(self, KM):
+        '''
+        Receives the KripkeStructure to be contracted.
+        '''
+        self.KM = KM
+        self.numWorlds = KM.numWorlds
+        self.successors = KM.successors
+        self.partition = None
+
+    def reachableFrom(self, world):
+        '''
+        Returns the bitset of worlds reachable from the given world (world k
+        is bit k-1), including the world itself.
+        '''
+        reached = 1 << (world-1)
+        frontier = reached
+        while frontier:
+            nextFrontier = 0
+            while frontier:
+                lowest = frontier & -frontier
+                nextFrontier |= self.successors[lowest.bit_length()-1]
+                frontier ^= lowest
+            frontier = nextFrontier & ~reached
+            reached |= frontier
+        return reached
+
+    def canAccess(self, block):
+        worlds = 0
+        for k, successors in enumerate(self.successors):
+            if successors & block:
+                worlds |= 1 << k
+        return worlds
+
+    def coarsestPartition(self):
+        '''
+        Returns the blocks of the coarsest bisimulation of the whole structure,
+        as a list of world bitsets.
+        '''
+        if self.partition is not None:
+            return self.partition
+
+        blocksByAtoms = {}
+        for k, atoms in enumerate(self.KM.worldAtoms):
+            blocksByAtoms[atoms] = blocksByAtoms.get(atoms, 0) | 1 << k
+        blocks = set(blocksByAtoms.values())
+        splitters = list(blocks)
+
+        while splitters:
+            splitter = splitters.pop()
+            if splitter not in blocks:  # cut since it was put on the worklist; its halves are there instead
+                continue
+            predecessors = self.canAccess(splitter)
+            for block in list(blocks):
+                inside = block & predecessors
+                if inside and inside != block:
+                    blocks.remove(block)
+                    blocks.add(inside)
+                    blocks.add(block ^ inside)
+                    splitters.append(inside)
+                    splitters.append(block ^ inside)
+
+        self.partition = sorted(blocks, key=lambda block: block & -block)
+        return self.partition
+
+    def quotientBlocks(self, root):
+        '''
+        The blocks of the quotient generated by root, with the block of root
+        first and the others in order of their lowest world.
+        '''
+        reachable = self.reachableFrom(root)
+        rootBit = 1 << (root-1)
+        blocks = [block for block in self.coarsestPartition() if block & reachable]
+        blocks.sort(key=lambda block: (not block & rootBit, block & -block))
+        return blocks
+
+    def quotientSize(self, root):
+        reachable = self.reachableFrom(root)
+        return sum(1 for block in self.coarsestPartition() if block & reachable)
+
+    def smallestQuotient(self, roots):
+        '''
+        Receives a bitset of candidate roots, e.g. the worlds at which a formula
+        holds, and returns (root, quotient size) for the root generating the
+        smallest quotient, or None if there are no candidates.
+        '''
+        best = None
+        for k in range(self.numWorlds):
+            if roots >> k & 1:
+                size = self.quotientSize(k+1)
+                if best is None or size < best[1]:
+                    best = (k+1, size)
+        return best
+
+    def quotient(self, root):
+        '''
+        Builds the contracted structure as a new KripkeStructure, in which root
+        becomes world 1. Each world of the quotient takes its atoms, and the
+        subformulas Enfragmo made true, from the lowest world of its block.
+        '''
+        blocks = self.quotientBlocks(root)
+        blockOf = {}
+        for j, block in enumerate(blocks):
+            while block:
+                lowest = block & -block
+                blockOf[lowest.bit_length()-1] = j
+                block ^= lowest
+        representatives = [(block & -block).bit_length()-1 for block in blocks]
+
+        contracted = KripkeStructure()
+        contracted.numWorlds = len(blocks)
+        contracted.atomLabels = list(self.KM.atomLabels)
+        contracted.worldAtoms = [self.KM.worldAtoms[k] for k in representatives]
+        contracted.successors = [0]*len(blocks)
+        accessible = array('i')
+        for j, k in enumerate(representatives):
+            successors = self.successors[k]
+            while successors:
+                lowest = successors & -successors
+                contracted.successors[j] |= 1 << blockOf[lowest.bit_length()-1]
+                successors ^= lowest
+            for i in range(len(blocks)):
+                if contracted.successors[j] >> i & 1:
+                    accessible.extend((j+1, i+1))
+
+        valuation = array('i')
+        for subformula, worlds in sorted(self.KM.subformulaWorlds.items()):
+            for j, k in enumerate(representatives):
+                if worlds >> k & 1:
+                    contracted.subformulaWorlds[subformula] = contracted.subformulaWorlds.get(subformula, 0) | 1 << j
+                    valuation.extend((subformula, j+1))
+        contracted.setValuation(valuation)
+        contracted.setAccessible(accessible)
+        return contracted
+
+'''
+Testing
+'''
+def main(instanceFileDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Instance Files/EnfragTests/FalsumTests/', EnfragmoOutputDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Output/FalsumTests/', instanceFileName='falsumTesterDiaBox.I'):
+    EnfragmoOutputFileName = instanceFileName.split('.')[0]+"Out"
+    ModelOutputDir = EnfragmoOutputDir+"Kripke Models/"
+    thing = kripkeModelConstructor(instanceFileDir+instanceFileName, instanceFileName, EnfragmoOutputDir+EnfragmoOutputFileName+'.txt', EnfragmoOutputFileName, ModelOutputDir)
+
+    if thing.readEnfragmoOutput():
+        thing.parseEnfragmoOutput()
+        thing.parseInstanceFile()
+        formulaWorlds = modelChecker(thing.KM, thing.verifierObject).checkFormulas([thing.verifierObject])[0]
+        contraction = bisimulation(thing.KM)
+        best = contraction.smallestQuotient(formulaWorlds)
+        if best is None:
+            print("The formula holds at none of the worlds of the model.")
+        else:
+            print("The model on "+str(thing.KM.numWorlds)+" worlds contracts to "+str(best[1])+" worlds, rooted at world "+str(best[0]))
+            contraction.quotient(best[0]).displayKripkeStructure(ModelOutputDir+instanceFileName.split('.')[0]+'-contractedModel')
+    else:
+        print("The formula described in instance file "+instanceFileName+" was determined to be unsatisfiable by Enfragmo.")
+
+if __name__ == "__main__":
+    plac.call(main)
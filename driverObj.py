@@ -1,11 +1,44 @@
 import plac
-import os, sys, errno, subprocess
-from reuseableCode import findInFile
-from kripkeModelConstructor import kripkeModelConstructor
+import os, sys, hashlib, subprocess, shutil, threading, tempfile, time, cProfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from reuseableCode import findInFile, parseTypeRange, probeTempDir
+from kripkeModelConstructor import kripkeModelConstructor, modelRenderer
+from modelChecker import modelChecker
+from bisimulation import bisimulation
+from worldBounds import worldBounds
+from frameConditions import frameConditions
+from searchStrategies import strategies
+from instrumentation import spans
+from resultCache import resultCache, fileDigest, solverDigest
+from modelStore import modelStore
+from batchScheduler import batchScheduler
+from verifier import verifier
+from satBackend import kGrounding, newSolver
+from instanceGenerator import instanceGenerator, parseFormula, readOriginalFormula
+
+# Number the worlds of every model in breadth-first order from world 1: if a
+# world w2 has a predecessor u below it, then every world w1 between 1 and w2
+# has a predecessor below it, and one no greater than u. Worlds with the same
+# least predecessor, which breadth-first search visits one after another,
+# must have their atoms in lexicographic order. Any model can be renumbered
+# this way once the worlds unreachable from world 1, which make no difference
+# to it, are cut off from the rest (given a loop each where the frames must
+# be serial), so only models isomorphic to others are excluded.
+symmetryBreakingAxioms = [
+    '! w1 : World ! w2 : World ! u : World : 1 < w1 & w1 < w2 & u < w2 & Accessible(u, w2) => ? v : World : v < w1 & v <= u & Accessible(v, w1).',
+    '! w1 : World ! w2 : World ! p : World : w1 < w2 & Accessible(p, w1) & Accessible(p, w2) & (! q : World : q < p => ~Accessible(q, w1) & ~Accessible(q, w2)) => (! s : Subformula : Atom(s) => (TrueAt(s, w1) <=> TrueAt(s, w2))) | (? s : Subformula : Atom(s) & ~TrueAt(s, w1) & TrueAt(s, w2) & (! t : Subformula : Atom(t) & t < s => (TrueAt(t, w1) <=> TrueAt(t, w2)))).',
+]
+
 
 class driverObj(object):
-    def __init__(self, mainDir, theoryFileDir, theoryFileName, instanceFileDir, instanceFileName, EnfragmoOutputDir, EnfragmoOutputFileName, optionalConditionsFileName, startingNumWorlds):
+    def __init__(self, mainDir, theoryFileDir, theoryFileName, instanceFileDir, instanceFileName, EnfragmoOutputDir, EnfragmoOutputFileName, optionalConditionsFileName, startingNumWorlds, parallelProbes=0, keepTranscript=True, validateModels=False, cacheFilePath='', cacheSizeMB=256, renderPolicy='final', contractModels=True, searchStrategy='doubling', solverPath='', traceFilePath='', phaseReport=False, traceMemory=False, profileDir='', backend='enfragmo', useSatLibrary=True, symmetryBreaking=False, modelStoreDir='', probeDir=''):
         self.mainDir = mainDir
+        self.traceFilePath = traceFilePath
+        self.phaseReport = phaseReport
+        self.profileDir = profileDir
+        if traceFilePath != '' or phaseReport:
+            spans.enable(traceMemory)
+        self.solverPath = solverPath if solverPath != '' else mainDir+'Enfragmo'  # or a stand-in speaking Enfragmo's output format
         self.theoryFileDir = theoryFileDir
         self.theoryFileName = theoryFileName
         self.instanceFileDir = instanceFileDir
@@ -14,82 +47,346 @@ class driverObj(object):
         self.EnfragmoOutputFileName = EnfragmoOutputFileName
         self.optionalConditionsFileName = optionalConditionsFileName
         self.startingNumWorlds = startingNumWorlds
-        self.findMaxNumWorlds()
+        self.parallelProbes = parallelProbes
+        self.keepTranscript = keepTranscript
+        self.validateModels = validateModels
+        self.renderPolicy = renderPolicy  # which models get drawn: 'none', 'final' or 'all'
+        self.renderer = modelRenderer()
+        self.modelStore = modelStore(modelStoreDir) if modelStoreDir != '' else None
+        self.probeDir = probeDir if probeDir != '' else probeTempDir  # where the private instance file of each probe goes
+        self.frameConditions = frameConditions(theoryFileDir+optionalConditionsFileName) if optionalConditionsFileName != '' else None
+        if self.frameConditions is not None:
+            self.printFrameConditions()
+        # arbitrary extra frame conditions need not survive taking a quotient; the standard ones do
+        self.contractModels = contractModels and self.relationConditions() is not None
+        self.lastContraction = None
+        self.lastModel = None
+        self.searchStrategy = searchStrategy
+        self.backend = backend  # 'enfragmo', or 'incremental' for the in-process SAT backend
+        if backend == 'incremental' and self.relationConditions() is None:
+            print("\nThe incremental backend only grounds the standard conditions on the relation; running Enfragmo for the others.\n")
+            self.backend = 'enfragmo'
+        self.useSatLibrary = useSatLibrary
+        self.grounding = None
+        # breaking symmetries cuts off unreachable worlds, which unknown conditions may forbid
+        self.symmetryBreaking = symmetryBreaking and self.relationConditions() is not None
+        if symmetryBreaking and not self.symmetryBreaking:
+            print("\nSymmetry breaking is only sound for the standard conditions on the relation; searching without it.\n")
+        if self.symmetryBreaking and self.backend == 'enfragmo':
+            self.theoryFileName = insertSymmetryBreaking(self.theoryFileDir, self.theoryFileName)
+        self.probeLog = []  # (worlds, satisfiable, seconds, cached) for every probe run
+        self.readInstanceTemplate()
+        self.verifierObject = None
+        # written by the instanceGenerator when the instance is that of a simplified formula
+        self.originalFormulaFilePath = self.instanceFileDir+self.instanceFileName.split('.')[0]+'.original'
+        self.findWorldBounds()
+
+        self.cache = None
+        if cacheFilePath != '':
+            self.cache = resultCache(cacheFilePath, cacheSizeMB*2**20)
+            self.solverDigest = solverDigest(self.solverPath)
+            self.theoryDigest = fileDigest(self.theoryFileDir+self.theoryFileName)
+            self.instanceDigest = fileDigest(self.instanceFileDir+self.instanceFileName, lambda line: "TYPE World" in line)
+
+
+    def readInstanceTemplate(self):
+        '''
+            The user's instance file is read exactly once; each probe gets its own
+            copy of these lines with the TYPE World line replaced.
+        '''
+        with spans.span('readInstance'):
+            self.instanceTemplate = [line.strip() for line in open(self.instanceFileDir+self.instanceFileName)]
+            self.numWorldsLine = findInFile(self.instanceTemplate, lambda x: "TYPE World" in x)
 
 
     def findMaxNumWorlds(self):
-        with open(self.instanceFileDir+self.instanceFileName, 'r') as f:
-            numSubformulas = int(f.readline().split(']')[0][-1])
-
+        numSubformulas = parseTypeRange(self.instanceTemplate[0])
         self.maxWorlds = 2**numSubformulas  # theoretical upper bound for modal logics with FMP
 
 
+    def relationConditions(self):
+        '''
+            The conditions placed on the relation, closed as by
+            frameConditions: none for K, and None if the conditions file
+            says anything frameConditions does not recognise.
+        '''
+        if self.frameConditions is None:
+            return frozenset()
+        if not self.frameConditions.allRecognised():
+            return None
+        return self.frameConditions.closure
+
+
+    def printFrameConditions(self):
+        if self.frameConditions.allRecognised():
+            logic = self.frameConditions.logicName()
+            print("\nThe conditions in "+self.optionalConditionsFileName+" make the relation "+', '.join(sorted(self.frameConditions.closure))+(" ("+logic+")" if logic is not None else "")+".\n")
+        else:
+            print("\nSome conditions in "+self.optionalConditionsFileName+" are not standard ones, so the search is that of K with no upper bound:\n    "+'\n    '.join(self.frameConditions.unrecognised)+"\n")
+
+
+    def findWorldBounds(self):
+        '''
+            Narrows the search to the world counts the syntax of the formula
+            allows: the search starts no lower than the lower bound, and stops
+            at the upper bound. The upper bound depends on the frames: worldBounds
+            knows that of K and of a few other logics, and none is used when
+            the conditions on the relation are not all recognised.
+        '''
+        self.findMaxNumWorlds()
+        bounds = worldBounds(self.instanceVerifier())
+        with spans.span('worldBounds'):
+            self.minWorlds = bounds.lowerBound()
+            conditions = self.relationConditions()
+            upperBound = bounds.upperBound(conditions) if conditions is not None else None
+            if upperBound is not None:
+                self.maxWorlds = min(self.maxWorlds, upperBound)
+        self.startingNumWorlds = min(max(self.startingNumWorlds, self.minWorlds), self.maxWorlds)
+
+
+    def cappedStep(self, numWorlds, nextNumWorlds):
+        '''
+            Steps from numWorlds to nextNumWorlds, except that the upper bound is
+            probed rather than stepped over.
+        '''
+        if numWorlds < self.maxWorlds < nextNumWorlds:
+            return self.maxWorlds
+        return nextNumWorlds
+
+
     def runAndMinimizeModel(self):
         '''
         Figured I'd suck the calls to runEnfragmo and EnfragmoOutputToKripkeStructure
         out so that either a user can run them once with a specific instance file,
         or this drivingProc can be invoked multiple times
+
+        Returns the minimal number of worlds found, or None if the formula has
+        no model within the theoretical bound. Models are drawn in the
+        background while the search goes on, and are all on disk by the time
+        this returns.
+
+        The serial search follows the chosen strategy from searchStrategies;
+        the parallel search always doubles, then splits the gap k ways. The
+        incremental backend answers one probe at a time, so it always searches
+        serially.
+
+        With a profile directory given, the whole search runs under cProfile
+        and its statistics are dumped to <instance>.pstats there, for pstats.
+        '''
+        profile = cProfile.Profile() if self.profileDir != '' else None
+        try:
+            if profile is not None:
+                profile.enable()
+            with spans.span('search'):
+                if self.parallelProbes > 1 and self.backend == 'enfragmo':
+                    return self.parallelSearch()
+                return strategies[self.searchStrategy](self).search()
+        finally:
+            with spans.span('renderWait'):
+                self.renderer.wait()
+            if profile is not None:
+                profile.disable()
+                if not os.path.exists(self.profileDir):
+                    os.makedirs(self.profileDir)
+                profile.dump_stats(self.profileDir+self.instanceFileName.split('.')[0]+'.pstats')
+            self.printProbeReport()
+            self.writePhaseTimings()
+
+
+    def writePhaseTimings(self):
+        '''
+            Hands the spans recorded for this instance to the JSONL trace and/or
+            the aggregated report, as requested.
         '''
-        isUnSAT = True
-        currNumWorld = self.startingNumWorlds
-        # loop around runEnfragmo call, changing the instanceFile each iteration; finds first power of 2 that yields a model
-        while isUnSAT and currNumWorld <= self.maxWorlds:
-            isUnSAT = self.makeModel(currNumWorld)
-            if isUnSAT:
-                currNumWorld *= 2
+        if not spans.enabled:
+            return
+        records = spans.takeRecords()
+        if self.traceFilePath != '':
+            spans.writeTrace(self.traceFilePath, records, instance=self.instanceFileDir+self.instanceFileName)
+        if self.phaseReport:
+            spans.printReport(records, "Phase timings for "+self.instanceFileName+":")
 
-        if isUnSAT:
-            print("\nThe formula failed to have a satisfying model with at most "+str(self.maxWorlds)+" worlds.\n")
-        else:  # want to search on interval 2^{k-1} to 2^k, where k = currNumWorld
-            self.halvingProc(int(currNumWorld/2), currNumWorld)
 
+    def printProbeReport(self):
+        cached = sum(1 for numWorlds, satisfiable, seconds, wasCached in self.probeLog if wasCached)
+        solverTime = sum(seconds for numWorlds, satisfiable, seconds, wasCached in self.probeLog)
+        strategy = 'parallel' if self.parallelProbes > 1 and self.backend == 'enfragmo' else self.searchStrategy
+        print("\nSearch strategy "+strategy+": "+str(len(self.probeLog))+" probes ("+str(cached)+" from the cache), "+("%.2f" % solverTime)+" s of solver time.\n")
 
-    def makeModel (self, currNumWorld):
-        self.changeNumWorlds(currNumWorld)
-        self.runEnfragmo()
-        return self.EnfragmoOutputToKripkeStructure(currNumWorld)
 
+    def makeModel (self, currNumWorld, final=False):
+        if self.backend == 'incremental':
+            KM = self.runIncremental(currNumWorld)
+        else:
+            instanceFilePath = self.changeNumWorlds(currNumWorld)
+            try:
+                KM = self.runEnfragmo(currNumWorld, instanceFilePath)
+            finally:
+                os.remove(instanceFilePath)
+        self.lastModel = KM
+        return self.EnfragmoOutputToKripkeStructure(KM, final)
 
-    def halvingProc (self, lowerBound, upperBound):
-        found = upperBound
-        self.EnfragmoOutputFileName = self.EnfragmoOutputFileName.split('.')[0]+'-minimal.txt'
 
-        # need to make sure lower bound is still on appropriate interval; we don't want to change it below!
-        while lowerBound <= upperBound:
-            # Must use integer division to get floor of midpoint because otherwise, due to proof, if floor was actual lower
-            # bound, then ceiling will also yield satisfying model, but the ceiling wouldn't be the minimal model w.r.t. worlds!
-            midpoint = int((upperBound + lowerBound) / 2)  # integer division for midpoint on interval
-            UNSAT = self.makeModel(midpoint)
-            if UNSAT:
-                # if no model found at midpoint, lower bound must be in upper half of interval
-                lowerBound = midpoint+1
-            else:
-                # We have found a model, so either midpoint is smallest num worlds, or it is upper bound and must look in lower interval
-                upperBound = midpoint-1
-                found = midpoint  # since midpoint succeeded
+    def parallelSearch(self):
+        '''
+        Speculative version of the doubling and halving procedures, keeping up
+        to parallelProbes Enfragmo runs in flight at once. Until a model is
+        found the probes follow the doubling sequence; after that, the open
+        interval is split into as many points as there are workers (a k-ary
+        split in place of bisection).
+
+        A model on n worlds can be padded to a model on n+1 worlds, so a SAT
+        result at n settles every probe above n and an UNSAT result settles
+        every probe below it; such probes are killed as soon as the result
+        arrives. The interval searched is the one the doubling strategy searches,
+        so the minimal world count is the same as for the serial procedure.
+        '''
+        stem = self.instanceFileName.split('.')[0]
+        self.probeDir = self.EnfragmoOutputDir+'Probes/'+stem+'/'
+        if not os.path.exists(self.probeDir):
+            os.makedirs(self.probeDir)
+        self.probeProcs = {}
+        self.probeModels = {}
+        self.probeContractions = {}
+        self.cancelledProbes = set()
+        self.probeLock = threading.Lock()
+
+        lowerBound = max(self.minWorlds, self.startingNumWorlds // 2)  # no world count below this is ever probed
+        upperBound = None  # smallest world count known to have a model
+        nextDoubling = self.startingNumWorlds
+        running = {}  # future -> number of worlds it probes
+        if self.contractModels:
+            self.instanceVerifier()  # parse it here rather than race to do so in the probes
+
+        with ThreadPoolExecutor(max_workers=self.parallelProbes) as pool:
+            while True:
+                if upperBound is None or lowerBound < upperBound:
+                    free = self.parallelProbes - len(running)
+                    inFlight = set(running.values())
+                    candidates = []
+                    if upperBound is None:
+                        while len(candidates) < free and nextDoubling <= self.maxWorlds:
+                            if nextDoubling >= lowerBound:
+                                candidates.append(nextDoubling)
+                            nextDoubling = self.cappedStep(nextDoubling, 2*nextDoubling)
+                    else:
+                        candidates = [n for n in splitInterval(lowerBound, upperBound, free+len(inFlight)) if n not in inFlight][:free]
+                    for n in candidates:
+                        running[pool.submit(self.runProbe, n)] = n
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n = running.pop(future)
+                    if future.cancelled() or future.result() is None:
+                        continue
+                    if future.result():  # UNSAT
+                        lowerBound = max(lowerBound, n+1)
+                    else:
+                        if n in self.probeContractions and self.probeContractions[n] < n:
+                            n = max(lowerBound, self.probeContractions[n])  # may not have been probed itself
+                        if upperBound is None or n < upperBound:
+                            upperBound = n
+
+                for future, n in running.items():
+                    if n < lowerBound or (upperBound is not None and n >= upperBound):
+                        self.cancelProbe(future, n)
+
+        if upperBound is None:
+            print("\nThe formula failed to have a satisfying model with at most "+str(self.maxWorlds)+" worlds.\n")
+        else:
+            self.EnfragmoOutputFileName = self.EnfragmoOutputFileName.split('.')[0]+'-minimal.txt'
+            if upperBound not in self.probeModels:  # only implied by the contraction of a larger model
+                self.cancelledProbes.discard(upperBound)
+                self.runProbe(upperBound)
+            if self.keepTranscript and os.path.exists(self.probeOutputPath(upperBound)):  # not there if the probe was a cache hit
+                os.replace(self.probeOutputPath(upperBound), self.EnfragmoOutputDir+self.EnfragmoOutputFileName)
+            self.EnfragmoOutputToKripkeStructure(self.probeModels[upperBound], final=True)
+        shutil.rmtree(self.probeDir, ignore_errors=True)
+        return upperBound
+
+
+    def probeOutputPath(self, numWorlds):
+        return self.probeDir+self.instanceFileName.split('.')[0]+'Out-'+str(numWorlds)+'Worlds.txt'
+
+
+    def runProbe(self, numWorlds):
+        '''
+            Runs one speculative probe on its own private instance file.
+            Returns True if UNSAT, False if SAT, and None if the probe was
+            cancelled before it could finish.
+        '''
+        KM = self.cachedEnfragmoRun(numWorlds, self.probeOutputPath(numWorlds))
+        if KM is not None:
+            self.probeLog.append((numWorlds, KM.isSatisfiable, 0.0, True))
+            self.recordProbe(numWorlds, KM)
+            return not KM.isSatisfiable
 
-        #  Must run makeModel one more time on midpoint due to halting condition overwriting when approaching from above
-        #  Rerun last model you found!
-        self.makeModel(found)
+        instanceFilePath = self.changeNumWorlds(numWorlds)
+        try:
+            with self.probeLock:
+                if numWorlds in self.cancelledProbes:
+                    return None
+                startTime = time.time()
+                proc = self.startEnfragmo(instanceFilePath)
+                self.probeProcs[numWorlds] = proc
+            KM = self.readEnfragmo(proc, numWorlds, self.probeOutputPath(numWorlds))
+            solverTime = time.time()-startTime
+        finally:
+            os.remove(instanceFilePath)
+
+        with self.probeLock:
+            del self.probeProcs[numWorlds]
+            if numWorlds in self.cancelledProbes:
+                return None
+        self.probeLog.append((numWorlds, KM.isSatisfiable, solverTime, False))
+        self.cacheEnfragmoRun(numWorlds, KM)
+        self.recordProbe(numWorlds, KM)
+        return not KM.isSatisfiable
+
+
+    def recordProbe(self, numWorlds, KM):
+        if KM.isSatisfiable and self.contractModels:
+            self.buildKripkeStructure(KM)
+            contraction = self.contractedSize(KM)
+            if contraction is not None:
+                self.probeContractions[numWorlds] = contraction
+        self.probeModels[numWorlds] = KM
+
+
+    def cancelProbe(self, future, numWorlds):
+        with self.probeLock:
+            self.cancelledProbes.add(numWorlds)
+            future.cancel()
+            if numWorlds in self.probeProcs:
+                self.probeProcs[numWorlds].kill()
 
 
     def changeNumWorlds(self, newNumWorlds):
         '''
             Given a user-specified instance file, creates a new Enfragmo problem
-            instance file with the desired number of worlds. This procedure changes
-            the original file supplied.
+            instance file with the desired number of worlds, and returns its path.
+            The new file is private to the caller, who must remove it once the
+            probe is over; the original file supplied is never changed, so
+            any number of probes may run on the same instance at once.
         '''
-        instanceFileContents = [line.strip() for line in open(self.instanceFileDir+self.instanceFileName)]
+        with spans.span('changeNumWorlds', numWorlds=newNumWorlds):
+            fileHandle, instanceFilePath = tempfile.mkstemp(suffix='.I', prefix=self.instanceFileName.split('.')[0]+'-'+str(newNumWorlds)+'-', dir=self.probeDir)
+            with os.fdopen(fileHandle, 'w') as outputFile:
+                for line in self.instanceWithNumWorlds(newNumWorlds):
+                    outputFile.write("%s\n" % line)
+        return instanceFilePath
 
-        numWorldsLine = findInFile(instanceFileContents, lambda x: "TYPE World" in x)
 
-        instanceFileContents[numWorldsLine] = 'TYPE World [1.. '+str(newNumWorlds)+']'
-        outputFile = open(self.instanceFileDir+self.instanceFileName, 'w+')
-        for line in instanceFileContents:
-            outputFile.write("%s\n" % line.strip())
+    def instanceWithNumWorlds(self, newNumWorlds):
+        instanceFileContents = list(self.instanceTemplate)
+        instanceFileContents[self.numWorldsLine] = 'TYPE World [1.. '+str(newNumWorlds)+']'
+        return instanceFileContents
 
 
-    def runEnfragmo(self):
+    def runEnfragmo(self, numWorlds, instanceFilePath):
         '''
             Runs Enfragmo given the theory file and instance file
 
@@ -99,40 +396,223 @@ class driverObj(object):
             file based on the model produced, and will send that off to Enfragmo again
             to further minimize the model.
         '''
+        KM = self.cachedEnfragmoRun(numWorlds, self.EnfragmoOutputDir+self.EnfragmoOutputFileName)
+        if KM is not None:
+            self.probeLog.append((numWorlds, KM.isSatisfiable, 0.0, True))
+        else:
+            startTime = time.time()
+            proc = self.startEnfragmo(instanceFilePath)
+            KM = self.readEnfragmo(proc, numWorlds, self.EnfragmoOutputDir+self.EnfragmoOutputFileName)
+            self.probeLog.append((numWorlds, KM.isSatisfiable, time.time()-startTime, False))
+            self.cacheEnfragmoRun(numWorlds, KM)
+        return KM
+
+
+    def runIncremental(self, numWorlds):
+        '''
+            Answers a probe in process: the theory of K is grounded for the
+            instance on the first probe, and extended with more worlds when a
+            probe needs them, so a probe is a single SAT call under assumptions
+            which keeps what the solver learned on earlier probes. There is no
+            Enfragmo transcript to keep, and nothing goes through the result
+            cache.
+        '''
+        KM = self.newKripkeModelConstructor(numWorlds, self.EnfragmoOutputDir+self.EnfragmoOutputFileName)
+        startTime = time.time()
+        with spans.span('incrementalSolve', numWorlds=numWorlds):
+            if self.grounding is None:
+                self.grounding = kGrounding(self.instanceVerifier(), newSolver(self.useSatLibrary), self.relationConditions(), self.symmetryBreaking)
+            KM.setEnfragmoResult(*self.grounding.solve(numWorlds))
+        self.probeLog.append((numWorlds, KM.isSatisfiable, time.time()-startTime, False))
+        return KM
+
+
+    def cachedEnfragmoRun(self, numWorlds, transcriptPath):
+        '''
+            Returns a kripkeModelConstructor holding the cached result of probing
+            numWorlds worlds, or None if there is none (or no cache in use).
+        '''
+        if self.cache is None:
+            return None
+        result = self.cache.lookup(self.cache.probeKey(self.solverDigest, self.theoryDigest, self.instanceDigest, numWorlds))
+        if result is None:
+            return None
+        KM = self.newKripkeModelConstructor(numWorlds, transcriptPath)
+        KM.setEnfragmoResult(*result)
+        return KM
+
+
+    def cacheEnfragmoRun(self, numWorlds, KM):
+        # a run that never reported a verdict (e.g. it crashed) proves nothing
+        if self.cache is not None and KM.statusSeen:
+            self.cache.store(self.cache.probeKey(self.solverDigest, self.theoryDigest, self.instanceDigest, numWorlds), KM.isSatisfiable, KM.valuation, KM.accessible)
+
+
+    def startEnfragmo(self, instanceFilePath):
         try:
-            cmdList = [self.mainDir+'Enfragmo', self.theoryFileDir+self.theoryFileName, self.instanceFileDir+self.instanceFileName]
-            output = subprocess.Popen(cmdList, stdout=subprocess.PIPE).stdout#.communicate()[0]
+            cmdList = [self.solverPath, self.theoryFileDir+self.theoryFileName, instanceFilePath]
+            return subprocess.Popen(cmdList, stdout=subprocess.PIPE)
         except OSError:
             sys.exit("Enfragmo binaries not available. Please contact wbkboyer@gmail.com for information.")
 
-        if not os.path.exists(self.EnfragmoOutputDir):
-            os.makedirs(self.EnfragmoOutputDir)
-        outputFile = open(self.EnfragmoOutputDir+self.EnfragmoOutputFileName, 'w+')
 
-        for line in output:
-            outputFile.write(str(line).strip('b\'').strip('b\"').strip(r'\n') + '\n')
+    def readEnfragmo(self, proc, numWorlds, transcriptPath):
+        '''
+            Streams Enfragmo's stdout straight into a kripkeModelConstructor,
+            copying it to transcriptPath only if transcripts are kept. Once
+            Enfragmo has reported the instance unsatisfiable there is nothing
+            left worth reading, so the run is killed rather than waited out.
+        '''
+        KM = self.newKripkeModelConstructor(numWorlds, transcriptPath)
+        with spans.span('runEnfragmo', numWorlds=numWorlds):
+            if self.keepTranscript:
+                if not os.path.exists(os.path.dirname(transcriptPath)):
+                    os.makedirs(os.path.dirname(transcriptPath))
+                with open(transcriptPath, 'w') as transcriptFile:
+                    KM.readEnfragmoStream(proc.stdout, transcriptFile)
+            else:
+                KM.readEnfragmoStream(proc.stdout)
+
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        return KM
+
+
+    def newKripkeModelConstructor(self, numWorlds, transcriptPath):
+        ModelOutputDir = self.EnfragmoOutputDir+"Kripke Models/"
+        if not os.path.exists(ModelOutputDir):
+            os.makedirs(ModelOutputDir)
+        KM = kripkeModelConstructor(self.instanceFileDir+self.instanceFileName, self.instanceFileName, transcriptPath, os.path.basename(transcriptPath), ModelOutputDir)
+        KM.numWorlds = numWorlds
+        return KM
 
 
-    def EnfragmoOutputToKripkeStructure(self, currNumWorld):
+    def EnfragmoOutputToKripkeStructure(self, KM, final=False):
         '''
             Initially, this method will simply take the content from the runEnfragmo
             method, and will invoke the kripkeModelConstructor module on that output.
             Later, I will run Enfragmo again with a new specification file dictating
             the rules for how to
+
+            Whether the model gets drawn depends on the render policy: only the
+            final, minimal model is drawn under 'final', every model found under
+            'all', and none under 'none'.
         '''
-        ModelOutputDir = self.EnfragmoOutputDir+"Kripke Models/"
-        if not os.path.exists(ModelOutputDir):
-            os.makedirs(ModelOutputDir)
-        KM= kripkeModelConstructor(self.instanceFileDir+self.instanceFileName, self.instanceFileName, self.EnfragmoOutputDir+self.EnfragmoOutputFileName, self.EnfragmoOutputFileName, ModelOutputDir)
-        if KM.readEnfragmoOutput():
-            KM.parseEnfragmoOutput()
-            KM.parseInstanceFile()
-            KM.printKripkeModel()
+        if KM.isSatisfiable:
+            self.buildKripkeStructure(KM)
+            if self.contractModels:
+                self.lastContraction = self.contractedSize(KM)
+            if self.validateModels:
+                self.validateModel(KM)
+            if final and os.path.exists(self.originalFormulaFilePath):
+                self.checkOriginalFormula(KM)
+            if final and self.modelStore is not None:
+                self.storeModel(KM)
+            if self.renderPolicy == 'all' or (final and self.renderPolicy == 'final'):
+                KM.printKripkeModel(self.renderer)
             return False  # A satisfying model has been found for the formula, therefore the loop can be halted
         else:
             return True  # The formula fails to have a model with this number of worlds
 
 
+    def storeModel(self, KM):
+        '''
+            Appends the minimal model to the model store, under the name of the
+            instance file and of its directory as the family.
+        '''
+        family = os.path.basename(os.path.normpath(self.instanceFileDir))
+        conditions = self.relationConditions()
+        self.modelStore.addModel(family, self.instanceFileName, KM.KM,
+                                 subformulas=self.instanceVerifier().numTreeNodes,
+                                 modalDepth=self.instanceVerifier().syntaxTree.modalDepth(),
+                                 conditions=sorted(conditions) if conditions is not None else None,
+                                 theory=self.theoryFileName, backend=self.backend)
+
+
+    def buildKripkeStructure(self, KM):
+        with spans.span('buildKripkeStructure', numWorlds=KM.numWorlds):
+            KM.parseEnfragmoOutput()
+            KM.parseInstanceFile(KM.numWorlds, self.instanceVerifier())
+
+
+    def contractedSize(self, KM):
+        '''
+            Takes the quotient, under bisimulation, of the part of the model
+            reachable from a world at which the formula holds. The quotient is a
+            model of the formula too, so the minimal number of worlds is at
+            most its size, which is returned; None if the formula holds nowhere.
+        '''
+        with spans.span('contraction', numWorlds=KM.numWorlds):
+            formulaWorlds = modelChecker(KM.KM, KM.verifierObject).checkFormulas([KM.verifierObject])[0]
+            smallest = bisimulation(KM.KM).smallestQuotient(formulaWorlds)
+        return None if smallest is None else smallest[1]
+
+
+    def contractedBound(self, lowerBound, numWorlds):
+        '''
+            Having just found a model on numWorlds worlds, returns the least
+            world count known to have a model: numWorlds, or the size of the
+            contracted model if smaller. A model can be padded with extra worlds,
+            so a contraction below lowerBound still proves lowerBound.
+        '''
+        if self.contractModels and self.lastContraction is not None and self.lastContraction < numWorlds:
+            return max(lowerBound, self.lastContraction)
+        return numWorlds
+
+
+    def instanceVerifier(self):
+        '''
+            The formula only needs parsing once per instance, from the template
+            held in memory, however many models are found for it.
+        '''
+        if self.verifierObject is None:
+            self.verifierObject = verifier(self.instanceFileDir+self.instanceFileName)
+            self.verifierObject.readProblemInstanceFile([line for line in self.instanceTemplate if line != ''])
+            self.verifierObject.parseProblemInstanceFile()
+        return self.verifierObject
+
+
+    def validateModel(self, KM):
+        '''
+            Re-checks Enfragmo's answer by evaluating the formula over the Kripke
+            structure it produced, rather than trusting the solver blindly, and
+            checks its relation against the recognised conditions.
+        '''
+        with spans.span('validateModel', numWorlds=KM.numWorlds):
+            isModel, worlds = modelChecker(KM.KM, KM.verifierObject).verifyModel()
+            violated = self.frameConditions.violated(KM.KM) if self.frameConditions is not None else []
+        if not isModel:
+            print("\nWARNING: the structure Enfragmo produced for "+self.instanceFileName+" with "+str(KM.numWorlds)+" worlds is not a model of the formula.\n")
+        if violated:
+            print("\nWARNING: the relation Enfragmo produced for "+self.instanceFileName+" with "+str(KM.numWorlds)+" worlds is not "+', '.join(violated)+".\n")
+        return isModel and not violated
+
+
+    def checkOriginalFormula(self, KM):
+        '''
+            The instance file of a simplified formula comes with a record of
+            the formula as originally written, against which the final model
+            is checked, so that a fault in the simplifier cannot go unnoticed.
+            The atoms of the original formula are matched to those of the
+            model by name; atoms simplified away hold nowhere.
+        '''
+        formula, atomNumbers = readOriginalFormula(self.originalFormulaFilePath)
+        original = instanceGenerator(parseFormula(formula))
+        originalVerifier = verifier(self.originalFormulaFilePath)
+        originalVerifier.readProblemInstanceFile(original.instanceLines())
+        originalVerifier.parseProblemInstanceFile()
+        modelLabels, originalLabels = self.instanceVerifier().atomLabels(), originalVerifier.atomLabels()
+        with spans.span('checkOriginalFormula', numWorlds=KM.numWorlds):
+            checker = modelChecker(KM.KM, originalVerifier)
+            checker.relabelAtoms(dict((modelLabels[i], originalLabels[original.atomNumbers[atom]]) for atom, i in atomNumbers.items()))
+            isModel, worlds = checker.verifyModel()
+        if not isModel:
+            print("\nWARNING: the structure Enfragmo produced for "+self.instanceFileName+" with "+str(KM.numWorlds)+" worlds is not a model of the original formula, as recorded in "+self.originalFormulaFilePath+".\n")
+        return isModel
+
+
 def insertRelationConditions(theoryFileDir, theoryFileName, optionalConditionsFileName):
     '''
         Given a user-specified file, creates a new Enfragmo theory file which
@@ -141,35 +621,82 @@ def insertRelationConditions(theoryFileDir, theoryFileName, optionalConditionsFi
         procedure generates a new theory file, rather than wiping out the old
         one.
     '''
+    conditionLines = [line.strip() for line in open(theoryFileDir+optionalConditionsFileName)]
+    return spliceIntoTheory(theoryFileDir, theoryFileName, conditionLines, os.path.basename(optionalConditionsFileName).split('.')[0])
+
+
+def insertSymmetryBreaking(theoryFileDir, theoryFileName):
+    '''
+        Creates a new Enfragmo theory file which also requires the worlds to
+        be numbered in breadth-first order, as symmetryBreakingAxioms does.
+    '''
+    return spliceIntoTheory(theoryFileDir, theoryFileName, symmetryBreakingAxioms, 'SymmetryBreaking')
+
+
+def spliceIntoTheory(theoryFileDir, theoryFileName, newLines, label):
+    '''
+        Creates a new theory file holding the given lines just before the
+        PRINT : line of the theory, and returns its name.
+
+        The composed file is named after a hash of its contents, so that
+        editing the theory or the lines gives a new file rather than
+        silently reusing the old one, while composing the same files again
+        reuses it. It is written under a temporary name and renamed into
+        place, so concurrent runs never see it half written.
+    '''
 
     newTheoryFileContents = [line.strip() for line in open(theoryFileDir+theoryFileName)]
 
     a = findInFile(newTheoryFileContents, lambda x: "PRINT :" in x)
     printRelationLines = newTheoryFileContents[a:]
     newTheoryFileContents = newTheoryFileContents[:a]
-    newTheoryFileContents.extend([line.strip() for line in open(theoryFileDir+optionalConditionsFileName)])
+    newTheoryFileContents.extend(newLines)
     newTheoryFileContents.extend(printRelationLines)
+    newTheoryFileText = ''.join("%s\n" % line for line in newTheoryFileContents)
 
-    newTheoryFileName = theoryFileName.split('.')[0]+'-AdditionalConditions.T'
+    contentsDigest = hashlib.sha256(newTheoryFileText.encode()).hexdigest()[:16]
+    newTheoryFileName = theoryFileName.split('.')[0]+'-'+label+'-'+contentsDigest+'.T'
 
-    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY
-
-    try:
-        file_handle = os.open(theoryFileDir+newTheoryFileName,flags)
-    except OSError as e:
-        if e.errno == errno.EEXIST:  # Failed as the file already exists.
-            pass
-        else:  # Something unexpected went wrong so reraise the exception.
-            raise
-    else:  # No exception, so the file must have been created successfully.
-        with os.fdopen(file_handle, 'w') as outputFile:
-            for line in newTheoryFileContents:
-                outputFile.write("%s\n" % line.strip())
+    if not os.path.exists(theoryFileDir+newTheoryFileName):
+        fileHandle, tempPath = tempfile.mkstemp(suffix='.T', dir=theoryFileDir)
+        with os.fdopen(fileHandle, 'w') as outputFile:
+            outputFile.write(newTheoryFileText)
+        os.replace(tempPath, theoryFileDir+newTheoryFileName)
 
     return newTheoryFileName
 
 
-def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/', theoryFileDir='Single Modality/', theoryFileName='MLDecisionProcK.T', instanceFileDir='', instanceFileName='', optionalConditionsFileName='', startingNumWorlds=1):
+def splitInterval(lowerBound, upperBound, k):
+    '''
+        Returns up to k distinct, evenly spaced world counts in the interval
+        [lowerBound, upperBound), where upperBound is known to yield a model.
+    '''
+    width = upperBound - lowerBound
+    return sorted(set(lowerBound + (width*j) // (k+1) for j in range(1, k+1)))
+
+
+@plac.annotations(
+    parallelProbes=("number of world counts to probe at once; 0 or 1 runs the serial search", 'option', None, int),
+    batchWorkers=("number of instance files minimized at once in directory mode", 'option', None, int),
+    instanceTimeout=("seconds allowed per instance file in directory mode; 0 for no limit", 'option', None, float),
+    validateModels=("check every model Enfragmo finds against the formula", 'flag', None),
+    noCache=("bypass the on-disk cache of Enfragmo results", 'flag', None),
+    cacheSizeMB=("size bound of the Enfragmo result cache, in megabytes", 'option', None, int),
+    solverPath=("solver to run in place of <mainDir>/Enfragmo, taking the same arguments and printing the same output", 'option', None, str),
+    searchStrategy=("order in which world counts are probed by the serial search", 'option', None, str, ['doubling', 'linear', 'galloping', 'costWeighted']),
+    backend=("answer probes by running Enfragmo, or in process by incremental SAT over the theory of K", 'option', None, str, ['enfragmo', 'incremental']),
+    builtInSat=("use the built-in SAT solver for the incremental backend even if PySAT is installed", 'flag', None),
+    symmetryBreaking=("require the worlds of every model to be numbered in breadth-first order, so that isomorphic models are not searched again", 'flag', None),
+    modelStore=("directory, relative to mainDir, of the store every minimal model is appended to; none if empty", 'option', None, str),
+    traceFile=("append a JSON line per timed phase to this file", 'option', None, str),
+    phaseReport=("print a table of time spent per phase after each instance", 'flag', None),
+    traceMemory=("also record peak memory per phase with tracemalloc (slow)", 'flag', None),
+    profileDir=("dump cProfile statistics of each instance's search to this directory", 'option', None, str),
+    noContraction=("do not shrink the search interval by contracting each model found under bisimulation", 'flag', None),
+    renderPolicy=("which models to draw with Graphviz", 'option', None, str, ['none', 'final', 'all']),
+    noTranscript=("do not keep Enfragmo's output for each probe on disk", 'flag', None),
+    batchOrder=("estimate used to start the longest instances first in directory mode", 'option', None, str, ['size', 'subformulas', 'none']))
+def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/', theoryFileDir='Single Modality/', theoryFileName='MLDecisionProcK.T', instanceFileDir='', instanceFileName='', optionalConditionsFileName='', startingNumWorlds=1, parallelProbes=0, validateModels=False, noCache=False, cacheSizeMB=256, renderPolicy='final', searchStrategy='doubling', solverPath='', traceFile='', phaseReport=False, traceMemory=False, profileDir='', noContraction=False, noTranscript=False, batchWorkers=1, instanceTimeout=0, batchOrder='size', backend='enfragmo', builtInSat=False, symmetryBreaking=False, modelStore=''):
     "Run Enfragmo with desired Theory file and problem instance file, optionally with additional conditions."
 
     ''' For the required theory and problem instance files, please clone the repository:
@@ -194,23 +721,23 @@ def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/', theoryFileDir=
     EnfragmoOutputDir = mainDir + r"Output/"+instanceFileDir
     theoryFileDir=mainDir+'Theory Files/'+theoryFileDir
     instanceFileDir=mainDir+'Instance Files/'+instanceFileDir
+    cacheFilePath = '' if noCache else mainDir+'Output/probeCache.sqlite'
+    modelStoreDir = mainDir+modelStore if modelStore != '' else ''
 
-    if optionalConditionsFileName is not '':
+    if optionalConditionsFileName != '':
         theoryFileName = insertRelationConditions(theoryFileDir, theoryFileName, optionalConditionsFileName)
 
     #  "document sequencer"
-    if instanceFileName is not '': #only one instance file specified to run procedure on
+    if instanceFileName != '': #only one instance file specified to run procedure on
         EnfragmoOutputFileName = instanceFileName.split('.')[0]+'Out.txt'
-        driverForFormula = driverObj(mainDir, theoryFileDir, theoryFileName, instanceFileDir, instanceFileName, EnfragmoOutputDir, EnfragmoOutputFileName, optionalConditionsFileName, startingNumWorlds)
+        driverForFormula = driverObj(mainDir, theoryFileDir, theoryFileName, instanceFileDir, instanceFileName, EnfragmoOutputDir, EnfragmoOutputFileName, optionalConditionsFileName, startingNumWorlds, parallelProbes, not noTranscript, validateModels, cacheFilePath, cacheSizeMB, renderPolicy, not noContraction, searchStrategy, solverPath, traceFile, phaseReport, traceMemory, profileDir, backend, not builtInSat, symmetryBreaking, modelStoreDir)
         driverForFormula.runAndMinimizeModel()
     else:  # run procedure on entire instance file directory
-        for instanceFileDir, subdirList, fileList in os.walk(instanceFileDir, topdown=False):
-            for instanceFileName in fileList:
-                if instanceFileName.endswith('.I'):
-                    print("\n\n Processing "+instanceFileName+"\n_______\n")
-                    EnfragmoOutputFileName = instanceFileName.split('.')[0]+'Out.txt'
-                    driverForFormula = driverObj(mainDir, theoryFileDir, theoryFileName, instanceFileDir+'/', instanceFileName, EnfragmoOutputDir+instanceFileDir.split('/')[-1]+'/', EnfragmoOutputFileName, optionalConditionsFileName, startingNumWorlds)
-                    driverForFormula.runAndMinimizeModel()
+        driverArgs = dict(mainDir=mainDir, theoryFileDir=theoryFileDir, theoryFileName=theoryFileName, optionalConditionsFileName=optionalConditionsFileName, startingNumWorlds=startingNumWorlds, parallelProbes=parallelProbes, keepTranscript=not noTranscript, validateModels=validateModels, cacheFilePath=cacheFilePath, cacheSizeMB=cacheSizeMB, renderPolicy=renderPolicy, contractModels=not noContraction, searchStrategy=searchStrategy, solverPath=solverPath, traceFilePath=traceFile, phaseReport=phaseReport, traceMemory=traceMemory, profileDir=profileDir, backend=backend, useSatLibrary=not builtInSat, symmetryBreaking=symmetryBreaking, modelStoreDir=modelStoreDir)
+        scheduler = batchScheduler(driverArgs, batchWorkers, instanceTimeout, batchOrder)
+        scheduler.addInstanceDirectory(instanceFileDir, EnfragmoOutputDir)
+        scheduler.run()
+        scheduler.printSummary()
 
 if __name__ == '__main__':
     plac.call(main)
\ No newline at end of file
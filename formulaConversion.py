@@ -4,6 +4,7 @@ Created on Jun 12, 2015
 @author: wandaboyer
 """
 import re, os, plac
+from instanceGenerator import tokenize, generateInstanceFiles
 
 class formulaConversion(object):
     '''
@@ -31,8 +32,10 @@ class formulaConversion(object):
         '''
         self.benchmarkFileLines = [line.strip().split(':')[-1] for line in open(self.filepath) if line != '\n']
         
-        # Removes unnecessary preamble on first and second lines
+        # Removes unnecessary preamble on first and second lines, and the closing delimiter
         del self.benchmarkFileLines[0:2]
+        if self.benchmarkFileLines and self.benchmarkFileLines[-1].strip() == 'end':
+            del self.benchmarkFileLines[-1]
     
     def parseBenchmarkFile(self):
         '''
@@ -56,11 +59,23 @@ class formulaConversion(object):
         self.benchmarkFileLines = [re.sub(r'(p)(\d+)', r'\2 ', formula) for formula in self.benchmarkFileLines]
         #'box':'box ', 'dia':'dia ', , 'false ':' false'
     def correctSpacing(self):
-        self.benchmarkFileLines = [self.multiple_replace(formula, {'box':'box ', 'dia':'dia ','false':'false ','~':'~ ', '(':'( ', ')':') ', ' ->':'->', ' &':'&', ' v':'v', ' <->':'<->'}) for formula in self.benchmarkFileLines]
-        
-    def multiple_replace(self, string, rep_dict):
-        pattern = re.compile("|".join([re.escape(k) for k in rep_dict.keys()]), re.M)
-        return pattern.sub(lambda x: rep_dict[x.group(0)], string)
+        '''
+        Puts exactly one space between tokens, as found by the tokenizer the
+        instance generator parses with.
+        '''
+        self.benchmarkFileLines = [' '.join(tokenize(formula)) for formula in self.benchmarkFileLines]
+
+    def printInstanceFiles(self, numWorkers=1, maxFormulas=0, shareSubformulas=True, simplify=True):
+        '''
+        Writes a problem instance file for each formula of the benchmark file
+        (or for the first maxFormulas of them) to the output directory, with
+        no need for an external parser. Structurally identical subformulas
+        share one number unless shareSubformulas is False, and formulas are
+        simplified first unless simplify is False. Returns the names of the
+        files.
+        '''
+        formulas = self.benchmarkFileLines[:maxFormulas] if maxFormulas else self.benchmarkFileLines
+        return generateInstanceFiles(formulas, self.outputDir, self.fileName.split('.')[0], numWorkers, shareSubformulas, simplify)
     
     def printNewBenchmarkFile(self):
         outputFile = open(self.outputDir+'Modified-'+self.fileName, 'w+')
@@ -74,13 +89,32 @@ Testing
 Note: Needs location on filesystem of benchmark files
 '''
             
-def main(rootDir):
-    for dirName, subdirList, fileList in os.walk(rootDir, topdown=False):
+def isBenchmarkFile(filepath):
+    '''
+    Whether the file starts like an LWB benchmark file: its name on the
+    first line, then the delimiter 'begin'.
+    '''
+    with open(filepath) as f:
+        lines = [line.strip() for line in f.readlines(4096) if line.strip() != '']
+    return len(lines) >= 2 and lines[1] == 'begin'
+
+# directories main writes into, which it does not walk again
+generatedDirs = ('ModifiedFormulas', 'InstanceFiles')
+
+def main(rootDir, numWorkers=1):
+    for dirName, subdirList, fileList in os.walk(rootDir):
+        subdirList[:] = [subdir for subdir in subdirList if subdir not in generatedDirs]
         for fname in fileList:
+            if not isBenchmarkFile(dirName+"/"+fname):
+                continue
             thing = formulaConversion(dirName+"/"+fname, fname, dirName+"/ModifiedFormulas/")
             thing.readBenchmarkFile()
             thing.parseBenchmarkFile()
+            if not os.path.exists(thing.outputDir):
+                os.makedirs(thing.outputDir)
             thing.printNewBenchmarkFile()
+            thing.outputDir = dirName+"/InstanceFiles/"
+            thing.printInstanceFiles(int(numWorkers))
 
 if __name__ == "__main__":
     plac.call(main)
\ No newline at end of file
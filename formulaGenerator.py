@@ -0,0 +1,188 @@
+"""
+Created on Oct 18, 2026
+
+Generates random modal formulas of a given modal depth, number of atoms and
+size, and their instance files, for sweeping one dimension of the input at
+a time.
+"""
+import os, random
+import plac
+from instanceGenerator import instanceGenerator
+
+binaryPredicates = ['And', 'Or', 'Implication']
+lwbSymbols = {'Not': '~', 'Box': 'box', 'Diamond': 'dia', 'And': '&', 'Or': 'v', 'Implication': '->'}
+
+class formulaGenerator(object):
+    '''
+    Each formula is built top down, as the nested tuples of parseFormula, from
+    a budget of connectives: a subformula given n connectives is an atom when
+    n is 0 and otherwise one connective applied to subformulas sharing the
+    other n-1 between them. The connective is
+        Box or Diamond   with probability modalRatio, a Diamond with
+                         probability diamondRatio
+        Not              with probability negationRatio
+        And, Or or ->    otherwise, the n-1 connectives being split
+                         uniformly at random between the two operands
+    Along one path from the formula down to an atom the modal connectives are
+    forced, so that the formula has exactly the modal depth asked for, and no
+    path holds more of them; the formula therefore needs at least as many
+    connectives as its modal depth. Its size is exactly the number of
+    connectives asked for, and its leaves, one more than its binary
+    connectives, are occurrences of atoms, the first numAtoms of which (in an
+    order drawn at random) take every atom once, so that every atom occurs
+    whenever there are leaves enough.
+
+    The same seed always gives the same formula. Formulas are built without
+    recursion, so neither size nor depth is limited by the Python stack.
+    '''
+
+    def __init__(self, modalDepth=3, numAtoms=4, size=50, diamondRatio=0.5, seed=0, modalRatio=0.3, negationRatio=0.1):
+        if size < modalDepth:
+            raise ValueError("A formula of modal depth "+str(modalDepth)+" needs at least as many connectives, not "+str(size))
+        if numAtoms < 1:
+            raise ValueError("A formula needs at least one atom")
+        self.modalDepth = modalDepth
+        self.numAtoms = numAtoms
+        self.size = size
+        self.diamondRatio = diamondRatio
+        self.modalRatio = modalRatio
+        self.negationRatio = negationRatio
+        self.seed = seed
+
+    def generate(self):
+        '''
+        The formula, as nested tuples.
+        '''
+        r = random.Random(self.seed)
+        atoms = [str(i) for i in range(1, self.numAtoms+1)]
+        r.shuffle(atoms)
+        numLeaves = 0
+        operands = []
+        # ('build', connectives, modal depth allowed, whether it must be reached) or ('make', connective, arity)
+        tasks = [('build', self.size, self.modalDepth, True)]
+        while tasks:
+            task = tasks.pop()
+            if task[0] == 'make':
+                connective, arity = task[1], task[2]
+                made = (connective,)+tuple(operands[-arity:])
+                del operands[-arity:]
+                operands.append(made)
+                continue
+            n, depth, exact = task[1], task[2], task[3]
+            if n == 0:
+                operands.append(('atom', atoms[numLeaves] if numLeaves < len(atoms) else r.choice(atoms)))
+                numLeaves += 1
+                continue
+            connective = self.chooseConnective(r, n, depth, exact)
+            if connective in ('Box', 'Diamond'):
+                tasks.append(('make', connective, 1))
+                tasks.append(('build', n-1, depth-1, exact))
+            elif connective == 'Not':
+                tasks.append(('make', connective, 1))
+                tasks.append(('build', n-1, depth, exact))
+            else:
+                rest = n-1
+                exactLeft = exact and r.random() < 0.5
+                if exactLeft:
+                    left = r.randint(depth, rest)
+                elif exact:
+                    left = r.randint(0, rest-depth)
+                else:
+                    left = r.randint(0, rest)
+                tasks.append(('make', connective, 2))
+                tasks.append(('build', rest-left, depth, exact and not exactLeft))
+                tasks.append(('build', left, depth, exactLeft))
+        return operands[0]
+
+    def chooseConnective(self, r, n, depth, exact):
+        '''
+        The connective of a subformula given n > 0 connectives, of which a
+        path must hold depth modal ones if exact, and may hold at most depth.
+        '''
+        if exact and n == depth:
+            modal = True
+        elif depth == 0:
+            modal = False
+        else:
+            modal = r.random() < self.modalRatio
+        if modal:
+            return 'Diamond' if r.random() < self.diamondRatio else 'Box'
+        if r.random() < self.negationRatio:
+            return 'Not'
+        return r.choice(binaryPredicates)
+
+    def instanceText(self, shareSubformulas=True):
+        '''
+        The text of the instance file of the formula.
+        '''
+        return '\n'.join(instanceGenerator(self.generate(), shareSubformulas).instanceLines())+'\n'
+
+
+def formulaText(formula):
+    '''
+    The formula in the syntax of the Logic Work Bench, fully parenthesised,
+    which parseFormula reads back as the same nested tuples.
+    '''
+    pieces = []
+    tasks = [formula]
+    while tasks:
+        task = tasks.pop()
+        if isinstance(task, str):
+            pieces.append(task)
+        elif task[0] == 'atom':
+            pieces.append('p'+task[1])
+        elif task[0] in ('true', 'false'):
+            pieces.append(task[0])
+        elif len(task) == 2:
+            tasks.extend([')', task[1], lwbSymbols[task[0]]+'('])
+        else:
+            tasks.extend([')', task[2], ' '+lwbSymbols[task[0]]+' ', task[1], '('])
+    return ''.join(pieces)
+
+
+def generateInstanceFiles(outputDir, count, seed=0, shareSubformulas=True, **parameters):
+    '''
+    Writes the instance files of count formulas, with the seeds seed,
+    seed+1, ..., to <outputDir>/synthetic-<seed>.I, each alongside the
+    formula itself in <outputDir>/synthetic-<seed>.lwb. The parameters are
+    those of formulaGenerator. Returns the names of the instance files.
+    '''
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+    fileNames = []
+    for k in range(seed, seed+count):
+        generator = formulaGenerator(seed=k, **parameters)
+        formula = generator.generate()
+        fileNames.append('synthetic-'+str(k)+'.I')
+        with open(os.path.join(outputDir, fileNames[-1]), 'w') as instanceFile:
+            instanceFile.write('\n'.join(instanceGenerator(formula, shareSubformulas).instanceLines())+'\n')
+        with open(os.path.join(outputDir, 'synthetic-'+str(k)+'.lwb'), 'w') as formulaFile:
+            formulaFile.write(formulaText(formula)+'\n')
+    return fileNames
+
+'''
+Testing
+'''
+@plac.annotations(
+    modalDepth=("exact modal depth of the formula", 'option', None, int),
+    numAtoms=("number of distinct atoms", 'option', None, int),
+    size=("number of connectives", 'option', None, int),
+    diamondRatio=("fraction of the modal connectives which are diamonds", 'option', None, float),
+    modalRatio=("probability that a connective is modal, where it may be either", 'option', None, float),
+    seed=("seed of the first formula", 'option', None, int),
+    count=("number of formulas to generate", 'option', None, int),
+    outputDir=("directory to write the instance files to; printed instead if empty", 'option', None, str),
+    treeInstance=("number every occurrence of a subformula separately", 'flag', None))
+def main(modalDepth=3, numAtoms=4, size=30, diamondRatio=0.5, modalRatio=0.3, seed=0, count=1, outputDir='', treeInstance=False):
+    parameters = dict(modalDepth=modalDepth, numAtoms=numAtoms, size=size, diamondRatio=diamondRatio, modalRatio=modalRatio)
+    if outputDir != '':
+        fileNames = generateInstanceFiles(outputDir, count, seed, not treeInstance, **parameters)
+        print("Wrote "+str(len(fileNames))+" instance files to "+outputDir)
+        return
+    for k in range(seed, seed+count):
+        generator = formulaGenerator(seed=k, **parameters)
+        print(formulaText(generator.generate()))
+        print(generator.instanceText(not treeInstance))
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -0,0 +1,242 @@
+"""
+Created on Oct 18, 2026
+
+Rewrites a parsed formula into an equivalent one with fewer subformulas,
+before its instance file is generated.
+"""
+import plac
+
+# connective -> the connective it becomes under a negation pushed through it
+duals = {'And': 'Or', 'Or': 'And', 'Box': 'Diamond', 'Diamond': 'Box'}
+
+class formulaSimplifier(object):
+    '''
+    The formula is first interned: every subformula becomes a node of a
+    hash-consing table, keyed by its connective and the nodes of its
+    operands, so that identical subformulas are one node and are compared in
+    constant time. A single bottom-up pass then builds the simplified formula
+    in negation normal form, pushing negations down to the atoms (an
+    implication becoming a disjunction, the negation of a biconditional a
+    biconditional with one side negated, box and diamond trading places),
+    and making every node through a constructor which applies
+        constants      false & A = false, true & A = A, box true = true,
+                       dia false = false, A <-> true = A, A <-> false = ~A
+                       (~A being put in negation normal form), and dually
+        idempotence    A & A = A, A & (A & B) = A & B, and dually
+        complements    A & ~A = false, A v ~A = true, A <-> ~A = false
+        absorption     A & (A v B) = A, A v (A & B) = A
+        modal rules    box A & box B = box (A & B),
+                       dia A v dia B = dia (A v B)
+    with the operands of the commutative connectives put in a fixed order,
+    so that A & B and B & A become one node. On the way out, a disjunction
+    with a negated operand, ~A v B, is folded back into the implication
+    A -> B, which has one subformula fewer.
+
+    All of these rules are equivalences in K, and so in every normal modal
+    logic, whatever the conditions placed on the accessibility relation.
+    '''
+
+    def __init__(self, formula):
+        '''
+        Receives a formula as parsed by instanceGenerator.parseFormula.
+        '''
+        self.formula = formula
+        self.table = {}
+        self.nodes = []
+        self.negations = {}  # simplified node -> the node of its negation
+        self.false = self.intern(('false',))
+        self.true = self.intern(('true',))
+
+    def intern(self, key):
+        if key not in self.table:
+            self.table[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.table[key]
+
+    def internFormula(self, formula):
+        '''
+        Interns the nested tuples of a formula bottom-up, without recursion,
+        returning the node of the formula.
+        '''
+        interned = []  # the nodes of the subformulas finished so far, in post-order
+        stack = [(formula, False)]
+        while stack:
+            subformula, operandsDone = stack.pop()
+            if subformula[0] in ('atom', 'false', 'true'):
+                interned.append(self.intern(subformula))
+            elif not operandsDone:
+                stack.append((subformula, True))
+                stack.extend((operand, False) for operand in reversed(subformula[1:]))
+            else:
+                arity = len(subformula)-1
+                key = (subformula[0],)+tuple(interned[-arity:])
+                del interned[-arity:]
+                interned.append(self.intern(key))
+        return interned[0]
+
+    def pushNegation(self, connective, negated):
+        '''
+        The connective a subformula becomes in negation normal form, when it
+        occurs negated or not, along with whether each of its operands then
+        occurs negated.
+        '''
+        if connective == 'Not':
+            return None, (not negated,)
+        if connective == 'Implication':
+            return ('And', (False, True)) if negated else ('Or', (True, False))
+        if connective == 'Biconditional':
+            return 'Biconditional', (False, negated)
+        if connective in ('And', 'Or'):
+            return (duals[connective] if negated else connective), (negated, negated)
+        return (duals[connective] if negated else connective), (negated,)
+
+    def simplify(self):
+        '''
+        Returns the simplified formula, as nested tuples in the form given by
+        parseFormula; subformulas met more than once are the same tuple.
+        '''
+        root = self.internFormula(self.formula)
+        simplified = {}  # (node, negated) -> simplified node
+        stack = [(root, False, False)]
+        while stack:
+            node, negated, operandsDone = stack.pop()
+            if (node, negated) in simplified:
+                continue
+            key = self.nodes[node]
+            if key[0] == 'atom':
+                simplified[(node, negated)] = self.intern(('Not', node)) if negated else node
+                continue
+            if key[0] in ('false', 'true'):
+                simplified[(node, negated)] = self.true if (key[0] == 'false') == negated else self.false
+                continue
+            connective, operandNegations = self.pushNegation(key[0], negated)
+            operands = tuple(zip(key[1:], operandNegations))
+            if not operandsDone:
+                stack.append((node, negated, True))
+                stack.extend((operand, operandNegated, False) for operand, operandNegated in operands if (operand, operandNegated) not in simplified)
+                continue
+            if connective is None:
+                simplified[(node, negated)] = simplified[operands[0]]
+            else:
+                simplified[(node, negated)] = self.make(connective, tuple(simplified[operand] for operand in operands))
+        return self.toFormula(simplified[(root, False)])
+
+    def complementary(self, x, y):
+        return self.nodes[x] == ('Not', y) or self.nodes[y] == ('Not', x)
+
+    def make(self, connective, operands):
+        if connective in ('And', 'Or'):
+            return self.makeJunction(connective, operands[0], operands[1])
+        if connective == 'Biconditional':
+            x, y = operands
+            if x == y:
+                return self.true
+            if self.complementary(x, y):
+                return self.false
+            if x == self.true:
+                return y
+            if y == self.true:
+                return x
+            if x == self.false:
+                return self.negate(y)
+            if y == self.false:
+                return self.negate(x)
+            return self.intern(('Biconditional', min(x, y), max(x, y)))
+        if connective == 'Box' and operands[0] == self.true:
+            return self.true
+        if connective == 'Diamond' and operands[0] == self.false:
+            return self.false
+        return self.intern((connective,)+operands)
+
+    def negate(self, root):
+        '''
+        The node of the negation of a simplified node, in negation normal
+        form like it, built without recursion.
+        '''
+        stack = [(root, False)]
+        while stack:
+            node, operandsDone = stack.pop()
+            if node in self.negations:
+                continue
+            key = self.nodes[node]
+            if key[0] == 'atom':
+                self.negations[node] = self.intern(('Not', node))
+            elif key[0] == 'Not':
+                self.negations[node] = key[1]
+            elif key[0] in ('false', 'true'):
+                self.negations[node] = self.true if key[0] == 'false' else self.false
+            elif not operandsDone:
+                stack.append((node, True))
+                # a biconditional is negated by negating one side
+                negatedOperands = key[2:] if key[0] == 'Biconditional' else key[1:]
+                stack.extend((operand, False) for operand in negatedOperands if operand not in self.negations)
+            elif key[0] == 'Biconditional':
+                self.negations[node] = self.make('Biconditional', (key[1], self.negations[key[2]]))
+            else:
+                self.negations[node] = self.make(duals[key[0]], tuple(self.negations[operand] for operand in key[1:]))
+        return self.negations[root]
+
+    def makeJunction(self, connective, x, y):
+        '''
+        Makes the conjunction (or disjunction) of nodes x and y.
+        '''
+        unit, zero = (self.true, self.false) if connective == 'And' else (self.false, self.true)
+        if x == zero or y == zero or self.complementary(x, y):
+            return zero
+        if x == unit or x == y:
+            return y
+        if y == unit:
+            return x
+        for a, b in ((x, y), (y, x)):
+            if a in self.nodes[b][1:]:
+                if self.nodes[b][0] == duals[connective]:
+                    return a  # absorption
+                if self.nodes[b][0] == connective:
+                    return b  # idempotence
+
+        # box A & box B = box (A & B), peeling off any boxes the two have in common
+        modal = 'Box' if connective == 'And' else 'Diamond'
+        depth = 0
+        while self.nodes[x][0] == modal and self.nodes[y][0] == modal:
+            x, y = self.nodes[x][1], self.nodes[y][1]
+            depth += 1
+        if depth:
+            junction = self.makeJunction(connective, x, y)
+            for level in range(depth):
+                junction = self.make(modal, (junction,))
+            return junction
+        return self.intern((connective, min(x, y), max(x, y)))
+
+    def toFormula(self, root):
+        '''
+        Turns the nodes under root back into nested tuples, folding ~A v B
+        into A -> B.
+        '''
+        formulas = {}
+        stack = [(root, False)]
+        while stack:
+            node, operandsDone = stack.pop()
+            if node in formulas:
+                continue
+            key = self.nodes[node]
+            if key[0] in ('atom', 'false', 'true'):
+                formulas[node] = key
+            elif not operandsDone:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(key[1:]) if operand not in formulas)
+            elif key[0] == 'Or' and (self.nodes[key[1]][0] == 'Not' or self.nodes[key[2]][0] == 'Not'):
+                negated, other = (key[1], key[2]) if self.nodes[key[1]][0] == 'Not' else (key[2], key[1])
+                formulas[node] = ('Implication', formulas[self.nodes[negated][1]], formulas[other])
+            else:
+                formulas[node] = (key[0],)+tuple(formulas[operand] for operand in key[1:])
+        return formulas[root]
+
+'''
+Testing
+'''
+def main(formula='~~(p1 & p1) & (box true v dia ~(p2 -> p3)) & (box p4 & box ~~p2)'):
+    from instanceGenerator import parseFormula
+    print(formulaSimplifier(parseFormula(formula)).simplify())
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -0,0 +1,217 @@
+"""
+Created on Oct 18, 2026
+
+Recognises the standard conditions on the accessibility relation among the
+statements of a conditions file given to insertRelationConditions.
+"""
+import re, itertools
+import plac
+
+# condition -> (antecedent atoms, consequent atom, existential variables), over
+# the variables x, y, z; existential variables are bound after the universal ones
+patterns = {
+    'reflexive': ((), ('x', 'x'), ()),
+    'serial': ((), ('x', 'y'), ('y',)),
+    'symmetric': ((('x', 'y'),), ('y', 'x'), ()),
+    'transitive': ((('x', 'y'), ('y', 'z')), ('x', 'z'), ()),
+    'euclidean': ((('x', 'y'), ('x', 'z')), ('y', 'z'), ()),
+}
+
+# the conditions each set of conditions brings with it
+implications = [
+    (('reflexive',), 'serial'),
+    (('symmetric', 'transitive'), 'euclidean'),
+    (('symmetric', 'euclidean'), 'transitive'),
+    (('reflexive', 'euclidean'), 'symmetric'),
+    (('serial', 'symmetric', 'transitive'), 'reflexive'),
+    (('serial', 'symmetric', 'euclidean'), 'reflexive'),
+]
+
+logicNames = {
+    frozenset(): 'K',
+    frozenset(['serial']): 'KD',
+    frozenset(['reflexive', 'serial']): 'KT',
+    frozenset(['symmetric']): 'KB',
+    frozenset(['transitive']): 'K4',
+    frozenset(['euclidean']): 'K5',
+    frozenset(['serial', 'transitive']): 'KD4',
+    frozenset(['serial', 'euclidean']): 'KD5',
+    frozenset(['serial', 'symmetric']): 'KDB',
+    frozenset(['reflexive', 'serial', 'symmetric']): 'KTB',
+    frozenset(['reflexive', 'serial', 'transitive']): 'S4',
+    frozenset(['transitive', 'euclidean']): 'K45',
+    frozenset(['serial', 'transitive', 'euclidean']): 'KD45',
+    frozenset(['symmetric', 'transitive', 'euclidean']): 'KB5',
+    frozenset(['reflexive', 'serial', 'symmetric', 'transitive', 'euclidean']): 'S5',
+}
+
+accessibleAtom = re.compile(r'Accessible\s*\(\s*(\w+)\s*,\s*(\w+)\s*\)')
+
+class frameConditions(object):
+    '''
+    Each statement of the conditions file (statements end with a full stop;
+    lines starting with // or % are comments) is matched against the
+    first-order correspondents of the standard axioms:
+        reflexive    all x: Accessible(x,x)                                  T
+        serial       all x: some y: Accessible(x,y)                          D
+        symmetric    all x,y: Accessible(x,y) => Accessible(y,x)             B
+        transitive   all x,y,z: Accessible(x,y) & Accessible(y,z) => Accessible(x,z)    4
+        euclidean    all x,y,z: Accessible(x,y) & Accessible(x,z) => Accessible(y,z)    5
+    up to the names of the variables and the order of the conjuncts. Either
+    Enfragmo's quantifiers (! and ?) or the words FORALL and EXISTS may be
+    used, and either => or -> for the implication. Every variable must be
+    bound by the quantifier shown, in that order, so that e.g.
+    ! x : ? y : Accessible(y,x), which gives every world a predecessor, is
+    not taken to be seriality. A statement with a negation, a disjunction
+    or a biconditional in it, or one which is none of the above, is left
+    unrecognised.
+
+    The recognised conditions are closed under the implications between
+    them (a reflexive relation is serial, a symmetric and transitive one
+    euclidean, ...), which names the logic. The driver only relies on the
+    conditions when every statement of the file was recognised, since an
+    unrecognised one may restrict the models in any way at all.
+    '''
+
+    def __init__(self, conditionsFilePath):
+        self.conditionsFilePath = conditionsFilePath
+        self.recognised = set()
+        self.unrecognised = []
+        with open(conditionsFilePath) as conditionsFile:
+            lines = [line.strip() for line in conditionsFile if not line.strip().startswith(('//', '%'))]
+        for statement in ' '.join(lines).split('.'):
+            if statement.strip() == '':
+                continue
+            condition = recogniseCondition(statement)
+            if condition is None:
+                self.unrecognised.append(statement.strip())
+            else:
+                self.recognised.add(condition)
+        self.closure = closeConditions(self.recognised)
+
+    def allRecognised(self):
+        return not self.unrecognised
+
+    def logicName(self):
+        '''
+        The usual name of the logic of the frames, if every condition was
+        recognised and the set of conditions has one; None otherwise.
+        '''
+        if not self.allRecognised():
+            return None
+        return logicNames.get(self.closure)
+
+    def violated(self, KM):
+        '''
+        The recognised conditions which the accessibility relation of the
+        KripkeStructure KM fails to satisfy.
+        '''
+        successors = KM.successors
+        failing = []
+        for condition in sorted(self.closure):
+            for u, uSuccessors in enumerate(successors):
+                worlds = [v for v in range(len(successors)) if uSuccessors >> v & 1]
+                if condition == 'reflexive':
+                    holds = uSuccessors >> u & 1
+                elif condition == 'serial':
+                    holds = uSuccessors != 0
+                elif condition == 'symmetric':
+                    holds = all(successors[v] >> u & 1 for v in worlds)
+                elif condition == 'transitive':
+                    holds = all(successors[v] & ~uSuccessors == 0 for v in worlds)
+                else:
+                    holds = all(uSuccessors & ~successors[v] == 0 for v in worlds)
+                if not holds:
+                    failing.append(condition)
+                    break
+        return failing
+
+
+def recogniseCondition(statement):
+    '''
+    The name of the standard condition the statement expresses, or None.
+    '''
+    if re.search(r'~|<=>|<->|\||\bNOT\b|\bOR\b', statement, re.IGNORECASE):
+        return None
+    parts = re.split(r'=>|->', statement)
+    if len(parts) > 2:
+        return None
+    antecedent = tuple(accessibleAtom.findall(parts[0])) if len(parts) == 2 else ()
+    consequent = accessibleAtom.findall(parts[-1])
+    if len(consequent) != 1:
+        return None
+    prefix = quantifierPrefix(statement)
+    for condition, (patternAntecedent, patternConsequent, patternExistentials) in patterns.items():
+        if matchesPattern(antecedent, consequent[0], patternAntecedent, patternConsequent, prefix, patternExistentials):
+            return condition
+    return None
+
+
+def quantifierPrefix(statement):
+    '''
+    The variables the quantifiers of the statement bind, in order, each with
+    whether it is bound existentially; any other word after a quantifier
+    (such as the type World) is listed too, and never matches a variable.
+    '''
+    prefix = []
+    existential = False
+    for token in re.findall(r'!|\?|\w+', accessibleAtom.sub(' ', statement)):
+        if token == '!' or token.upper() == 'FORALL':
+            existential = False
+        elif token == '?' or token.upper() == 'EXISTS':
+            existential = True
+        else:
+            prefix.append((token, existential))
+    return prefix
+
+
+def matchesPattern(antecedent, consequent, patternAntecedent, patternConsequent, prefix, patternExistentials=()):
+    '''
+    Whether some renaming of the variables of the pattern onto those of the
+    statement turns the one into the other, taking the antecedent as a set,
+    where the quantifier prefix binds each variable once, existentially
+    just when the pattern does, and the existential ones last.
+    '''
+    variables = sorted(set(itertools.chain(consequent, *antecedent)))
+    patternVariables = sorted(set(itertools.chain(patternConsequent, *patternAntecedent)))
+    if len(variables) != len(patternVariables) or len(antecedent) != len(patternAntecedent):
+        return False
+    bound = [(token, existential) for token, existential in prefix if token in variables]
+    if sorted(token for token, existential in bound) != variables:
+        return False
+    kinds = [existential for token, existential in bound]
+    if kinds != sorted(kinds):
+        return False
+    for renaming in itertools.permutations(variables):
+        rename = dict(zip(patternVariables, renaming))
+        existentials = set(rename[v] for v in patternExistentials)
+        if any(existential != (token in existentials) for token, existential in bound):
+            continue
+        if tuple(rename[v] for v in patternConsequent) == consequent and set(tuple(rename[v] for v in atom) for atom in patternAntecedent) == set(antecedent):
+            return True
+    return False
+
+
+def closeConditions(conditions):
+    closure = set(conditions)
+    changed = True
+    while changed:
+        changed = False
+        for premises, conclusion in implications:
+            if conclusion not in closure and all(premise in closure for premise in premises):
+                closure.add(conclusion)
+                changed = True
+    return frozenset(closure)
+
+'''
+Testing
+'''
+def main(conditionsFilePath='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Theory Files/Single Modality/S5Conditions.T'):
+    conditions = frameConditions(conditionsFilePath)
+    print("Recognised: "+', '.join(sorted(conditions.recognised)))
+    print("Closed under implication: "+', '.join(sorted(conditions.closure))+" ("+str(conditions.logicName())+")")
+    for statement in conditions.unrecognised:
+        print("Not recognised: "+statement)
+
+if __name__ == "__main__":
+    plac.call(main)
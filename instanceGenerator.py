@@ -0,0 +1,347 @@
+"""
+Created on Oct 18, 2026
+
+Parses modal formulas written in the syntax of the Logic Work Bench and
+writes them out as Enfragmo problem instance files.
+"""
+import os, re, plac
+import multiprocessing, functools
+from formulaSimplifier import formulaSimplifier
+
+# one token per match: an atom (with or without its leading p), a connective, a constant or a bracket
+lwbTokenRegex = re.compile(r'\s*(?:(p?\d+)|(<->|->|&|v|~|box|dia|true|false|\(|\)))')
+
+unaryConnectives = {'~': 'Not', 'box': 'Box', 'dia': 'Diamond'}
+# binary connective -> (predicate, precedence, right associative)
+binaryConnectives = {
+    '&': ('And', 4, False),
+    'v': ('Or', 3, False),
+    '->': ('Implication', 2, True),
+    '<->': ('Biconditional', 1, False),
+}
+
+# the order in which predicates are listed in an instance file; Falsum must
+# follow Atom, since the verifier takes any singleton below a Falsum header
+# to be a falsum, and SameAtom must come last
+predicateOrder = ['Atom', 'And', 'Or', 'Not', 'Implication', 'Biconditional', 'Box', 'Diamond', 'Falsum', 'SameAtom']
+optionalPredicates = ('Biconditional', 'Falsum')  # only listed when the formula uses them
+
+
+def tokenize(formula):
+    '''
+    Splits a formula into its tokens, atoms being given by their number
+    alone. Raises ValueError on anything that is not a token.
+    '''
+    tokens = []
+    position = 0
+    formula = formula.rstrip()
+    while position < len(formula):
+        match = lwbTokenRegex.match(formula, position)
+        if match is None:
+            raise ValueError("Unexpected character in formula at position "+str(position)+": "+formula[position:position+10])
+        tokens.append(match.group(1).lstrip('p') if match.group(1) is not None else match.group(2))
+        position = match.end()
+    return tokens
+
+
+def parseFormula(formula):
+    '''
+    Parses an LWB formula into nested tuples, by operator precedence
+    without recursion, so that deeply nested formulas are no problem:
+        ('atom', '3'), ('false',), ('true',),
+        ('Not', A), ('Box', A), ('Diamond', A),
+        ('And', A, B), ('Or', A, B), ('Implication', A, B), ('Biconditional', A, B)
+    Unary connectives bind tightest, then &, v, -> and <->, in that order;
+    -> associates to the right and the others to the left.
+    '''
+    operands = []
+    operators = []
+
+    def reduce():
+        operator = operators.pop()
+        if operator in unaryConnectives:
+            if not operands:
+                raise ValueError("Missing operand of "+operator+" in formula: "+formula)
+            operands.append((unaryConnectives[operator], operands.pop()))
+        else:
+            if len(operands) < 2:
+                raise ValueError("Missing operand of "+operator+" in formula: "+formula)
+            right = operands.pop()
+            operands.append((binaryConnectives[operator][0], operands.pop(), right))
+
+    for token in tokenize(formula):
+        if token.isdigit():
+            operands.append(('atom', token))
+        elif token in ('true', 'false'):
+            operands.append((token,))
+        elif token == '(' or token in unaryConnectives:
+            operators.append(token)
+        elif token == ')':
+            while operators and operators[-1] != '(':
+                reduce()
+            if not operators:
+                raise ValueError("Unbalanced ')' in formula: "+formula)
+            operators.pop()
+        else:
+            predicate, precedence, rightAssociative = binaryConnectives[token]
+            while operators and operators[-1] != '(':
+                top = operators[-1]
+                topPrecedence = 5 if top in unaryConnectives else binaryConnectives[top][1]
+                if topPrecedence > precedence or (topPrecedence == precedence and not rightAssociative):
+                    reduce()
+                else:
+                    break
+            operators.append(token)
+
+    while operators:
+        if operators[-1] == '(':
+            raise ValueError("Unbalanced '(' in formula: "+formula)
+        reduce()
+    if len(operands) != 1:
+        raise ValueError("Malformed formula: "+formula)
+    return operands[0]
+
+
+class instanceGenerator(object):
+    '''
+    Numbers the subformulas of a parsed formula in pre-order, the formula
+    itself being subformula 1, and lists them under the predicates of the
+    format the verifier reads:
+        Atom (i)  /  Falsum (i)          i is an atom / falsum
+        Not, Box, Diamond (i, j)         i is the connective applied to j
+        And, Or, Implication,
+        Biconditional (i, j, k)          i is j and k joined by the connective
+        SameAtom (i, j)                  i and j are occurrences of one atom
+    The constant true is written as the negation of a falsum.
+
+    By default the subformulas are hash-consed: structurally identical
+    subformulas share one number, so the instance describes a DAG rather
+    than the syntax tree, each atom is a single subformula and SameAtom is
+    left empty. Since Enfragmo grounds its theory over the Subformula type,
+    this shrinks the grounding considerably for formulas which repeat
+    themselves, as the LWB formulas do. Otherwise every occurrence of a
+    subformula gets a number of its own, each occurrence of an atom being
+    tied to the first occurrence of that atom through SameAtom.
+    '''
+
+    def __init__(self, formula, shareSubformulas=True):
+        '''
+        Receives a formula as parsed by parseFormula.
+        '''
+        self.formula = formula
+        self.tuples = dict((predicate, []) for predicate in predicateOrder)
+        self.numSubformulas = 0
+        self.atomNumbers = {}  # atom -> the subformula of its first occurrence
+        if shareSubformulas:
+            self.numberSharedSubformulas()
+        else:
+            self.numberSubformulas()
+
+    def numberSubformulas(self):
+        firstOccurrence = self.atomNumbers
+        stack = [(self.formula, None)]  # (subformula, operand list of its parent's tuple)
+        while stack:
+            subformula, parentOperands = stack.pop()
+            self.numSubformulas += 1
+            i = self.numSubformulas
+            if parentOperands is not None:
+                parentOperands.append(i)
+
+            connective = subformula[0]
+            if connective == 'atom':
+                self.tuples['Atom'].append([i])
+                if subformula[1] in firstOccurrence:
+                    self.tuples['SameAtom'].append([firstOccurrence[subformula[1]], i])
+                else:
+                    firstOccurrence[subformula[1]] = i
+            elif connective == 'false':
+                self.tuples['Falsum'].append([i])
+            elif connective == 'true':
+                self.tuples['Not'].append([i])
+                stack.append((('false',), self.tuples['Not'][-1]))
+            else:
+                self.tuples[connective].append([i])
+                # operands are pushed in reverse so that the first one is numbered next
+                for operand in reversed(subformula[1:]):
+                    stack.append((operand, self.tuples[connective][-1]))
+
+    def internSubformulas(self):
+        '''
+        Hash-consing: the subformulas are interned bottom-up in a table keyed
+        by their connective and the nodes of their operands, so that each key
+        is hashed in constant time and structurally identical subformulas
+        become one node. Returns the node of the formula and the list of
+        nodes, each given by its key:
+            ('atom', name), ('false',), (connective, operand node, ...)
+        '''
+        table = {}
+        nodes = []
+        interned = []  # the nodes of the subformulas finished so far, in post-order
+        stack = [(self.formula, False)]
+        while stack:
+            subformula, operandsDone = stack.pop()
+            connective = subformula[0]
+            if connective == 'true':
+                stack.append((('Not', ('false',)), False))
+                continue
+            if connective in ('atom', 'false'):
+                key = subformula
+            elif not operandsDone:
+                stack.append((subformula, True))
+                stack.extend((operand, False) for operand in reversed(subformula[1:]))
+                continue
+            else:
+                arity = len(subformula)-1
+                key = (connective,)+tuple(interned[-arity:])
+                del interned[-arity:]
+            if key not in table:
+                table[key] = len(nodes)
+                nodes.append(key)
+            interned.append(table[key])
+        return interned[0], nodes
+
+    def numberSharedSubformulas(self):
+        '''
+        Numbers the nodes of the DAG in pre-order of their first occurrence.
+        A shared subformula is numbered below the first subformula having it
+        as an operand, so an operand may carry a smaller number than some of
+        the subformulas it is an operand of.
+        '''
+        root, nodes = self.internSubformulas()
+        number = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node in number:
+                continue
+            self.numSubformulas += 1
+            number[node] = self.numSubformulas
+            key = nodes[node]
+            if key[0] not in ('atom', 'false'):
+                stack.extend(reversed(key[1:]))
+
+        for node, i in number.items():
+            key = nodes[node]
+            if key[0] == 'atom':
+                self.tuples['Atom'].append([i])
+                self.atomNumbers[key[1]] = i
+            elif key[0] == 'false':
+                self.tuples['Falsum'].append([i])
+            else:
+                self.tuples[key[0]].append([i]+[number[operand] for operand in key[1:]])
+
+    def instanceLines(self, numWorlds=1):
+        lines = ['TYPE  Subformula [ 1.. '+str(self.numSubformulas)+']', 'TYPE World [1.. '+str(numWorlds)+']']
+        for predicate in predicateOrder:
+            if predicate in optionalPredicates and not self.tuples[predicate]:
+                continue
+            lines.append('PREDICATE '+predicate)
+            lines.extend('('+','.join(str(i) for i in subformulas)+')' for subformulas in sorted(self.tuples[predicate]))
+        return lines
+
+
+def formulaToInstance(formula, shareSubformulas=True):
+    '''
+    The text of the instance file for one LWB formula, as written.
+    '''
+    return '\n'.join(instanceGenerator(parseFormula(formula), shareSubformulas).instanceLines())+'\n'
+
+
+def generateInstance(formula, shareSubformulas=True, simplify=True):
+    '''
+    Generates the instance file for one LWB formula, from the formula as
+    simplified by formulaSimplifier unless simplify is False; a top-level
+    function so that worker processes can be handed it. The simplified
+    formula is only used if it has fewer subformulas than the original.
+
+    Returns the text of the instance file, the text of the file recording
+    the original formula (None if the formula is used as written), and the
+    number of subformulas of the original and of the instance.
+    '''
+    parsed = parseFormula(formula)
+    original = instanceGenerator(parsed, shareSubformulas)
+    if simplify:
+        simplified = instanceGenerator(formulaSimplifier(parsed).simplify(), shareSubformulas)
+        if simplified.numSubformulas < original.numSubformulas:
+            originalLines = ['FORMULA '+formula.strip()]
+            originalLines.extend('ATOM '+atom+' '+str(i) for atom, i in sorted(simplified.atomNumbers.items()))
+            return '\n'.join(simplified.instanceLines())+'\n', '\n'.join(originalLines)+'\n', original.numSubformulas, simplified.numSubformulas
+    return '\n'.join(original.instanceLines())+'\n', None, original.numSubformulas, original.numSubformulas
+
+
+def readOriginalFormula(originalFilePath):
+    '''
+    Reads the file written alongside the instance file of a simplified
+    formula, which gives the formula as originally written on a line
+        FORMULA <LWB formula>
+    followed by a line
+        ATOM <atom> <subformula>
+    for every atom left in the simplified formula, giving its subformula
+    in the instance. Returns the formula and the dictionary of atoms.
+    '''
+    formula, atomNumbers = None, {}
+    for line in open(originalFilePath):
+        fields = line.split()
+        if fields and fields[0] == 'FORMULA':
+            formula = line.strip()[len('FORMULA '):]
+        elif fields and fields[0] == 'ATOM':
+            atomNumbers[fields[1]] = int(fields[2])
+    return formula, atomNumbers
+
+
+def generateInstanceFiles(formulas, outputDir, stem, numWorkers=1, shareSubformulas=True, simplify=True):
+    '''
+    Writes the instance file of the k-th formula to <outputDir>/<stem>-k.I,
+    parsing the formulas across numWorkers processes when more than one.
+    Where a formula was simplified, the original formula is recorded in
+    <outputDir>/<stem>-k.original, so that models can be checked against
+    it. Returns the names of the instance files written.
+    '''
+    toInstance = functools.partial(generateInstance, shareSubformulas=shareSubformulas, simplify=simplify)
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+    if numWorkers > 1:
+        pool = multiprocessing.Pool(numWorkers)
+        instances = pool.imap(toInstance, formulas, chunksize=max(1, len(formulas) // (4*numWorkers)))
+    else:
+        pool = None
+        instances = map(toInstance, formulas)
+
+    fileNames = []
+    totalBefore = totalAfter = 0
+    try:
+        for k, (instance, original, numBefore, numAfter) in enumerate(instances, 1):
+            fileNames.append(stem+'-'+str(k)+'.I')
+            with open(outputDir+fileNames[-1], 'w') as instanceFile:
+                instanceFile.write(instance)
+            originalFilePath = outputDir+stem+'-'+str(k)+'.original'
+            if original is not None:
+                with open(originalFilePath, 'w') as originalFile:
+                    originalFile.write(original)
+            elif os.path.exists(originalFilePath):
+                os.remove(originalFilePath)
+            totalBefore += numBefore
+            totalAfter += numAfter
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if simplify:
+        print("Simplification removed "+str(totalBefore-totalAfter)+" of the "+str(totalBefore)+" subformulas of "+stem+".")
+    return fileNames
+
+'''
+Testing
+'''
+@plac.annotations(
+    treeInstance=("number every occurrence of a subformula separately", 'flag', None),
+    noSimplify=("generate the instance from the formula as written", 'flag', None))
+def main(formula='(dia p1 & dia ~p1) -> box (p2 v false)', treeInstance=False, noSimplify=False):
+    instance, original, numBefore, numAfter = generateInstance(formula, not treeInstance, not noSimplify)
+    print(instance)
+    if original is not None:
+        print(original)
+        print("Simplification removed "+str(numBefore-numAfter)+" of the "+str(numBefore)+" subformulas.")
+
+if __name__ == "__main__":
+    plac.call(main)
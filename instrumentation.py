@@ -0,0 +1,155 @@
+"""
+Created on Oct 18, 2026
+
+Lightweight spans timing each phase of the pipeline, shared by the driver,
+the Kripke model constructor and the verifier.
+"""
+import os, json, time, threading, resource, tracemalloc
+
+class spanRecorder(object):
+    '''
+    Each phase is wrapped in
+        with spans.span('phase', numWorlds=n):
+            ...
+    which, while the recorder is enabled, records the wall time of the phase,
+    the CPU time of the subprocesses reaped during it (i.e. of the solver
+    runs it waited for), and optionally the peak of the memory traced by
+    tracemalloc while it ran. A disabled recorder hands out one shared
+    do-nothing context manager, so instrumented code costs next to nothing
+    when nobody is watching.
+
+    Spans may nest and may be opened from several threads at once. Memory
+    peaks are those of the whole process, since tracemalloc has only the one
+    peak; the peak of a nested span is folded into the spans enclosing it.
+    '''
+
+    def __init__(self):
+        self.enabled = False
+        self.traceMemory = False
+        self.records = []
+        self.lock = threading.Lock()
+        self.openSpans = threading.local()
+        self.nullSpan = nullSpan()
+
+    def enable(self, traceMemory=False):
+        self.enabled = True
+        self.traceMemory = traceMemory
+        if traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.traceMemory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.traceMemory = False
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return self.nullSpan
+        return phaseSpan(self, name, attributes)
+
+    def recordTime(self, name, wall, **attributes):
+        '''
+        Records a phase whose time was accumulated piecemeal rather than
+        spent in one stretch, e.g. parsing interleaved with reading a pipe.
+        '''
+        if self.enabled:
+            self.record(dict(attributes, span=name, start=time.time()-wall, wall=wall, childCpu=0.0))
+
+    def stack(self):
+        if not hasattr(self.openSpans, 'stack'):
+            self.openSpans.stack = []
+        return self.openSpans.stack
+
+    def record(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def takeRecords(self):
+        with self.lock:
+            records, self.records = self.records, []
+        return records
+
+    def writeTrace(self, traceFilePath, records, **context):
+        '''
+        Appends one JSON line per span, each carrying the given context (e.g.
+        the instance file), so the workers of a batch run may share a file.
+        '''
+        if not os.path.exists(os.path.dirname(traceFilePath)):
+            os.makedirs(os.path.dirname(traceFilePath))
+        with open(traceFilePath, 'a') as traceFile:
+            traceFile.write(''.join(json.dumps(dict(context, **record), sort_keys=True)+'\n' for record in records))
+
+    def printReport(self, records, title=''):
+        '''
+        Aggregates the spans by phase: how often each ran, its total and
+        longest wall time, the subprocess CPU time within it, and its peak
+        traced memory.
+        '''
+        phases = {}
+        for record in records:
+            phase = phases.setdefault(record['span'], [0, 0.0, 0.0, 0.0, None])
+            phase[0] += 1
+            phase[1] += record['wall']
+            phase[2] = max(phase[2], record['wall'])
+            phase[3] += record['childCpu']
+            if 'peakBytes' in record:
+                phase[4] = max(phase[4] or 0, record['peakBytes'])
+        nameWidth = max([len('Phase')]+[len(name) for name in phases])
+        print("\n"+title)
+        print('Phase'.ljust(nameWidth)+"  Count  Total (s)  Max (s)  Solver CPU (s)  Peak memory (KiB)")
+        print('-'*(nameWidth+62))
+        for name, (count, total, longest, childCpu, peakBytes) in sorted(phases.items(), key=lambda item: -item[1][1]):
+            print(name.ljust(nameWidth)+"  "+str(count).rjust(5)+"  "+("%.3f" % total).rjust(9)+"  "+("%.3f" % longest).rjust(7)+"  "+("%.3f" % childCpu).rjust(14)+"  "+('-' if peakBytes is None else str(peakBytes // 1024)).rjust(17))
+
+
+class phaseSpan(object):
+    __slots__ = ('recorder', 'name', 'attributes', 'startTime', 'startChildCpu', 'peakBytes')
+
+    def __init__(self, recorder, name, attributes):
+        self.recorder = recorder
+        self.name = name
+        self.attributes = attributes
+        self.peakBytes = 0
+
+    def __enter__(self):
+        stack = self.recorder.stack()
+        if self.recorder.traceMemory:
+            peak = tracemalloc.get_traced_memory()[1]
+            for enclosing in stack:
+                enclosing.peakBytes = max(enclosing.peakBytes, peak)
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.startChildCpu = childCpuTime()
+        self.startTime = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        wall = time.time()-self.startTime
+        record = dict(self.attributes, span=self.name, start=self.startTime, wall=wall, childCpu=childCpuTime()-self.startChildCpu)
+        stack = self.recorder.stack()
+        stack.pop()
+        if self.recorder.traceMemory:
+            self.peakBytes = max(self.peakBytes, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].peakBytes = max(stack[-1].peakBytes, self.peakBytes)
+            record['peakBytes'] = self.peakBytes
+        self.recorder.record(record)
+        return False
+
+
+class nullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+def childCpuTime():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime+usage.ru_stime
+
+
+# the recorder shared by every module of the suite; disabled until a driver enables it
+spans = spanRecorder()
@@ -3,13 +3,15 @@ Created on Jun 13, 2015
 
 @author: wandaboyer
 """
-import os
-import graphviz as gv
+import os, re, time
+from concurrent.futures import ThreadPoolExecutor
 from verifier import verifier
 import plac
 from reuseableCode import findInFile
-from reuseableCode import extractTuples
-from graphviz.dot import Digraph
+from reuseableCode import predicateExtractor
+from instrumentation import spans
+
+statusTagRegex = re.compile(r'<(Satisfiable|Unsatisfiable)\s*/>')
 
 class kripkeModelConstructor(object):
     '''
@@ -28,16 +30,73 @@ class kripkeModelConstructor(object):
         self.ModelOutputDir = ModelOutputDir
         
         self.KM = KripkeStructure()
+        self.isSatisfiable = False
     
     def readEnfragmoOutput(self):
         '''
-        Opens file and reads into a list
+        Opens a previously saved Enfragmo transcript and reads it the same way
+        as a live Enfragmo run
+        '''
+        with open(self.EnfragmoOutputFilepath) as outputFile:
+            return self.readEnfragmoStream(outputFile)
+
+    def readEnfragmoStream(self, outputStream, transcriptFile=None):
+        '''
+        Consumes Enfragmo's output one line at a time as it is produced, which
+        may be the raw bytes of a stdout pipe, optionally copying each decoded
+        line to transcriptFile. The rows of the TrueAt and Accessible data sets
+        are handed to a predicateExtractor as they go by, so the output is
+        never held in memory or read a second time.
+        
+        Returns True if Enfragmo found a model. Reading stops at the first
+        status tag that is not <Satisfiable/>, since an UNSAT run has nothing
+        more to offer.
+
+        The time spent extracting tuples is interleaved with waiting on the
+        stream, so when phases are being timed it is summed line by line.
         '''
-        self.EnfragmoOutputFileLines = [line.strip() for line in open(self.EnfragmoOutputFilepath) if line != '\n']
+        self.extractor = predicateExtractor(('TrueAt', 'Accessible'))
+        self.isSatisfiable = False
+        self.statusSeen = False
+        feedLine = self.extractor.feedLine
+        if spans.enabled:
+            extractTime = [0.0]
+            def feedLine(line, untimedFeedLine=feedLine):
+                startTime = time.time()
+                untimedFeedLine(line)
+                extractTime[0] += time.time()-startTime
+
+        for line in outputStream:
+            if isinstance(line, bytes):
+                line = line.decode()
+            if transcriptFile is not None:
+                transcriptFile.write(line)
+
+            if not self.statusSeen:
+                status = statusTagRegex.search(line)
+                if status is not None:
+                    self.statusSeen = True
+                    self.isSatisfiable = status.group(1) == 'Satisfiable'
+                    if not self.isSatisfiable:
+                        break
+
+            feedLine(line)
+
+        if spans.enabled:
+            spans.recordTime('extractTuples', extractTime[0])
+        self.valuation = self.extractor.tables['TrueAt']
+        self.accessible = self.extractor.tables['Accessible']
+        return self.isSatisfiable
 
-        for line in self.EnfragmoOutputFileLines:
-            if "<Satisfiable/>" in line:
-                return True
+    def setEnfragmoResult(self, isSatisfiable, valuation, accessible):
+        '''
+        Stands in for reading Enfragmo's output when the verdict and tuples
+        are already known, e.g. from the result cache.
+        '''
+        self.isSatisfiable = isSatisfiable
+        self.statusSeen = True
+        self.valuation = valuation
+        self.accessible = accessible
     
     def parseEnfragmoOutput(self):
         self.KM.setValuation(self.readValuation())
@@ -46,17 +105,16 @@ class kripkeModelConstructor(object):
     def readAccessible(self):
         '''
         From the Enfragmo output, find the tuples dictating the accessibility 
-        relation. The result will be stored in a dictionary, with the first
-        member of the tuple appearing as the key, and the worlds it relates to
-        will appear in a list as the value:
-            R = {j: (k,l), ..., m: (n,o)} with worlds j, k, l, m, n, o in W.
+        relation. The pairs are stored flattened in an array of ints, so that
+        R = {(j,k), ..., (m,n)} with worlds j, k, m, n in W is held as
+            [j, k, ..., m, n]
         
         In the future, with multiple modalities, need to be able to use first
         argument of tuple to separate different agents from the others. 
             That is, for each agent i: R_i = {(j,k),...(l,m)} will express their
             accessibility relation with worlds j,k,l,m in W.
         '''
-        return extractTuples(self.EnfragmoOutputFileLines,"Accessible")
+        return self.accessible
         
     def readValuation(self):
         '''
@@ -69,76 +127,178 @@ class kripkeModelConstructor(object):
                 </DataSet>
             </PredicateInfo>
             
-        The data will be stored in a defaultdict, where the subformula will be the key,
-        and a list of worlds that subformula is true at will be the value:
-            R = {s_1: (k,l), ..., s_k: (n,o)} for each subformula s_i and propositional
-            atoms k,l,n,o,...
+        The (subformula, world) pairs are stored flattened in an array of ints,
+        in the order Enfragmo printed them:
+            [s_1, w_1, ..., s_k, w_k] for each subformula s_i true at world w_i
         '''
-        return extractTuples(self.EnfragmoOutputFileLines, "TrueAt") # key is world, entry is list of subformulas true at that world
+        return self.valuation
     
-    def parseInstanceFile(self):
-        verifierObject = verifier(self.InstanceFilepath)
-        verifierObject.readProblemInstanceFile()
-        verifierObject.parseProblemInstanceFile()
-        self.numWorlds = verifierObject.numWorlds()
-        self.KM.setW(verifierObject.SameAtomList,[str(i) for i in range(1, self.numWorlds+1)])
+    def parseInstanceFile(self, numWorlds=None, verifierObject=None):
+        '''
+        A caller which has already parsed the instance file may hand over its
+        verifier object, along with the number of worlds actually probed when
+        that differs from the one in the file.
+        '''
+        if verifierObject is None:
+            verifierObject = verifier(self.InstanceFilepath)
+            verifierObject.readProblemInstanceFile()
+            verifierObject.parseProblemInstanceFile()
+        self.verifierObject = verifierObject
+        self.numWorlds = numWorlds if numWorlds is not None else self.verifierObject.numWorlds()
+        with spans.span('setW', numWorlds=self.numWorlds):
+            self.KM.setW(self.verifierObject.atomLeader, self.numWorlds)
         
-    def printKripkeModel(self):
+    def printKripkeModel(self, renderer=None):
         '''
-        Take each of the components and print them out
+        Take each of the components and print them out, in the background if
+        a modelRenderer is given
         '''
         outputFile = self.ModelOutputDir+self.InstanceFilename.split('.')[0]+'-kripkeModel'
-        self.KM.displayKripkeStructure(outputFile)
+        if renderer is not None:
+            renderer.submit(self.KM, outputFile)
+        else:
+            self.KM.displayKripkeStructure(outputFile)
         
            
 class KripkeStructure(object):
     '''
     The Kripke structure will be an instance of the KripkeStructure class, which
-    will have the following components:
+    will have the following components, with world w stored at index w-1:
+        successors        per world, a bitmap of the worlds it can access
+        atomLabels        the labels of the atoms of the formula
+        worldAtoms        per world, a bitset over atomLabels of the atoms
+                          true at that world
+        subformulaWorlds  per subformula, a bitset of the worlds at which
+                          Enfragmo made it true
     
+    Everything is built in a single pass over Enfragmo's tuples; the Graphviz
+    graph is only put together when the structure is to be drawn.
     '''
-    def __init__(self):
-        self.graph = gv.Digraph(format='svg')
-        styles = {
-            'graph': {
-                'nodesep':'1.0'
-            },
-            'edges': {
-                'minlen':'2.0'
-            }
+    __slots__ = ('numWorlds', 'successors', 'atomLabels', 'worldAtoms', 'subformulaWorlds', 'valuationTable', 'accessibleTable')
+
+    styles = {
+        'graph': {
+            'nodesep':'1.0'
+        },
+        'edges': {
+            'minlen':'2.0'
         }
-        self.graph.graph_attr.update(('graph' in styles and styles['graph']) or {})
-        self.graph.edge_attr.update(('edges' in styles and styles['edges']) or {})
+    }
+
+    def __init__(self):
+        self.numWorlds = 0
+        self.successors = []
+        self.atomLabels = []
+        self.worldAtoms = []
+        self.subformulaWorlds = {}
+        self.valuationTable = ()
+        self.accessibleTable = ()
         
-    def setValuation(self, valuationDict):
-        self.__valuationMap = valuationDict
+    def setValuation(self, valuationTable):
+        self.valuationTable = valuationTable
+
+    def setAccessible(self, accessibleTable):
+        self.accessibleTable = accessibleTable
       
-    def setW(self, atoms, worldList):
-        for world in worldList:
-            if self.__valuationMap.get(world) is not None:
-                valuationLabel = set() # each world has a set of proposition letters true at that world
-                for subformula in self.__valuationMap.get(world): # key is world, so from that list of subformulas
-                    if subformula in [key for key in atoms.leader]: # if the subformula corresponds with an atom
-                        valuationLabel.add(atoms.get_leader(subformula)) # add that atom to the set of propositions true at the world
-                valuationLabel = ', '.join(valuationLabel) # reassign valuationLabel to be a string which is concatenation of elements of the former set, namely a string of all atoms true at a world
-                self.graph.node(str(world), label=valuationLabel,xlabel='w'+str(world)) #xlabel gives us the world label, label gives us the atoms true at the world.
-
-    def setAccessible(self,accessibilityDict):
-        for key, relatesTo in accessibilityDict.items():
-            for world in relatesTo:
-                self.graph.edge(str(key),str(world))
+    def setW(self, atomLeader, numWorlds):
+        '''
+        Receives the verifier's atomLeader array, giving the label of the atom
+        of every subformula which is an atom and 0 for any other, and the
+        number of worlds; builds the structure from the TrueAt and Accessible
+        tuples set beforehand. Tuples mentioning a world outside 1..numWorlds
+        are ignored.
+        '''
+        self.numWorlds = numWorlds
+        self.successors = [0]*numWorlds
+        accessible = self.accessibleTable
+        for k in range(0, len(accessible), 2):
+            if 0 < accessible[k] <= numWorlds and 0 < accessible[k+1] <= numWorlds:
+                self.successors[accessible[k]-1] |= 1 << (accessible[k+1]-1)
+
+        leaders = sorted(set(atomLeader)-{0})
+        self.atomLabels = [str(leader) for leader in leaders]
+        leaderBit = dict((leader, 1 << j) for j, leader in enumerate(leaders))
+        atomBitOf = [leaderBit.get(leader, 0) for leader in atomLeader]  # per subformula, the bit of its atom
+        self.worldAtoms = [0]*numWorlds
+        self.subformulaWorlds = {}
+        valuation = self.valuationTable
+        for k in range(0, len(valuation), 2):
+            subformula, world = valuation[k], valuation[k+1]
+            if 0 < world <= numWorlds:
+                self.subformulaWorlds[subformula] = self.subformulaWorlds.get(subformula, 0) | 1 << (world-1)
+                if subformula < len(atomBitOf):
+                    self.worldAtoms[world-1] |= atomBitOf[subformula]
+
+    def atomWorlds(self):
+        '''
+        Returns, for each atom label, the bitset of worlds at which it holds.
+        '''
+        worlds = dict((label, 0) for label in self.atomLabels)
+        for w, atoms in enumerate(self.worldAtoms):
+            for j, label in enumerate(self.atomLabels):
+                if atoms >> j & 1:
+                    worlds[label] |= 1 << w
+        return worlds
+
+    def atomsAt(self, world):
+        return [label for j, label in enumerate(self.atomLabels) if self.worldAtoms[world-1] >> j & 1]
+
+    def accessibleFrom(self, world):
+        successors = self.successors[world-1]
+        return [v+1 for v in range(self.numWorlds) if successors >> v & 1]
+
+    def toDigraph(self):
+        import graphviz as gv  # only needed when a model is actually drawn
+        graph = gv.Digraph(format='svg')
+        graph.graph_attr.update(self.styles['graph'])
+        graph.edge_attr.update(self.styles['edges'])
+        valuedWorlds = 0
+        for worlds in self.subformulaWorlds.values():
+            valuedWorlds |= worlds
+        for world in range(1, self.numWorlds+1):
+            if valuedWorlds >> (world-1) & 1:
+                # label gives us the atoms true at the world, xlabel gives us the world label
+                graph.node(str(world), label=', '.join(self.atomsAt(world)), xlabel='w'+str(world))
+        for world in range(1, self.numWorlds+1):
+            for otherWorld in self.accessibleFrom(world):
+                graph.edge(str(world), str(otherWorld))
+        return graph
     
     def displayKripkeStructure(self, outputFile):
-        dir = os.path.dirname(outputFile+'-Source.txt')
-        if not os.path.exists(dir):
-            os.makedirs(dir)
-        sourceFile = open(outputFile+'-Source.txt', 'w+')
-    
-        for line in self.graph.source:
-            sourceFile.write(line)
-            
-        self.graph.render(filename=outputFile+'-Image', cleanup=True)
+        with spans.span('render', numWorlds=self.numWorlds):
+            graph = self.toDigraph()
+            dir = os.path.dirname(outputFile+'-Source.txt')
+            if not os.path.exists(dir):
+                os.makedirs(dir)
+            with open(outputFile+'-Source.txt', 'w+') as sourceFile:
+                sourceFile.write(graph.source)
+
+            graph.render(filename=outputFile+'-Image', cleanup=True)
             
+class modelRenderer(object):
+    '''
+    Writes DOT sources and runs Graphviz layout in a background worker, so
+    that whoever found a model never waits on dot. Renders are carried out in
+    the order they were submitted; with the default single worker, models
+    written to the same output file cannot interleave, and the last one
+    submitted is the one left on disk.
+    '''
+    def __init__(self, numWorkers=1):
+        self.pool = ThreadPoolExecutor(max_workers=numWorkers)
+        self.pending = []
+
+    def submit(self, KM, outputFile):
+        self.pending.append(self.pool.submit(KM.displayKripkeStructure, outputFile))
+
+    def wait(self):
+        '''
+        Blocks until every submitted model has been drawn, re-raising the
+        first error a render ran into.
+        '''
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
 '''
 Testing
 '''  
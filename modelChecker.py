@@ -0,0 +1,137 @@
+"""
+Created on Oct 18, 2026
+
+Checks that a Kripke structure built from Enfragmo's output really is a
+model of the formula recovered by the verifier.
+"""
+import plac
+from kripkeModelConstructor import kripkeModelConstructor
+
+class modelChecker(object):
+    '''
+    Every subformula is evaluated to the set of worlds at which it holds,
+    stored as an integer bitset with bit k standing for world k+1. Boolean
+    connectives are then single integer operations, and a modal connective is
+    one mask test per world against that world's successor bitset:
+        box A   holds at w  iff  successors(w) & ~[A] == 0
+        dia A   holds at w  iff  successors(w) &  [A] != 0
+
+    Atoms take the valuation shown in the Kripke model: the atom labelled by
+    a SameAtom leader holds at every world where Enfragmo made any member of
+    its equivalence class true.
+    '''
+
+    def __init__(self, KM, verifierObject):
+        '''
+        Receives the KripkeStructure to be checked, along with the verifier
+        object for the instance file it was produced from.
+        '''
+        self.verifierObject = verifierObject
+        self.numWorlds = KM.numWorlds
+        self.allWorlds = (1 << self.numWorlds) - 1
+        self.successors = KM.successors
+        self.claimedWorlds = KM.subformulaWorlds  # subformula -> worlds at which Enfragmo made it true
+        self.atomWorlds = KM.atomWorlds()  # atom label -> worlds at which the atom holds
+
+    def relabelAtoms(self, labelMap):
+        '''
+        For checking the model against a formula other than the one it was
+        found for, whose atoms are labelled differently: labelMap takes the
+        label of each atom in the model to its label in the formula checked.
+        Atoms of that formula missing from the model hold nowhere.
+        '''
+        self.atomWorlds = dict((labelMap[label], worlds) for label, worlds in self.atomWorlds.items() if label in labelMap)
+
+    def checkFormulas(self, verifierObjects):
+        '''
+        Evaluates the formulas of several verifier objects against this one
+        model in a single bottom-up pass, returning the bitset of worlds at
+        which each formula holds. Subformulas are shared by structure, so a
+        subformula common to several formulas is evaluated only once; atoms
+        are matched by their labels.
+        '''
+        memo = {}
+        results = []
+        for verifierObject in verifierObjects:
+            atomLabelOf = verifierObject.atomLabels()
+            keys = {}
+            stack = [(1, False)]
+            while stack:
+                i, operandsDone = stack.pop()
+                operands = verifierObject.subformulaChildren.get(i, ())
+                if not operandsDone:
+                    stack.append((i, True))
+                    stack.extend((operand, False) for operand in operands if operand not in keys)
+                    continue
+                connective = verifierObject.connectiveOf(i)
+                if connective == "atom":
+                    key = ("atom", atomLabelOf[i])
+                else:
+                    key = (connective,)+tuple(keys[operand] for operand in operands)
+                keys[i] = key
+                if key not in memo:
+                    memo[key] = self.evaluate(key, [memo[operandKey] for operandKey in key[1:]] if connective != "atom" else [])
+            results.append(memo[keys[1]])
+        return results
+
+    def evaluate(self, key, operandWorlds):
+        connective = key[0]
+        if connective == "atom":
+            return self.atomWorlds.get(key[1], 0)
+        elif connective == "false":
+            return 0
+        elif connective == "Not":
+            return self.allWorlds & ~operandWorlds[0]
+        elif connective == "And":
+            return operandWorlds[0] & operandWorlds[1]
+        elif connective == "Or":
+            return operandWorlds[0] | operandWorlds[1]
+        elif connective == "Implication":
+            return (self.allWorlds & ~operandWorlds[0]) | operandWorlds[1]
+        elif connective == "Biconditional":
+            return self.allWorlds & ~(operandWorlds[0] ^ operandWorlds[1])
+        elif connective == "Box":
+            falseAt = self.allWorlds & ~operandWorlds[0]
+            return self.worldsWhere(lambda successors: successors & falseAt == 0)
+        elif connective == "Diamond":
+            trueAt = operandWorlds[0]
+            return self.worldsWhere(lambda successors: successors & trueAt != 0)
+        raise ValueError("Unknown connective "+str(connective))
+
+    def worldsWhere(self, predicate):
+        worlds = 0
+        for k, successors in enumerate(self.successors):
+            if predicate(successors):
+                worlds |= 1 << k
+        return worlds
+
+    def worldLabels(self, worlds):
+        return [str(k+1) for k in range(self.numWorlds) if worlds >> k & 1]
+
+    def verifyModel(self):
+        '''
+        The model is accepted if the formula holds at some world, and holds at
+        every world where Enfragmo claims it does. Returns that verdict along
+        with the labels of the worlds at which the formula actually holds.
+        '''
+        formulaWorlds = self.checkFormulas([self.verifierObject])[0]
+        claimed = self.claimedWorlds.get(1, 0)
+        return formulaWorlds != 0 and claimed & ~formulaWorlds == 0, self.worldLabels(formulaWorlds)
+
+'''
+Testing
+'''
+def main(instanceFileDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Instance Files/EnfragTests/FalsumTests/', EnfragmoOutputDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Output/FalsumTests/', instanceFileName='falsumTesterDiaBox.I'):
+    EnfragmoOutputFileName = instanceFileName.split('.')[0]+"Out"
+    thing = kripkeModelConstructor(instanceFileDir+instanceFileName, instanceFileName, EnfragmoOutputDir+EnfragmoOutputFileName+'.txt', EnfragmoOutputFileName, EnfragmoOutputDir+"Kripke Models/")
+
+    if thing.readEnfragmoOutput():
+        thing.parseEnfragmoOutput()
+        thing.parseInstanceFile()
+        isModel, worlds = modelChecker(thing.KM, thing.verifierObject).verifyModel()
+        print("The structure is "+("" if isModel else "NOT ")+"a model of the formula; it holds at worlds "+', '.join(worlds))
+    else:
+        print("The formula described in instance file "+instanceFileName+" was determined to be unsatisfiable by Enfragmo.")
+
+if __name__ == "__main__":
+    plac.call(main)
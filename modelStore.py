@@ -0,0 +1,173 @@
+"""
+Created on Oct 18, 2026
+
+Append-only store of the minimal models found, as a JSONL index and a
+binary file of adjacency and valuation arrays, which can be queried without
+parsing any Enfragmo transcript or DOT source.
+"""
+import os, json, mmap, time, fcntl
+import plac
+from kripkeModelConstructor import KripkeStructure
+from instrumentation import spans
+
+class modelStore(object):
+    '''
+    The store is a directory holding two files:
+        models.jsonl   one JSON object per model: its family and instance,
+                       numWorlds, numEdges, atomLabels, and where its
+                       arrays are (offset, rowBytes, atomBytes), along with
+                       whatever else the caller recorded
+        models.bin     for each model, its adjacency matrix, then its
+                       valuation, each as numWorlds rows of little-endian
+                       bitsets: row w of the adjacency has bit v set when
+                       world v+1 is accessible from world w+1 (rowBytes bytes
+                       a row), and row w of the valuation has bit j set when
+                       atom atomLabels[j] holds at world w+1 (atomBytes a row)
+    The rows are exactly the successors and worldAtoms bitsets of the
+    KripkeStructure, so a model loads back with one slice of the mapped
+    binary file per row, without reading any other model, and batch
+    post-processing may equally map models.bin itself and slice it, e.g.
+    with numpy.frombuffer and unpackbits(bitorder='little').
+
+    Models are only ever appended: the arrays first, then the index line,
+    both under an exclusive lock on the index, so that the worker processes
+    of a batch run can share a store and a reader never finds an index line
+    whose arrays are not all there. A model stored again for the same
+    instance does not replace the older one; queries see the latest.
+    '''
+
+    def __init__(self, storeDir):
+        if not os.path.exists(storeDir):
+            os.makedirs(storeDir)
+        self.indexPath = os.path.join(storeDir, 'models.jsonl')
+        self.dataPath = os.path.join(storeDir, 'models.bin')
+        self.index = []
+        self.indexOffset = 0  # how much of the index file has been read
+        self.mapped = None
+
+    def addModel(self, family, instance, KS, **fields):
+        '''
+        Appends the KripkeStructure KS as the model of the given instance,
+        recording any other keyword fields in its index entry.
+        '''
+        numWorlds = KS.numWorlds
+        rowBytes = (numWorlds+7)//8
+        atomBytes = (len(KS.atomLabels)+7)//8
+        data = b''.join(successors.to_bytes(rowBytes, 'little') for successors in KS.successors)
+        data += b''.join(atoms.to_bytes(atomBytes, 'little') for atoms in KS.worldAtoms)
+        entry = dict(fields, family=family, instance=instance, numWorlds=numWorlds,
+                     numEdges=sum(bin(successors).count('1') for successors in KS.successors),
+                     atomLabels=list(KS.atomLabels), rowBytes=rowBytes, atomBytes=atomBytes, stored=time.time())
+        with spans.span('storeModel', numWorlds=numWorlds):
+            with open(self.indexPath, 'a') as indexFile:
+                fcntl.flock(indexFile, fcntl.LOCK_EX)
+                try:
+                    with open(self.dataPath, 'ab') as dataFile:
+                        entry['offset'] = dataFile.seek(0, os.SEEK_END)
+                        dataFile.write(data)
+                    indexFile.write(json.dumps(entry, sort_keys=True)+'\n')
+                finally:
+                    indexFile.flush()
+                    fcntl.flock(indexFile, fcntl.LOCK_UN)
+        return entry
+
+    def entries(self):
+        '''
+        Every index entry, oldest first, reading only what has been appended
+        to the index since the last call.
+        '''
+        if os.path.exists(self.indexPath):
+            with open(self.indexPath, 'rb') as indexFile:
+                indexFile.seek(self.indexOffset)
+                for line in indexFile:
+                    if not line.endswith(b'\n'):
+                        break  # still being written
+                    self.index.append(json.loads(line.decode()))
+                    self.indexOffset += len(line)
+        return self.index
+
+    def find(self, family=None, instance=None, **fields):
+        '''
+        The latest entry of every instance matching the given family,
+        instance name and any other index fields.
+        '''
+        latest = {}
+        for entry in self.entries():
+            if family is not None and entry['family'] != family:
+                continue
+            if instance is not None and entry['instance'] != instance:
+                continue
+            if any(entry.get(key) != value for key, value in fields.items()):
+                continue
+            latest[(entry['family'], entry['instance'])] = entry
+        return sorted(latest.values(), key=lambda entry: (entry['family'], entry['instance']))
+
+    def data(self, entry):
+        '''
+        A memoryview of the arrays of the model, adjacency rows first, from
+        the binary file mapped into memory.
+        '''
+        end = entry['offset']+entry['numWorlds']*(entry['rowBytes']+entry['atomBytes'])
+        if self.mapped is None or len(self.mapped) < end:
+            with open(self.dataPath, 'rb') as dataFile:
+                self.mapped = mmap.mmap(dataFile.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self.mapped)[entry['offset']:end]
+
+    def rows(self, entry):
+        '''
+        The successors and worldAtoms bitsets of the model.
+        '''
+        data = self.data(entry)
+        numWorlds, rowBytes, atomBytes = entry['numWorlds'], entry['rowBytes'], entry['atomBytes']
+        successors = [int.from_bytes(data[w*rowBytes:(w+1)*rowBytes], 'little') for w in range(numWorlds)]
+        valuationStart = numWorlds*rowBytes
+        worldAtoms = [int.from_bytes(data[valuationStart+w*atomBytes:valuationStart+(w+1)*atomBytes], 'little') for w in range(numWorlds)]
+        return successors, worldAtoms
+
+    def loadModel(self, entry):
+        '''
+        The model as a KripkeStructure, with its worlds, relation and atoms;
+        the truth of the other subformulas is not stored.
+        '''
+        KS = KripkeStructure()
+        KS.numWorlds = entry['numWorlds']
+        KS.atomLabels = list(entry['atomLabels'])
+        KS.successors, KS.worldAtoms = self.rows(entry)
+        return KS
+
+    def minimalWorlds(self, instance, family=None):
+        '''
+        The number of worlds of the latest model stored for the instance, in
+        whichever family unless one is given; None if there is none.
+        '''
+        found = self.find(family, instance)
+        return max(found, key=lambda entry: entry['stored'])['numWorlds'] if found else None
+
+    def edgeCount(self, entry):
+        return entry['numEdges']
+
+    def atomsPerWorld(self, entry):
+        '''
+        The atom labels true at each world of the model, world 1 first.
+        '''
+        successors, worldAtoms = self.rows(entry)
+        return [[label for j, label in enumerate(entry['atomLabels']) if atoms >> j & 1] for atoms in worldAtoms]
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+'''
+Testing
+'''
+def main(storeDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Output/ModelStore/', family=None):
+    store = modelStore(storeDir)
+    print("Family/instance".ljust(40)+"  "+"Worlds".rjust(6)+"  "+"Edges".rjust(6)+"  Atoms per world")
+    for entry in store.find(family):
+        atoms = ' '.join('{'+','.join(labels)+'}' for labels in store.atomsPerWorld(entry))
+        print((entry['family']+'/'+entry['instance']).ljust(40)+"  "+str(entry['numWorlds']).rjust(6)+"  "+str(store.edgeCount(entry)).rjust(6)+"  "+atoms)
+    store.close()
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -0,0 +1,106 @@
+"""
+Created on Oct 18, 2026
+
+Persistent cache of Enfragmo verdicts and models, so that a probe which has
+already been solved never spawns Enfragmo again.
+"""
+import os, sqlite3, json, hashlib, threading, time
+from array import array
+
+# bumped whenever the way models are stored changes, so stale entries miss
+cacheFormat = '2'
+
+class resultCache(object):
+    '''
+    Results are stored in an SQLite database, keyed by a hash of everything
+    that determines Enfragmo's answer: the theory file, the instance file
+    with its TYPE World line left out, the number of worlds, and the size
+    and modification time of the Enfragmo binary itself. For each key the
+    verdict is stored along with the flattened TrueAt and Accessible tuples, so
+    a hit skips both the subprocess and the parse of its output.
+
+    Once the stored models exceed maxBytes, the least recently used entries
+    are evicted. One connection is shared by all threads of a driver; SQLite's
+    own locking takes care of the worker processes of a batch run.
+    '''
+
+    def __init__(self, cacheFilePath, maxBytes=256*2**20):
+        if not os.path.exists(os.path.dirname(cacheFilePath)):
+            os.makedirs(os.path.dirname(cacheFilePath))
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(cacheFilePath, timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('''CREATE TABLE IF NOT EXISTS probes (
+                                        key TEXT PRIMARY KEY,
+                                        satisfiable INTEGER NOT NULL,
+                                        model TEXT,
+                                        size INTEGER NOT NULL,
+                                        lastUsed REAL NOT NULL)''')
+
+    def probeKey(self, solverDigest, theoryDigest, instanceDigest, numWorlds):
+        return hashlib.sha256('\0'.join([cacheFormat, solverDigest, theoryDigest, instanceDigest, str(numWorlds)]).encode()).hexdigest()
+
+    def lookup(self, key):
+        '''
+        Returns (satisfiable, valuation, accessible) for a cached probe, where
+        the tuple tables are flat arrays of ints and empty for an UNSAT probe,
+        or None on a miss.
+        '''
+        with self.lock:
+            row = self.connection.execute('SELECT satisfiable, model FROM probes WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            with self.connection:
+                self.connection.execute('UPDATE probes SET lastUsed = ? WHERE key = ?', (time.time(), key))
+        if row[0]:
+            model = json.loads(row[1])
+            return True, array('i', model['TrueAt']), array('i', model['Accessible'])
+        return False, array('i'), array('i')
+
+    def store(self, key, satisfiable, valuation, accessible):
+        model = json.dumps({'TrueAt': list(valuation), 'Accessible': list(accessible)}) if satisfiable else None
+        size = len(key)+(len(model) if model is not None else 0)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?)', (key, int(satisfiable), model, size, time.time()))
+            self.evict()
+
+    def evict(self):
+        totalSize = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM probes').fetchone()[0]
+        if totalSize <= self.maxBytes:
+            return
+        staleKeys = []
+        for key, size in self.connection.execute('SELECT key, size FROM probes ORDER BY lastUsed'):
+            if totalSize <= self.maxBytes:
+                break
+            staleKeys.append((key,))
+            totalSize -= size
+        self.connection.executemany('DELETE FROM probes WHERE key = ?', staleKeys)
+
+
+def fileDigest(filePath, skipLine=None):
+    '''
+    SHA-256 of a file's non-blank lines, stripped of surrounding whitespace
+    as the rest of the suite reads them, optionally ignoring every line for
+    which skipLine returns True. A file that does not exist hashes to ''.
+    '''
+    if not os.path.exists(filePath):
+        return ''
+    digest = hashlib.sha256()
+    with open(filePath) as f:
+        for line in f:
+            line = line.strip()
+            if line and (skipLine is None or not skipLine(line)):
+                digest.update(line.encode()+b'\n')
+    return digest.hexdigest()
+
+
+def solverDigest(solverPath):
+    '''
+    Identifies the solver binary by its size and modification time, which is
+    enough to notice it being rebuilt without hashing the whole binary.
+    '''
+    if not os.path.exists(solverPath):
+        return ''
+    stat = os.stat(solverPath)
+    return str(stat.st_size)+':'+str(stat.st_mtime_ns)
@@ -5,33 +5,114 @@ Created on Sep 17, 2015
 @contact: wbkboyer@gmail.com
 """
 from collections import defaultdict
-import re
+from array import array
+import os, re
+
+# private instance files for each probe go to tmpfs where there is one
+probeTempDir = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
 
 def findInFile(fileLines, predicate, startIndex=0):
     for i, x in enumerate(fileLines[startIndex:]):
         if predicate(x):
             return startIndex+i
 
+typeRangeRegex = re.compile(r'\[\s*\d+\s*\.\.\s*(\d+)\s*\]')
+
+def parseTypeRange(line):
+    '''
+    Returns the upper end of a TYPE declaration such as
+    "TYPE  Subformula [ 1.. 12]", or None if the line declares no range.
+    '''
+    m = typeRangeRegex.search(line)
+    if m is not None:
+        return int(m.group(1))
+
 def findRegexLine(fileLines, regexToMatch):
     for i, x in enumerate(fileLines):
         if re.search(regexToMatch, x) is not None:
             return i 
 
-def extractTuples(fileLines, relationName):
+# The tokens of Enfragmo's XML output that matter for extracting tuples, in
+# one alternation so that each line is scanned exactly once
+intValueRegex = re.compile(r"<IntValue Name=\s?'(-?\d+)'")
+outputTokenRegex = re.compile(r"<DataSet Name=\s?'(\w+)'(?:\s*TypeSize=\s?'(\d+)')?|<IntValue Name=\s?'(-?\d+)'|(<ARow>)|(</ARow>)|</DataSet>")
+
+class predicateExtractor(object):
+    '''
+    Collects the tuples of several predicates from Enfragmo's output in a
+    single pass, fed one line at a time so that it can sit directly on a
+    pipe. The tuples of each predicate are stored flattened, as one compact
+    array of ints, so tuple k of a predicate with arity a occupies
+    tables[name][k*a:(k+1)*a].
+    '''
+    __slots__ = ('tables', 'arity', 'current', 'currentName', 'rowStart')
+
+    def __init__(self, relationNames):
+        self.tables = dict((name, array('i')) for name in relationNames)
+        self.arity = dict.fromkeys(relationNames)
+        self.current = None  # table of the data set being read, if it is wanted
+        self.currentName = None
+        self.rowStart = 0
+
+    def feedLine(self, line):
+        if self.current is not None and "DataSet" not in line:
+            # the common case: a line of rows inside a wanted data set
+            values = intValueRegex.findall(line)
+            if values:
+                if self.arity[self.currentName] is None:
+                    self.arity[self.currentName] = len(values)
+                self.current.extend(map(int, values))
+            return
+
+        for token in outputTokenRegex.finditer(line):
+            dataSet, typeSize, value, rowStart, rowEnd = token.groups()
+            if value is not None:
+                if self.current is not None:
+                    self.current.append(int(value))
+            elif rowStart is not None:
+                if self.current is not None:
+                    self.rowStart = len(self.current)
+            elif rowEnd is not None:
+                if self.current is not None and self.arity[self.currentName] is None:
+                    self.arity[self.currentName] = len(self.current)-self.rowStart
+            elif dataSet is not None:
+                self.current = self.tables.get(dataSet)
+                self.currentName = dataSet
+                if self.current is not None and typeSize is not None:
+                    self.arity[dataSet] = int(typeSize)
+            else:
+                self.current = None
+
+    def tuples(self, relationName):
+        table, arity = self.tables[relationName], self.arity[relationName]
+        return [tuple(table[k:k+arity]) for k in range(0, len(table), arity)] if arity else []
+
+def extractPredicates(outputLines, relationNames):
+    '''
+    Walks the output once and returns the predicateExtractor holding the
+    tuples of every predicate in relationNames.
+    '''
+    extractor = predicateExtractor(relationNames)
+    for line in outputLines:
+        extractor.feedLine(line)
+    return extractor
+
+def tupleDict(extractor, relationName, keyPosition, valuePosition):
+    '''
+    Regroups the pairs of a binary predicate into a dictionary of string
+    labels, keyed on one argument and listing the other.
+    '''
     opDict = defaultdict(list)
-    toMatch = re.compile(r'''<DataSet Name=\s?'{bla}'''.format(bla=relationName))
-    startIndex = findRegexLine(fileLines, toMatch)
-    endIndex = findInFile(fileLines, lambda x: "</DataSet>" in x, startIndex+1)
-
-    relationLines = fileLines[startIndex+1:endIndex]
-    for line in relationLines:
-        firstElem = line.split('\'/><IntValue Name= \'')[0].strip('<ARow><IntValue Name= \'')
-        secondElem= line.split('\'/><IntValue Name= \'')[1].strip('\'/><True/></ARow>')
-        if relationName is 'TrueAt':
-            opDict[secondElem].append(firstElem)
-        else:
-            opDict[firstElem].append(secondElem)
+    table = extractor.tables[relationName]
+    for k in range(0, len(table), 2):
+        opDict[str(table[k+keyPosition])].append(str(table[k+valuePosition]))
     return opDict
+
+def extractTuples(fileLines, relationName):
+    if relationName == 'TrueAt':
+        return tupleDict(extractPredicates(fileLines, [relationName]), relationName, 1, 0)
+    return tupleDict(extractPredicates(fileLines, [relationName]), relationName, 0, 1)
+
 if __name__ == "__main__":
     fileLines = ["<PredicateInfo>","<PredicateSymbol><BasicInfo Name='TrueAt' IsGiven= '1' ToBePrinted= '0'/><TypeInfoCollection><IntTypeInfo Name='Subformula'/><IntTypeInfo Name='World'/></TypeInfoCollection></PredicateSymbol>","<DataSet Name= 'TrueAt' TypeSize= '2' >","<ARow><IntValue Name= '1'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '1'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '2'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '2'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '3'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '3'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '4'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '4'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '5'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '5'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '6'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '6'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '7'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '7'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '10'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '10'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '11'/><IntValue Name= '1'/><True/></ARow>","<ARow><IntValue Name= '12'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '13'/><IntValue Name= '1'/><True/></ARow>","</DataSet>","</PredicateInfo>","<PredicateInfo>","<PredicateSymbol><BasicInfo Name='Accessible' IsGiven= '1' ToBePrinted= '0'/><TypeInfoCollection><IntTypeInfo Name='World'/><IntTypeInfo Name='World'/></TypeInfoCollection></PredicateSymbol>","<DataSet Name='Accessible' TypeSize= '2' >","<ARow><IntValue Name= '1'/><IntValue Name= '2'/><True/></ARow>","<ARow><IntValue Name= '2'/><IntValue Name= '1'/><True/></ARow>","</DataSet>","</PredicateInfo>"]
     print(extractTuples(fileLines, "TrueAt"))
\ No newline at end of file
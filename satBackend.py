@@ -0,0 +1,614 @@
+"""
+Created on Oct 18, 2026
+
+In-process alternative to Enfragmo: grounds the decision procedure for K to
+CNF once per instance, and answers every world count of the search as an
+incremental SAT call under assumptions.
+"""
+import heapq, plac
+
+try:
+    from pysat.solvers import Solver as librarySolver
+except ImportError:
+    librarySolver = None
+
+
+class cdclSolver(object):
+    '''
+    A conflict-driven clause-learning SAT solver in pure Python, meant to be
+    kept alive across many calls to solve: clauses may be added between
+    calls, each call may fix the values of some literals through
+    assumptions, and the clauses learned in one call are kept for the next,
+    since they follow from the clauses alone.
+
+    Variables are numbered from 1 and literals are given as signed integers,
+    as in DIMACS. Internally literal v is coded as 2v and its negation as
+    2v+1, and the search is the usual one: propagation through two watched
+    literals per clause, first-UIP conflict analysis, VSIDS branching with
+    saved phases, and Luby restarts. Learned clauses are never deleted.
+    '''
+    restartBase = 100
+
+    def __init__(self):
+        self.numVars = 0
+        self.ok = True  # False once the clauses are unsatisfiable whatever the assumptions
+        self.clauses = []
+        self.watches = [[], []]  # literal code -> clauses watching it
+        self.value = [0, 0]  # literal code -> 1 true, -1 false, 0 unassigned
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [1]  # the code offset (0 or 1) a variable was last assigned
+        self.seen = bytearray(1)
+        self.trail = []
+        self.trailLimits = []  # trail length at the start of each decision level
+        self.queueHead = 0
+        self.order = []  # heap of (-activity, variable), possibly stale
+        self.increment = 1.0
+        self.model = None
+        self.numConflicts = 0
+
+    def newVar(self):
+        self.numVars += 1
+        self.watches.extend(([], []))
+        self.value.extend((0, 0))
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(1)
+        self.seen.append(0)
+        heapq.heappush(self.order, (0.0, self.numVars))
+        return self.numVars
+
+    def addClause(self, literals):
+        '''
+        Adds a clause between calls to solve. Literals already false for good
+        are dropped, and a clause already true for good is not kept.
+        '''
+        if not self.ok:
+            return
+        clause = []
+        for literal in literals:
+            code = 2*literal if literal > 0 else 1-2*literal
+            if self.value[code] == 1 or code ^ 1 in clause:
+                return
+            if self.value[code] == 0 and code not in clause:
+                clause.append(code)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watches[clause[0]].append(len(self.clauses))
+            self.watches[clause[1]].append(len(self.clauses))
+            self.clauses.append(clause)
+
+    def assign(self, code, reason):
+        variable = code >> 1
+        self.value[code] = 1
+        self.value[code ^ 1] = -1
+        self.level[variable] = len(self.trailLimits)
+        self.reason[variable] = reason
+        self.trail.append(code)
+
+    def propagate(self):
+        '''
+        Returns the index of a clause found false, or None.
+        '''
+        value, clauses, watches = self.value, self.clauses, self.watches
+        while self.queueHead < len(self.trail):
+            falseCode = self.trail[self.queueHead] ^ 1
+            self.queueHead += 1
+            watching = watches[falseCode]
+            kept = []
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == falseCode:
+                    clause[0], clause[1] = clause[1], falseCode
+                if value[clause[0]] == 1:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    if value[clause[k]] != -1:
+                        clause[1], clause[k] = clause[k], falseCode
+                        watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if value[clause[0]] == -1:
+                        kept.extend(watching[position+1:])
+                        watches[falseCode] = kept
+                        return index
+                    self.assign(clause[0], index)
+            watches[falseCode] = kept
+        return None
+
+    def analyze(self, conflict):
+        '''
+        First-UIP learning: returns the learned clause, its asserting literal
+        first, and the level to jump back to.
+        '''
+        seen, level, reason = self.seen, self.level, self.reason
+        currentLevel = len(self.trailLimits)
+        learned = [None]
+        pending = 0
+        code = None
+        index = len(self.trail)-1
+        clause = self.clauses[conflict]
+        while True:
+            for other in (clause if code is None else clause[1:]):
+                variable = other >> 1
+                if not seen[variable] and level[variable] > 0:
+                    seen[variable] = 1
+                    self.bump(variable)
+                    if level[variable] == currentLevel:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            while not seen[self.trail[index] >> 1]:
+                index -= 1
+            code = self.trail[index]
+            index -= 1
+            seen[code >> 1] = 0
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[reason[code >> 1]]
+        learned[0] = code ^ 1
+        for other in learned[1:]:
+            seen[other >> 1] = 0
+
+        backjumpLevel = 0
+        if len(learned) > 1:
+            highest = max(range(1, len(learned)), key=lambda k: level[learned[k] >> 1])
+            learned[1], learned[highest] = learned[highest], learned[1]
+            backjumpLevel = level[learned[1] >> 1]
+        return learned, backjumpLevel
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            for v in range(1, self.numVars+1):
+                self.activity[v] *= 1e-100
+            self.increment *= 1e-100
+            self.rebuildOrder()
+        elif self.value[2*variable] == 0:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def rebuildOrder(self):
+        self.order = [(-self.activity[v], v) for v in range(1, self.numVars+1) if self.value[2*v] == 0]
+        heapq.heapify(self.order)
+
+    def backtrack(self, toLevel):
+        if len(self.trailLimits) <= toLevel:
+            return
+        start = self.trailLimits[toLevel]
+        for code in self.trail[start:]:
+            variable = code >> 1
+            self.value[code] = self.value[code ^ 1] = 0
+            self.phase[variable] = code & 1
+            self.reason[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trailLimits[toLevel:]
+        self.queueHead = start
+        if len(self.order) > 4*self.numVars+64:
+            self.rebuildOrder()
+
+    def pickBranch(self):
+        while self.order:
+            negatedActivity, variable = heapq.heappop(self.order)
+            if self.value[2*variable] == 0 and -negatedActivity == self.activity[variable]:
+                return 2*variable+self.phase[variable]
+        for variable in range(1, self.numVars+1):  # only stale entries were left
+            if self.value[2*variable] == 0:
+                return 2*variable+self.phase[variable]
+        return None
+
+    def solve(self, assumptions=()):
+        '''
+        Returns True if the clauses and the assumptions (a list of literals)
+        can all be satisfied, leaving the satisfying assignment in model.
+        '''
+        self.model = None
+        if not self.ok:
+            return False
+        assumed = [2*literal if literal > 0 else 1-2*literal for literal in assumptions]
+        restart = 0
+        try:
+            while True:
+                restart += 1
+                status = self.search(assumed, self.restartBase*luby(restart))
+                if status is not None:
+                    return status
+                self.backtrack(0)
+        finally:
+            self.backtrack(0)
+
+    def search(self, assumed, conflictBudget):
+        '''
+        Returns True or False once settled, or None when the budget of
+        conflicts runs out.
+        '''
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.numConflicts += 1
+                conflicts += 1
+                if not self.trailLimits:
+                    self.ok = False
+                    return False
+                learned, backjumpLevel = self.analyze(conflict)
+                self.backtrack(backjumpLevel)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watches[learned[0]].append(len(self.clauses))
+                    self.watches[learned[1]].append(len(self.clauses))
+                    self.clauses.append(learned)
+                    self.assign(learned[0], len(self.clauses)-1)
+                self.increment /= 0.95
+                continue
+
+            if conflicts >= conflictBudget:
+                return None
+            code = None
+            while len(self.trailLimits) < len(assumed):
+                assumption = assumed[len(self.trailLimits)]
+                if self.value[assumption] == -1:
+                    return False
+                self.trailLimits.append(len(self.trail))
+                if self.value[assumption] == 0:
+                    code = assumption
+                    break
+            if code is None:
+                code = self.pickBranch()
+                if code is None:
+                    self.model = [False]+[self.value[2*v] == 1 for v in range(1, self.numVars+1)]
+                    return True
+                self.trailLimits.append(len(self.trail))
+            self.assign(code, None)
+
+    def modelValue(self, variable):
+        return self.model[variable]
+
+
+class pysatSolver(object):
+    '''
+    The same interface over a solver from the PySAT library, when it is
+    installed.
+    '''
+
+    def __init__(self, name='glucose4'):
+        self.solver = librarySolver(name=name)
+        self.numVars = 0
+        self.model = None
+
+    def newVar(self):
+        self.numVars += 1
+        return self.numVars
+
+    def addClause(self, literals):
+        self.solver.add_clause(list(literals))
+
+    def solve(self, assumptions=()):
+        self.model = None
+        if not self.solver.solve(assumptions=list(assumptions)):
+            return False
+        self.model = [False]*(self.numVars+1)
+        for literal in self.solver.get_model():
+            if 0 < literal <= self.numVars:
+                self.model[literal] = True
+        return True
+
+    def modelValue(self, variable):
+        return self.model[variable]
+
+
+def newSolver(useLibrary=True):
+    '''
+    A PySAT solver if the library is there and wanted, the built-in one
+    otherwise.
+    '''
+    if useLibrary and librarySolver is not None:
+        return pysatSolver()
+    return cdclSolver()
+
+
+def luby(i):
+    '''
+    The i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    '''
+    i -= 1
+    size, exponent = 1, 0
+    while size < i+1:
+        exponent += 1
+        size = 2*size+1
+    while size-1 != i:
+        size = (size-1) >> 1
+        exponent -= 1
+        i = i % size
+    return 2**exponent
+
+
+class kGrounding(object):
+    '''
+    The semantics of K over worlds 1..n, written out as clauses over the
+    variables
+        T(s,w)   subformula s is true at world w
+        R(u,v)   world v is accessible from world u
+        E(w)     world w is in use
+    Every world constrains the truth of each subformula by its main
+    connective, as in a Tseitin encoding, with atoms left free and SameAtom
+    occurrences made equal. Boxes and diamonds are split into a universal
+    half, a clause for every pair of worlds,
+        T(box A, u) & R(u,v) -> T(A, v)
+        R(u,v) & T(A, v) -> T(dia A, u)
+    and an existential half, asking for a witness among the worlds:
+        T(dia A, u)  -> W(1) v ... v W(n) v X      W(v) -> R(u,v) & T(A, v)
+        ~T(box A, u) -> W(1) v ... v W(n) v X      W(v) -> R(u,v) & ~T(A, v)
+    The formula is made true at world 1.
+
+    The grounding grows with the search: adding worlds n+1..m adds their
+    variables and clauses, and continues each existential clause through
+    its frontier literal X with
+        X -> W(n+1) v ... v W(m) v X'
+    Worlds are used in order (E(w+1) -> E(w)), and a world out of use has
+    no successors and is no one's successor, so neither constrains the
+    others; nor may a frontier literal hold unless world n+1 is used. A
+    probe of k worlds is then one solve under the assumptions E(k) and
+    ~E(k+1), and the clauses the solver learns along the way remain valid
+    for every later probe. Asking for all k worlds to be in use loses no
+    models, since a model can always be padded with a copy of one of its
+    worlds, and keeps unused worlds, which need not satisfy the conditions
+    on the relation below, out of the models found. World counts up to the largest probed so far
+    need no grounding at all.
+
+    The encoding is that of plain K, and Enfragmo's theory file is not
+    read; but the standard conditions on the relation, as recognised by
+    frameConditions, may be given, and are encoded as cheaply as they allow:
+        equivalence  (S5) R(u,v) is E(v) itself, the relation being
+                     universal on the worlds in use, so there are no R
+                     variables at all
+        symmetric    R(v,u) is the variable R(u,v)
+        reflexive    E(w) -> R(w,w)
+        transitive   R(u,v) & R(v,w) -> R(u,w)
+        euclidean    R(u,v) & R(u,w) -> R(v,w)
+        serial       E(u) -> R(u,1) v ... v R(u,n) v X, continued through
+                     its frontier literal like a witness clause
+    Under S5 a world out of use sees the worlds in use like any other, which
+    constrains nothing, since a world seeing the whole cluster can always be
+    given truth values consistent with it.
+
+    With symmetryBreaking, the worlds are also required to be numbered in
+    breadth-first order from world 1, as by the driver's
+    symmetryBreakingAxioms: for 1 < w1 < w2 and u < w2,
+        R(u,w2) -> R(1,w1) v ... v R(min(u, w1-1), w1)
+    and consecutive worlds with the same least predecessor must have their
+    atoms in lexicographic order (addSiblingClauses). These clauses only
+    involve worlds up to w2, so they too are added as worlds are.
+    '''
+
+    def __init__(self, verifierObject, solver, conditions=frozenset(), symmetryBreaking=False):
+        self.solver = solver
+        self.conditions = conditions
+        self.universal = 'reflexive' in conditions and 'symmetric' in conditions and 'transitive' in conditions
+        self.serial = 'serial' in conditions and 'reflexive' not in conditions
+        self.symmetryBreaking = symmetryBreaking
+        numSubformulas = verifierObject.numTreeNodes
+        self.numSubformulas = numSubformulas
+        self.connectives = [None]+[verifierObject.connectiveOf(s) for s in range(1, numSubformulas+1)]
+        self.operands = [()]+[tuple(verifierObject.subformulaChildren.get(s, ())) for s in range(1, numSubformulas+1)]
+        self.sameAtoms = verifierObject.predicateTuples.get("SameAtom", [])
+        self.modalSubformulas = [s for s in range(1, numSubformulas+1) if self.connectives[s] in ("Box", "Diamond")]
+        self.atomSubformulas = sorted(set(verifierObject.atomLeader[s] for s in range(1, numSubformulas+1) if self.connectives[s] == "atom"))
+        self.numWorlds = 0
+        self.trueAt = [None]  # world -> list of its T variables, indexed by subformula
+        self.access = [None]  # world u -> list of R(u,v) variables, indexed by v
+        self.inUse = [None, solver.newVar()]  # E(w), one beyond the worlds grounded
+        self.frontier = {}  # (modal subformula, world) -> frontier literal of its witness clause
+        self.solver.addClause([self.inUse[1]])
+        self.addWorlds(1)
+        self.solver.addClause([self.trueAt[1][1]])
+
+    def addWorlds(self, numWorlds):
+        solver = self.solver
+        oldNumWorlds = self.numWorlds
+        for w in range(oldNumWorlds+1, numWorlds+1):
+            self.inUse.append(solver.newVar())
+            solver.addClause([-self.inUse[w+1], self.inUse[w]])
+            self.trueAt.append([None]+[solver.newVar() for s in range(self.numSubformulas)])
+            self.addLocalClauses(w)
+            self.addAccessVariables(w)
+            for u, v in [(u, w) for u in range(1, w)]+[(w, v) for v in range(1, w+1)]:
+                if not self.universal:
+                    solver.addClause([-self.access[u][v], self.inUse[u]])
+                    solver.addClause([-self.access[u][v], self.inUse[v]])
+                self.addUniversalClauses(u, v)
+            if 'reflexive' in self.conditions and not self.universal:
+                solver.addClause([-self.inUse[w], self.access[w][w]])
+        self.numWorlds = numWorlds
+        if not self.universal:
+            self.addRelationClauses(oldNumWorlds)
+        if self.symmetryBreaking:
+            self.addOrderingClauses(oldNumWorlds)
+
+        demands = self.modalSubformulas+[0] if self.serial else self.modalSubformulas
+        for u in range(1, numWorlds+1):
+            for s in demands:
+                if u <= oldNumWorlds:
+                    clause = [-self.frontier[(s, u)]]
+                    witnesses = range(oldNumWorlds+1, numWorlds+1)
+                elif s == 0:
+                    clause = [-self.inUse[u]]
+                    witnesses = range(1, numWorlds+1)
+                else:
+                    clause = [-self.trueAt[u][s] if self.connectives[s] == "Diamond" else self.trueAt[u][s]]
+                    witnesses = range(1, numWorlds+1)
+                for v in witnesses:
+                    clause.append(self.addWitness(s, u, v))
+                self.frontier[(s, u)] = solver.newVar()
+                clause.append(self.frontier[(s, u)])
+                solver.addClause(clause)
+                solver.addClause([-self.frontier[(s, u)], self.inUse[numWorlds+1]])
+
+    def addAccessVariables(self, w):
+        '''
+        Makes the literals R(u,w) and R(w,u) for the worlds u up to w.
+        '''
+        solver = self.solver
+        if self.universal:
+            for u in range(1, w):
+                self.access[u].append(self.inUse[w])
+            self.access.append([None]+[self.inUse[v] for v in range(1, w+1)])
+            return
+        for u in range(1, w):
+            self.access[u].append(solver.newVar())
+        if 'symmetric' in self.conditions:
+            self.access.append([None]+[self.access[v][w] for v in range(1, w)]+[solver.newVar()])
+        else:
+            self.access.append([None]+[solver.newVar() for v in range(w)])
+
+    def addRelationClauses(self, oldNumWorlds):
+        '''
+        Adds the transitivity and euclideanness clauses over the triples of
+        worlds with at least one of them beyond oldNumWorlds.
+        '''
+        R = self.access
+        worlds = range(1, self.numWorlds+1)
+        for a in worlds:
+            for b in worlds:
+                for c in worlds:
+                    if max(a, b, c) <= oldNumWorlds:
+                        continue
+                    if 'transitive' in self.conditions:
+                        self.solver.addClause([-R[a][b], -R[b][c], R[a][c]])
+                    if 'euclidean' in self.conditions:
+                        self.solver.addClause([-R[a][b], -R[a][c], R[b][c]])
+
+    def addOrderingClauses(self, oldNumWorlds):
+        '''
+        Adds the breadth-first ordering clauses for the worlds w2 beyond
+        oldNumWorlds.
+        '''
+        R = self.access
+        for w2 in range(max(oldNumWorlds+1, 3), self.numWorlds+1):
+            for w1 in range(2, w2):
+                for u in range(1, w2):
+                    self.solver.addClause([-R[u][w2]]+[R[v][w1] for v in range(1, min(u, w1-1)+1)])
+            self.addSiblingClauses(w2-1, w2)
+
+    def addSiblingClauses(self, w1, w2):
+        '''
+        Orders the atoms true at worlds w1 and w2 = w1+1 lexicographically
+        when both have the same least predecessor p: through the variable L,
+            R(p,w1) & R(p,w2) & ~R(q,w1) & ~R(q,w2) for all q < p  ->  L
+        and L with e(i), the atoms before the i-th being equal at both,
+            L & e(i-1) -> (a(i) at w1 -> a(i) at w2)
+            e(i-1) & (a(i) at w1 <-> a(i) at w2) -> e(i)
+        '''
+        solver, R = self.solver, self.access
+        ordered = solver.newVar()
+        for p in range(1, w1):
+            solver.addClause([-R[p][w1], -R[p][w2]]+[R[q][w] for q in range(1, p) for w in (w1, w2)]+[ordered])
+        equalSoFar = None
+        for a in self.atomSubformulas:
+            x, y = self.trueAt[w1][a], self.trueAt[w2][a]
+            prefix = [-equalSoFar] if equalSoFar is not None else []
+            solver.addClause([-ordered]+prefix+[-x, y])
+            equalSoFar = solver.newVar()
+            solver.addClause(prefix+[-x, -y, equalSoFar])
+            solver.addClause(prefix+[x, y, equalSoFar])
+
+    def addLocalClauses(self, w):
+        solver = self.solver
+        T = self.trueAt[w]
+        for s in range(1, self.numSubformulas+1):
+            connective = self.connectives[s]
+            operands = [T[operand] for operand in self.operands[s]]
+            if connective == "false":
+                solver.addClause([-T[s]])
+            elif connective == "Not":
+                solver.addClause([-T[s], -operands[0]])
+                solver.addClause([T[s], operands[0]])
+            elif connective == "And":
+                solver.addClause([-T[s], operands[0]])
+                solver.addClause([-T[s], operands[1]])
+                solver.addClause([T[s], -operands[0], -operands[1]])
+            elif connective == "Or":
+                solver.addClause([-T[s], operands[0], operands[1]])
+                solver.addClause([T[s], -operands[0]])
+                solver.addClause([T[s], -operands[1]])
+            elif connective == "Implication":
+                solver.addClause([-T[s], -operands[0], operands[1]])
+                solver.addClause([T[s], operands[0]])
+                solver.addClause([T[s], -operands[1]])
+            elif connective == "Biconditional":
+                solver.addClause([-T[s], -operands[0], operands[1]])
+                solver.addClause([-T[s], operands[0], -operands[1]])
+                solver.addClause([T[s], operands[0], operands[1]])
+                solver.addClause([T[s], -operands[0], -operands[1]])
+        for a, b in self.sameAtoms:
+            solver.addClause([-T[a], T[b]])
+            solver.addClause([T[a], -T[b]])
+
+    def addUniversalClauses(self, u, v):
+        R = self.access[u][v]
+        for s in self.modalSubformulas:
+            operand = self.trueAt[v][self.operands[s][0]]
+            if self.connectives[s] == "Box":
+                self.solver.addClause([-self.trueAt[u][s], -R, operand])
+            else:
+                self.solver.addClause([self.trueAt[u][s], -R, -operand])
+
+    def addWitness(self, s, u, v):
+        if s == 0:
+            return self.access[u][v]  # a successor, for seriality
+        witness = self.solver.newVar()
+        operand = self.trueAt[v][self.operands[s][0]]
+        self.solver.addClause([-witness, self.access[u][v]])
+        self.solver.addClause([-witness, operand if self.connectives[s] == "Diamond" else -operand])
+        return witness
+
+    def solve(self, numWorlds):
+        '''
+        Returns whether the formula has a model on numWorlds worlds, along
+        with the TrueAt and Accessible tuples of the model found, flattened
+        as Enfragmo's are read.
+        '''
+        if numWorlds > self.numWorlds:
+            self.addWorlds(numWorlds)
+        if not self.solver.solve([self.inUse[numWorlds], -self.inUse[numWorlds+1]]):
+            return False, [], []
+        value = self.solver.modelValue
+        valuation, accessible = [], []
+        for w in range(1, numWorlds+1):
+            for s in range(1, self.numSubformulas+1):
+                if value(self.trueAt[w][s]):
+                    valuation.extend((s, w))
+            for v in range(1, numWorlds+1):
+                if value(self.access[w][v]):
+                    accessible.extend((w, v))
+        return True, valuation, accessible
+
+'''
+Testing
+'''
+@plac.annotations(
+    builtIn=("use the built-in solver even if PySAT is installed", 'flag', None))
+def main(instanceFilePath='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Instance Files/OtherTests/needs3w.I', maxWorlds=8, builtIn=False):
+    from verifier import verifier
+    thing = verifier(instanceFilePath)
+    thing.readProblemInstanceFile()
+    thing.parseProblemInstanceFile()
+    grounding = kGrounding(thing, newSolver(not builtIn))
+    for numWorlds in range(1, int(maxWorlds)+1):
+        isSatisfiable, valuation, accessible = grounding.solve(numWorlds)
+        print(str(numWorlds)+" worlds: "+("SAT" if isSatisfiable else "UNSAT"))
+        if isSatisfiable:
+            break
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -0,0 +1,241 @@
+"""
+Created on Oct 18, 2026
+
+Sweeps one dimension of the synthetic formulas of formulaGenerator at a
+time, recording how the parser, the world-count search and the model
+construction scale with it.
+"""
+import os, sys, json, math, time, platform
+import plac
+from formulaGenerator import formulaGenerator
+from instanceGenerator import instanceGenerator
+from verifier import verifier
+from driverObj import driverObj
+from benchmarkHarness import compareResults, printComparison
+
+dimensions = ('modalDepth', 'numAtoms', 'size', 'diamondRatio')
+# the phases whose curves are printed, the last three being spans of the driver
+curvePhases = ['generate', 'parse', 'search', 'solver', 'extractTuples', 'buildKripkeStructure', 'setW']
+
+class scalingSweep(object):
+    '''
+    For each value of the swept dimension, the other parameters of
+    formulaGenerator being held fixed, the formulas of repeats seeds are
+    generated and written as instance files, and each is minimized by a
+    driverObj, timing
+        generate  building the formula and the text of its instance file
+        parse     reading and parsing the instance file with the verifier
+        setup     constructing the driver
+        search    the world-count search, including the model construction
+        solver    the part of the search spent in the solver itself
+    along with the wall time of every span the driver records (readInstance,
+    runEnfragmo, extractTuples, buildKripkeStructure, setW, ...), which it is
+    made to append to a JSONL trace read back after each instance. The
+    extractTuples span only appears when the solver's output is parsed, i.e.
+    with the enfragmo backend, whether the real solver or a stand-in.
+
+    The result for each value holds the median of each phase over the
+    seeds, and the minimal world count of each seed, keyed like the results
+    of benchmarkHarness (dimension in place of family, value in place of
+    instance) so that two sweeps compare with its compareResults.
+    '''
+
+    def __init__(self, mainDir, theoryFileDir, theoryFileName, driverArgs, parameters, repeats=3, seed=0, shareSubformulas=True):
+        '''
+        parameters holds the fixed parameters of formulaGenerator, of which
+        the swept one is overridden, and driverArgs the keyword arguments
+        given to every driverObj.
+        '''
+        self.mainDir = mainDir
+        self.theoryFileDir = theoryFileDir
+        self.theoryFileName = theoryFileName
+        self.driverArgs = driverArgs
+        self.parameters = parameters
+        self.repeats = repeats
+        self.seed = seed
+        self.shareSubformulas = shareSubformulas
+        self.traceFilePath = mainDir+'Output/Synthetic/scalingTrace.jsonl'
+        self.traceOffset = 0
+        self.results = {}
+
+    def pointDirs(self, dimension, value):
+        instanceFileDir = self.mainDir+'Instance Files/Synthetic/'+dimension+'/'+str(value)+'/'
+        EnfragmoOutputDir = self.mainDir+'Output/Synthetic/'+dimension+'/'+str(value)+'/'
+        return instanceFileDir, EnfragmoOutputDir
+
+    def runPoint(self, dimension, value):
+        '''
+        Generates and minimizes the formulas of every seed for one value of
+        the dimension, returning the timings of each.
+        '''
+        instanceFileDir, EnfragmoOutputDir = self.pointDirs(dimension, value)
+        if not os.path.exists(instanceFileDir):
+            os.makedirs(instanceFileDir)
+        parameters = dict(self.parameters)
+        parameters[dimension] = value
+        runs = []
+        for seed in range(self.seed, self.seed+self.repeats):
+            instanceFileName = 'synthetic-'+str(seed)+'.I'
+            startTime = time.time()
+            formula = formulaGenerator(seed=seed, **parameters).generate()
+            instance = '\n'.join(instanceGenerator(formula, self.shareSubformulas).instanceLines())+'\n'
+            generateTime = time.time()-startTime
+            with open(instanceFileDir+instanceFileName, 'w') as instanceFile:
+                instanceFile.write(instance)
+
+            startTime = time.time()
+            instanceVerifier = verifier(instanceFileDir+instanceFileName)
+            instanceVerifier.readProblemInstanceFile()
+            instanceVerifier.parseProblemInstanceFile()
+            parseTime = time.time()-startTime
+
+            print("\n\n Sweeping "+dimension+"="+str(value)+", seed "+str(seed)+"\n_______\n")
+            startTime = time.time()
+            driverForFormula = driverObj(mainDir=self.mainDir, theoryFileDir=self.theoryFileDir, theoryFileName=self.theoryFileName, instanceFileDir=instanceFileDir, instanceFileName=instanceFileName, EnfragmoOutputDir=EnfragmoOutputDir, EnfragmoOutputFileName=instanceFileName.split('.')[0]+'Out.txt', optionalConditionsFileName='', startingNumWorlds=1, traceFilePath=self.traceFilePath, **self.driverArgs)
+            setupTime = time.time()-startTime
+            startTime = time.time()
+            minimalWorlds = driverForFormula.runAndMinimizeModel()
+            searchTime = time.time()-startTime
+
+            phases = self.readSpans()
+            phases.update(generate=generateTime, parse=parseTime, setup=setupTime, search=searchTime,
+                          solver=sum(probe[2] for probe in driverForFormula.probeLog))
+            runs.append({'minimalWorlds': minimalWorlds, 'subformulas': instanceVerifier.numTreeNodes, 'probes': len(driverForFormula.probeLog), 'phases': phases})
+        return runs
+
+    def readSpans(self):
+        '''
+        The total wall time of each span appended to the trace since the
+        last call.
+        '''
+        totals = {}
+        if not os.path.exists(self.traceFilePath):
+            return totals
+        with open(self.traceFilePath, 'rb') as traceFile:
+            traceFile.seek(self.traceOffset)
+            for line in traceFile:
+                self.traceOffset += len(line)
+                record = json.loads(line.decode())
+                totals[record['span']] = totals.get(record['span'], 0.0)+record['wall']
+        return totals
+
+    def sweep(self, dimension, values):
+        '''
+        Runs every value of the dimension, smallest first, summarising the
+        runs of each by their medians.
+        '''
+        if dimension not in dimensions:
+            raise ValueError("Cannot sweep "+dimension+"; the dimensions are "+', '.join(dimensions))
+        if os.path.exists(self.traceFilePath):
+            self.traceOffset = os.path.getsize(self.traceFilePath)
+        dimensionResults = self.results.setdefault(dimension, {})
+        for value in sorted(values):
+            runs = self.runPoint(dimension, value)
+            phaseNames = set().union(*(run['phases'] for run in runs))
+            dimensionResults[str(value)] = {
+                'value': value,
+                'minimalWorlds': [run['minimalWorlds'] for run in runs],
+                'subformulas': median([run['subformulas'] for run in runs]),
+                'probes': median([run['probes'] for run in runs]),
+                'phases': dict((phase, median([run['phases'].get(phase, 0.0) for run in runs])) for phase in phaseNames),
+            }
+        return dimensionResults
+
+    def writeResults(self, outputFilePath):
+        if not os.path.exists(os.path.dirname(outputFilePath)):
+            os.makedirs(os.path.dirname(outputFilePath))
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'theory': self.theoryFileName,
+            'driverArgs': dict((key, value) for key, value in self.driverArgs.items() if isinstance(value, (str, int, float, bool))),
+            'parameters': self.parameters,
+            'repeats': self.repeats,
+            'seed': self.seed,
+            'shareSubformulas': self.shareSubformulas,
+            'results': self.results,
+        }
+        with open(outputFilePath, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1, sort_keys=True)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle-1]+values[middle])/2
+
+
+def growthExponent(points):
+    '''
+    The slope of the least-squares line through the (value, time) points on
+    log-log axes, i.e. k where the time grows as value**k; None if fewer
+    than two points have a positive value and time.
+    '''
+    logPoints = [(math.log(value), math.log(seconds)) for value, seconds in points if value > 0 and seconds > 0]
+    if len(logPoints) < 2:
+        return None
+    meanX = sum(x for x, y in logPoints)/len(logPoints)
+    meanY = sum(y for x, y in logPoints)/len(logPoints)
+    spread = sum((x-meanX)**2 for x, y in logPoints)
+    if spread == 0:
+        return None
+    return sum((x-meanX)*(y-meanY) for x, y in logPoints)/spread
+
+
+def printCurves(results):
+    '''
+    Prints, for each swept dimension, the median time of each phase at every
+    value, and the growth exponent of each phase over the sweep.
+    '''
+    for dimension, dimensionResults in sorted(results.items()):
+        points = sorted(dimensionResults.values(), key=lambda point: point['value'])
+        phases = [phase for phase in curvePhases if any(phase in point['phases'] for point in points)]
+        print("\n"+dimension.ljust(12)+"  "+"Subf".rjust(6)+"  "+"Worlds".ljust(12)+''.join("  "+phase[:12].rjust(12) for phase in phases))
+        print('-'*(34+14*len(phases)))
+        for point in points:
+            worlds = ','.join('-' if worlds is None else str(worlds) for worlds in point['minimalWorlds'])
+            print(str(point['value']).ljust(12)+"  "+str(point['subformulas']).rjust(6)+"  "+worlds[:12].ljust(12)+''.join("  "+("%.4f" % point['phases'].get(phase, 0.0)).rjust(12) for phase in phases))
+        print('-'*(34+14*len(phases)))
+        exponents = [growthExponent([(point['value'], point['phases'].get(phase, 0.0)) for point in points]) for phase in phases]
+        print("Growth (log-log slope)".ljust(34)+''.join("  "+('-' if exponent is None else "%.2f" % exponent).rjust(12) for exponent in exponents))
+
+
+'''
+Testing
+'''
+@plac.annotations(
+    dimension=("parameter of the formulas to sweep", 'option', None, str, list(dimensions)),
+    values=("comma-separated values of the swept parameter", 'option', None, str),
+    modalDepth=("modal depth of the formulas, unless swept", 'option', None, int),
+    numAtoms=("number of atoms of the formulas, unless swept", 'option', None, int),
+    size=("number of connectives of the formulas, unless swept", 'option', None, int),
+    diamondRatio=("fraction of the modal connectives which are diamonds, unless swept", 'option', None, float),
+    repeats=("formulas (seeds) per value, of which the median times are kept", 'option', None, int),
+    seed=("seed of the first formula of every value", 'option', None, int),
+    treeInstances=("give every occurrence of a subformula its own number, rather than sharing identical subformulas", 'flag', None),
+    solverPath=("stand-in for the Enfragmo binary, for offline runs", 'option', None, str),
+    searchStrategy=("order in which world counts are probed", 'option', None, str, ['doubling', 'linear', 'galloping', 'costWeighted']),
+    backend=("answer probes by running Enfragmo, or in process by incremental SAT", 'option', None, str, ['enfragmo', 'incremental']),
+    outputFile=("where to write the JSON results, relative to mainDir", 'option', None, str),
+    baselineFile=("JSON results of an earlier sweep to compare against", 'option', None, str),
+    tolerance=("relative slowdown of a phase tolerated before it is flagged", 'option', None, float))
+def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/', theoryFileDir='Single Modality/', theoryFileName='MLDecisionProcK.T', dimension='size', values='10,20,40,80,160', modalDepth=3, numAtoms=4, size=40, diamondRatio=0.5, repeats=3, seed=0, treeInstances=False, solverPath='', searchStrategy='doubling', backend='enfragmo', outputFile='Output/scaling.json', baselineFile='', tolerance=0.2):
+    "Measure how the decision and minimization procedure scales along one dimension of synthetic formulas."
+    driverArgs = dict(solverPath=solverPath, searchStrategy=searchStrategy, backend=backend, cacheFilePath='', renderPolicy='none')
+    parameters = dict(modalDepth=modalDepth, numAtoms=numAtoms, size=size, diamondRatio=diamondRatio)
+    convert = float if dimension == 'diamondRatio' else int
+    sweep = scalingSweep(mainDir, mainDir+'Theory Files/'+theoryFileDir, theoryFileName, driverArgs, parameters, repeats, seed, not treeInstances)
+    sweep.sweep(dimension, [convert(value) for value in values.split(',') if value.strip() != ''])
+    sweep.writeResults(mainDir+outputFile)
+    printCurves(sweep.results)
+
+    if baselineFile != '':
+        with open(mainDir+baselineFile) as f:
+            baseline = json.load(f)['results']
+        flags = compareResults(baseline, sweep.results, tolerance)
+        printComparison(flags)
+        if flags:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    plac.call(main)
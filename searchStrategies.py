@@ -0,0 +1,215 @@
+"""
+Created on Oct 18, 2026
+
+Strategies for searching for the minimal number of worlds, and the model of
+probe costs that the cost-weighted strategy relies on.
+"""
+import os, math
+
+class searchStrategy(object):
+    '''
+    A strategy decides which world counts the driver probes. Every strategy
+    relies on models being monotone in the number of worlds (a model on n
+    worlds can be padded to one on n+1 worlds), and works in two phases: an
+    ascent, probing increasing world counts from the driver's starting point
+    until one has a model, then a refinement of the interval between the
+    largest world count known to have no model and the smallest known to
+    have one. The ascent doubles the number of worlds and the refinement
+    bisects, the floor of the midpoint being probed so that the search closes
+    in on the minimum from above; subclasses choose another step of the
+    ascent by overriding nextAscent, or another split point of the
+    refinement by overriding splitPoint.
+
+    Probes go through driverObj.makeModel, so the result cache, contraction
+    of the models found and the probe log all apply whatever the strategy.
+    '''
+    name = None
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.lastProbe = None
+
+    def probe(self, numWorlds):
+        isUnSAT = self.driver.makeModel(numWorlds)
+        self.lastProbe = (numWorlds, isUnSAT)
+        return isUnSAT
+
+    def nextAscent(self, numWorlds, firstProbe):
+        '''
+        The world count to probe after numWorlds had no model, firstProbe
+        being the world count the ascent started from.
+        '''
+        return 2*numWorlds
+
+    def splitPoint(self, lowerBound, upperBound):
+        '''
+        The world count to probe within the gap, lowerBound <= point < upperBound.
+        '''
+        return int((upperBound + lowerBound) / 2)
+
+    def search(self):
+        '''
+        Returns the minimal number of worlds, having the driver draw its model,
+        or None if there is no model within the driver's upper bound.
+        '''
+        numWorlds = self.driver.startingNumWorlds
+        lowerBound = max(self.driver.minWorlds, int(numWorlds/2))
+        while numWorlds <= self.driver.maxWorlds:
+            if not self.probe(numWorlds):
+                return self.refine(lowerBound, self.driver.contractedBound(lowerBound, numWorlds))
+            lowerBound = numWorlds+1
+            numWorlds = self.driver.cappedStep(numWorlds, self.nextAscent(numWorlds, self.driver.startingNumWorlds))
+
+        print("\nThe formula failed to have a satisfying model with at most "+str(self.driver.maxWorlds)+" worlds.\n")
+        return None
+
+    def refine(self, lowerBound, upperBound):
+        '''
+        upperBound is known to have a model; every world count below lowerBound
+        is known not to.
+        '''
+        self.driver.EnfragmoOutputFileName = self.driver.EnfragmoOutputFileName.split('.')[0]+'-minimal.txt'
+        while lowerBound < upperBound:
+            point = self.splitPoint(lowerBound, upperBound)
+            if self.probe(point):
+                lowerBound = point+1
+            else:
+                upperBound = self.driver.contractedBound(lowerBound, point)
+
+        # the model found last is overwritten by later probes, so rerun the minimum unless it was the last probe
+        if self.lastProbe == (upperBound, False):
+            lastModel = self.driver.lastModel
+            if self.driver.keepTranscript and not self.driver.probeLog[-1][3] and os.path.exists(lastModel.EnfragmoOutputFilepath):
+                os.replace(lastModel.EnfragmoOutputFilepath, self.driver.EnfragmoOutputDir+self.driver.EnfragmoOutputFileName)
+            self.driver.EnfragmoOutputToKripkeStructure(lastModel, final=True)
+        else:
+            self.driver.makeModel(upperBound, final=True)
+        return upperBound
+
+
+class doublingBisection(searchStrategy):
+    '''
+    The original procedure: double the number of worlds until a model turns
+    up, then bisect the last gap, just as the base class does.
+    '''
+    name = 'doubling'
+
+
+class linearAscent(searchStrategy):
+    '''
+    Probes every world count upwards from the lower bound, so the first
+    model found is the minimal one and no probe ever lands above the minimum.
+    Best when the lower bound is close to the minimum, or when probes with
+    no model are cheap.
+    '''
+    name = 'linear'
+
+    def nextAscent(self, numWorlds, firstProbe):
+        return numWorlds+1
+
+    def splitPoint(self, lowerBound, upperBound):
+        return lowerBound
+
+
+class galloping(doublingBisection):
+    '''
+    Exponential search from the lower bound: the gap above the starting
+    point doubles with every probe (s, s+1, s+3, s+7, ...), then the last gap
+    is bisected. Takes O(log m) probes, m being the distance of the minimum
+    from the starting point rather than its size.
+    '''
+    name = 'galloping'
+
+    def nextAscent(self, numWorlds, firstProbe):
+        return 2*numWorlds-firstProbe+1
+
+
+class costWeighted(doublingBisection):
+    '''
+    Doubles like the original procedure, but splits the last gap where the
+    expected cost of the rest of the search is least, rather than at its
+    midpoint. The costs come from a probeCostModel fitted to the probes run
+    so far; since probes without a model usually cost more than probes with
+    one, the split point is skewed towards the upper end of the gap, where
+    a probe is more likely to find a model.
+    '''
+    name = 'costWeighted'
+    maxCandidates = 256
+
+    def __init__(self, driver):
+        doublingBisection.__init__(self, driver)
+        self.costModel = probeCostModel(driver.probeLog)
+
+    def splitPoint(self, lowerBound, upperBound):
+        '''
+        With the minimum taken to be equally likely to be any of lowerBound,
+        ..., upperBound, a probe at m finds no model with probability
+        (upperBound-m)/(upperBound-lowerBound+1); the remaining search of
+        either half is estimated as a bisection of it.
+        '''
+        self.costModel.fit()
+        width = upperBound-lowerBound+1
+        step = max(1, (width-1) // self.maxCandidates)
+        best = None
+        for point in range(lowerBound, upperBound, step):
+            pUnSAT = (upperBound-point) / width
+            cost = self.costModel.expectedCost(point, pUnSAT) \
+                + pUnSAT*self.bisectionCost(point+1, upperBound) \
+                + (1-pUnSAT)*self.bisectionCost(lowerBound, point)
+            if best is None or cost < best[0]:
+                best = (cost, point)
+        return best[1]
+
+    def bisectionCost(self, lowerBound, upperBound):
+        if lowerBound >= upperBound:
+            return 0
+        return math.log2(upperBound-lowerBound+1)*self.costModel.expectedCost(int((lowerBound+upperBound)/2), 0.5)
+
+
+class probeCostModel(object):
+    '''
+    Predicts the solver time of a probe from the probes recorded so far,
+    separately for probes which found a model and probes which did not, by
+    fitting t = a*n^k to each through least squares on a log-log scale. An
+    outcome with fewer than two distinct world counts recorded falls back
+    on a default exponent, scaled to whatever times there are.
+    '''
+    defaultExponent = {True: 1.0, False: 2.0}  # keyed by whether a model was found
+
+    def __init__(self, probeLog):
+        '''
+        Receives the driver's probe log, a list of (worlds, satisfiable,
+        seconds, cached) records which keeps growing as probes are run.
+        '''
+        self.probeLog = probeLog
+        self.coefficients = {}
+
+    def fit(self):
+        for satisfiable in (True, False):
+            points = [(math.log(n), math.log(seconds)) for n, sat, seconds, cached in self.probeLog if sat == satisfiable and not cached and seconds > 0 and n > 0]
+            exponent = self.defaultExponent[satisfiable]
+            if len(set(x for x, y in points)) >= 2:
+                meanX = sum(x for x, y in points) / len(points)
+                meanY = sum(y for x, y in points) / len(points)
+                exponent = sum((x-meanX)*(y-meanY) for x, y in points) / sum((x-meanX)**2 for x, y in points)
+                self.coefficients[satisfiable] = (meanY-exponent*meanX, exponent)
+            elif points:
+                self.coefficients[satisfiable] = (sum(y-exponent*x for x, y in points) / len(points), exponent)
+            else:
+                self.coefficients.pop(satisfiable, None)
+
+    def predict(self, numWorlds, satisfiable):
+        if satisfiable in self.coefficients:
+            logScale, exponent = self.coefficients[satisfiable]
+        elif (not satisfiable) in self.coefficients:
+            # nothing recorded for this outcome; assume the other outcome's scale
+            logScale, exponent = self.coefficients[not satisfiable][0], self.defaultExponent[satisfiable]
+        else:
+            logScale, exponent = 0.0, self.defaultExponent[satisfiable]
+        return math.exp(logScale)*numWorlds**exponent
+
+    def expectedCost(self, numWorlds, pUnSAT):
+        return pUnSAT*self.predict(numWorlds, False) + (1-pUnSAT)*self.predict(numWorlds, True)
+
+
+strategies = dict((strategy.name, strategy) for strategy in (doublingBisection, linearAscent, galloping, costWeighted))
@@ -0,0 +1,184 @@
+"""
+Created on Oct 18, 2026
+
+Array-backed syntax tree of a formula, built by the verifier from the
+subformulas of an instance file.
+"""
+from array import array
+
+# connective codes, in the order of connectiveNames
+ATOM, FALSE, NOT, BOX, DIAMOND, AND, OR, IMPLICATION, BICONDITIONAL = range(9)
+connectiveNames = ['atom', 'false', 'Not', 'Box', 'Diamond', 'And', 'Or', 'Implication', 'Biconditional']
+connectiveCodes = dict((name, code) for code, name in enumerate(connectiveNames))
+connectiveSymbols = [None, 'false', '~', 'box', 'dia', '&', 'v', '->', '<->']
+
+class syntaxTree(object):
+    '''
+    Node i of the tree is subformula i of the instance file, node 1 being
+    the formula itself, and is described by the i-th entry of four parallel
+    arrays:
+        connective   the code of its main connective (ATOM, FALSE, NOT, ...)
+        parent       the subformula it is an operand of (0 for the root)
+        left         its first operand (0 for none)
+        right        its second operand (0 for none)
+    The label of each atom, the leader of its SameAtom class, is kept in
+    atomLabel. Entry 0 of every array is unused, 0 standing for no node.
+
+    An instance file whose subformulas are shared describes a DAG rather
+    than a tree: a shared subformula is then the left or right operand of
+    several nodes, and its parent is one of them. Preorder and postorder
+    visit every node once either way, so every query runs in time linear in
+    the number of subformulas; only the infix rendering spells out shared
+    subformulas at each of their occurrences. No traversal recurses, so deep
+    formulas are no problem.
+    '''
+
+    def __init__(self, numNodes):
+        self.numNodes = numNodes
+        self.connective = array('b', [0])*(numNodes+1)
+        self.parent = array('l', [0])*(numNodes+1)
+        self.left = array('l', [0])*(numNodes+1)
+        self.right = array('l', [0])*(numNodes+1)
+        self.atomLabel = {}
+        self.postorderNodes = None
+
+    def setNode(self, i, connective, operands=(), atomLabel=None):
+        '''
+        Records subformula i, with its connective given by name.
+        '''
+        self.connective[i] = connectiveCodes[connective]
+        if atomLabel is not None:
+            self.atomLabel[i] = atomLabel
+        if len(operands) > 0:
+            self.left[i] = operands[0]
+            if self.parent[operands[0]] == 0:
+                self.parent[operands[0]] = i
+        if len(operands) > 1:
+            self.right[i] = operands[1]
+            if self.parent[operands[1]] == 0:
+                self.parent[operands[1]] = i
+        self.postorderNodes = None
+
+    def operands(self, i):
+        if self.right[i]:
+            return (self.left[i], self.right[i])
+        if self.left[i]:
+            return (self.left[i],)
+        return ()
+
+    def preorder(self, root=1):
+        '''
+        The nodes below root, each before its operands, every node once.
+        '''
+        nodes = []
+        seen = bytearray(self.numNodes+1)
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            if seen[i]:
+                continue
+            seen[i] = 1
+            nodes.append(i)
+            if self.right[i]:
+                stack.append(self.right[i])
+            if self.left[i]:
+                stack.append(self.left[i])
+        return nodes
+
+    def postorder(self, root=1):
+        '''
+        The nodes below root, each after its operands, every node once.
+        '''
+        if root == 1 and self.postorderNodes is not None:
+            return self.postorderNodes
+        nodes = []
+        seen = bytearray(self.numNodes+1)
+        stack = [(root, False)]
+        while stack:
+            i, operandsDone = stack.pop()
+            if operandsDone:
+                nodes.append(i)
+                continue
+            if seen[i]:
+                continue
+            seen[i] = 1
+            stack.append((i, True))
+            if self.right[i] and not seen[self.right[i]]:
+                stack.append((self.right[i], False))
+            if self.left[i] and not seen[self.left[i]]:
+                stack.append((self.left[i], False))
+        if root == 1:
+            self.postorderNodes = nodes
+        return nodes
+
+    def infix(self, root=1):
+        '''
+        The formula in infix notation, bracketed as verifier.myShowTree
+        always printed it, as one string:
+            ( A & B )    box ( A )    atom label    false
+        '''
+        tokens = []
+        stack = [root]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                tokens.append(item)
+                continue
+            connective = self.connective[item]
+            if connective == ATOM:
+                tokens.append(self.atomLabel[item])
+            elif connective == FALSE:
+                tokens.append('false')
+            elif self.right[item]:
+                stack.extend((')', self.right[item], connectiveSymbols[connective], self.left[item], '('))
+            else:
+                stack.extend((')', self.left[item], '(', connectiveSymbols[connective]))
+        return ' '.join(tokens)
+
+    def modalDepth(self):
+        '''
+        The greatest number of boxes and diamonds nested inside one another.
+        '''
+        depth = array('l', [0])*(self.numNodes+1)
+        for i in self.postorder():
+            operandDepth = max([depth[operand] for operand in self.operands(i)] or [0])
+            depth[i] = operandDepth+1 if self.connective[i] in (BOX, DIAMOND) else operandDepth
+        return depth[1]
+
+    def height(self):
+        '''
+        The number of connectives on the longest path from the formula to
+        one of its atoms.
+        '''
+        height = array('l', [0])*(self.numNodes+1)
+        for i in self.postorder():
+            operands = self.operands(i)
+            height[i] = 1+max(height[operand] for operand in operands) if operands else 0
+        return height[1]
+
+    def size(self):
+        '''
+        The number of occurrences of subformulas in the formula, i.e. the
+        number of nodes the tree would have were no subformula shared. It
+        can be exponential in the number of subformulas, Python integers
+        taking care of that.
+        '''
+        size = [0]*(self.numNodes+1)
+        for i in self.postorder():
+            size[i] = 1+sum(size[operand] for operand in self.operands(i))
+        return size[1]
+
+    def connectiveCounts(self):
+        '''
+        The number of distinct subformulas with each main connective.
+        '''
+        counts = dict((name, 0) for name in connectiveNames)
+        for i in self.postorder():
+            counts[connectiveNames[self.connective[i]]] += 1
+        return counts
+
+    def numAtoms(self):
+        '''
+        The number of distinct atoms of the formula.
+        '''
+        return len(set(self.atomLabel[i] for i in self.postorder() if self.connective[i] == ATOM))
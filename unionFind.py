@@ -0,0 +1,49 @@
+"""
+Created on Oct 18, 2026
+
+Union-find over the integer ids of subformulas, used to group the
+occurrences of each atom through the SameAtom tuples of an instance file.
+"""
+from array import array
+
+class unionFind(object):
+    '''
+    Disjoint sets over the ids 0..size-1, every id starting out in a set of
+    its own. Sets are merged by rank and finding the root of an id halves
+    the path to it, so a sequence of m operations takes O(m a(m)) time, a
+    being the inverse Ackermann function. The leader of a set is its
+    smallest id, whichever id happens to be the root of its tree, so that
+    the leaders do not depend on the order of the unions.
+    '''
+
+    def __init__(self, size):
+        self.parent = array('l', range(size))
+        self.rank = bytearray(size)
+        self.smallest = array('l', range(size))  # at each root, the smallest id of its set
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return
+        if self.rank[i] < self.rank[j]:
+            i, j = j, i
+        self.parent[j] = i
+        if self.rank[i] == self.rank[j]:
+            self.rank[i] += 1
+        self.smallest[i] = min(self.smallest[i], self.smallest[j])
+
+    def leader(self, i):
+        return self.smallest[self.find(i)]
+
+    def leaders(self):
+        '''
+        Returns the array giving the leader of every id, in one pass.
+        '''
+        return array('l', (self.smallest[self.find(i)] for i in range(len(self.parent))))
@@ -4,12 +4,11 @@ Created on Jan. 12, 2015
 @author: Wanda B. Boyer
 @contact: wbkboyer@gmail.com
 """
-from treelib import Tree, Node
-
 import re, plac
-from union_find import unionfind
- 
-from reuseableCode import findInFile
+from unionFind import unionFind
+from reuseableCode import parseTypeRange
+from syntaxTree import syntaxTree
+from instrumentation import spans
  
 class verifier(object):
     '''
@@ -70,29 +69,117 @@ class verifier(object):
         Receives the name of the instance file to be verified, then uses this
         to initialize the corresponding tree structure 
         '''
-        self.SameAtomList = unionfind.UnionFind()
+        self.SameAtomList = None
+        self.atomLeader = None
+        self.atomLabelOf = None
 
         self.filename = filename      
         
-    def readProblemInstanceFile(self):
+    def readProblemInstanceFile(self, instanceFileLines=None):
         '''
         This method assumes that the instance file exists and is correctly
-        formatted.
+        formatted. A caller already holding the stripped, non-empty lines of
+        the file in memory may pass them in instead.
         
         Subformulas are labeled in pre-order DFS traversal fashion, so as to
         allow the numbering to reflect the operator/operand relationship.
         '''
-        self.instanceFileLines = [line.strip() for line in open(self.filename) if line != '\n']
+        if instanceFileLines is not None:
+            self.instanceFileLines = instanceFileLines
+        else:
+            self.instanceFileLines = [line.strip() for line in open(self.filename) if line != '\n']
     
     def parseProblemInstanceFile(self):
+        with spans.span('verifier.index'):
+            self.indexProblemInstanceFile()
         self.countNumTreeNodes()
         #self.countNumTreeLeaves()
         #self.countNumAtoms()
-        self.setUpSameAtomList()
-        self.buildTree()
+        with spans.span('verifier.SameAtom'):
+            self.setUpSameAtomList()
+        with spans.span('verifier.buildTree'):
+            self.buildTree()
+
+    def indexProblemInstanceFile(self):
+        '''
+        Single pass over the instance file which tabulates everything the
+        syntax tree is built from, so that no subformula ever needs another
+        scan of the file:
+            predicateTuples      predicate name -> tuples listed under it
+            singletonKind        subformula -> 'false' or 'atom', for
+                                 subformulas appearing as a singleton
+            mainConnective       subformula -> predicate of the first tuple
+                                 having it as first argument
+            operandParent        subformula -> main connective's subformula
+                                 of the tuple having it as an operand
+            subformulaChildren   subformula -> its operands
+            subformulaParents    subformula -> every subformula having it
+                                 as an operand, in file order
+        
+        Instances written by the instanceGenerator share structurally
+        identical subformulas, so a subformula may be an operand of several
+        others; subformulaChildren and subformulaParents then describe a DAG,
+        while operandParent picks one parent for each subformula.
+
+        Where a subformula occurs more than once, the occurrence that the
+        original line-by-line lookups would have found wins: the first one in
+        the file, with an operand in the middle of a triple taking precedence
+        over one at the end of a tuple. Since the original lookups walked back
+        through every PREDICATE header above a singleton, a singleton below a
+        Falsum header anywhere above it is a falsum.
+        '''
+        self.predicateTuples = {}
+        self.singletonKind = {}
+        self.mainConnective = {}
+        self.subformulaChildren = {}
+        self.operandParent = {}
+        self.subformulaParents = {}
+        lastOperandParent = {}
+        predicate = None
+        falsumSeen = False
+
+        for line in self.instanceFileLines:
+            if line.startswith("("):
+                subformulas = tuple(int(label) for label in line.strip("()").split(","))
+                self.predicateTuples[predicate].append(subformulas)
+                first = subformulas[0]
+                if len(subformulas) == 1:
+                    self.singletonKind.setdefault(first, "false" if falsumSeen else "atom")
+                    continue
+                if first not in self.mainConnective:
+                    self.mainConnective[first] = predicate
+                    if predicate != "SameAtom":
+                        self.subformulaChildren[first] = subformulas[1:]
+                        for operand in subformulas[1:]:
+                            self.subformulaParents.setdefault(operand, []).append(first)
+                for operand in subformulas[1:-1]:
+                    self.operandParent.setdefault(operand, first)
+                lastOperandParent.setdefault(subformulas[-1], first)
+            elif line.split(" ")[0] == "PREDICATE":
+                predicate = line.split(" ")[1]
+                self.predicateTuples.setdefault(predicate, [])
+                if predicate == "Falsum":
+                    falsumSeen = True
+
+        for operand, parent in lastOperandParent.items():
+            self.operandParent.setdefault(operand, parent)
+        self.isShared = any(len(parents) > 1 for parents in self.subformulaParents.values())
 
     def numWorlds(self):
-        return int(self.instanceFileLines[1][-2])
+        for line in self.instanceFileLines:
+            if "TYPE World" in line:
+                return parseTypeRange(line)
+
+    def connectiveOf(self, i):
+        '''
+        The predicate naming the main connective of subformula i, with every
+        atom (SameAtom or not) reported as "atom" and falsum as "false".
+        '''
+        if i in self.singletonKind:
+            return self.singletonKind[i]
+        if self.mainConnective.get(i) == "SameAtom":
+            return "atom"
+        return self.mainConnective.get(i)
 
     def countNumTreeNodes(self):
         '''
@@ -105,25 +192,19 @@ class verifier(object):
         
     def countNumTreeLeaves(self):
         '''
-        The number of tree leaves is simply the number of singletons that 
-        satisfy Atom, including duplicates.
+        The number of tree leaves is simply the number of subformulas that 
+        satisfy Atom, including duplicates. Needs the syntax tree.
         '''
-        self.numTreeLeaves = \
-            int((self.instanceFileLines.index("PREDICATE SameAtom") - 1)- \
-             self.instanceFileLines.index("PREDICATE Atom"))
+        self.numTreeLeaves = self.syntaxTree.connectiveCounts()['atom']
+        return self.numTreeLeaves
     
     def countNumAtoms(self):
         '''
-        Since multiple subformulas can refer to the same atom, need to subtract
-        the count of pairs satisfying SameAtom from the total count of
-        subformulas satisfying Atom. This can be done by counting the number of
-        entries between each of the appropriate PREDICATE identifiers (given a 
-        well-formed instance file).
+        Since multiple subformulas can refer to the same atom, the atoms are
+        counted by their labels, i.e. by the equivalence classes of SameAtom.
+        Needs the syntax tree.
         '''
-        self.numAtoms = int((self.instanceFileLines.index("PREDICATE And")- \
-                            (self.instanceFileLines.index("PREDICATE Atom")+1) - \
-                           (len(self.instanceFileLines) - \
-                           (self.instanceFileLines.index("PREDICATE SameAtom")+1))))
+        self.numAtoms = self.syntaxTree.numAtoms()
         return self.numAtoms        
       
     def assignSymbol(self, label):
@@ -143,28 +224,35 @@ class verifier(object):
             return "dia"
     
     def assignAtom(self, i):
-        for atomEquivClass in self.SameAtomList.get_sets():
-            if str(i) in atomEquivClass:
-                return self.SameAtomList.get_leader(str(i))
+        return str(self.atomLeader[i])
             
-        self.SameAtomList.insert(str(i))
-        return self.SameAtomList.get_leader(str(i))
+    def atomLabels(self):
+        '''
+        Returns a dictionary giving, for every subformula which is an atom, the
+        label of that atom, i.e. the leader of its SameAtom equivalence class.
+        It is worked out once, after the tree has been built.
+        '''
+        if self.atomLabelOf is None:
+            self.atomLabelOf = dict((i, str(leader)) for i, leader in enumerate(self.atomLeader) if leader)
+        return self.atomLabelOf
             
     def setUpSameAtomList(self):
         '''
         Using the Union Find datastructure, I will keep track of the equivalence
         classes of SameAtoms and then supply a label based on the index of the
         subset in which a subformula corresponding with an atom is contained.
-        '''
-        
-        startIndexSameAtoms = findInFile(self.instanceFileLines, lambda x: "PREDICATE SameAtom" in x) + 1
-        sameAtomPairs = self.instanceFileLines[startIndexSameAtoms:]
         
-        for pair in sameAtomPairs:
-            tmp = pair.split(",")
-            label1 = tmp[0].split("(")[1]
-            label2 = tmp[1].split(")")[0]
-            self.SameAtomList.insert(label1, label2)
+        The label is the smallest subformula of the class, and is worked out
+        for every subformula at once: atomLeader[i] is the label of subformula
+        i if it is an atom, and 0 otherwise.
+        '''
+        self.SameAtomList = unionFind(self.numTreeNodes+1)
+        for label1, label2 in self.predicateTuples.get("SameAtom", []):
+            self.SameAtomList.union(label1, label2)
+        self.atomLeader = self.SameAtomList.leaders()
+        for i in range(self.numTreeNodes+1):
+            if self.singletonKind.get(i) != "atom" and self.mainConnective.get(i) != "SameAtom":
+                self.atomLeader[i] = 0
             
     def determineConnective(self, i):
         '''
@@ -174,73 +262,45 @@ class verifier(object):
         (i.e. negation, box, or diamond) or binary (i.e. conjunction or 
         disjunction) subformula.
         '''
-        SiThing=findInFile(self.instanceFileLines, lambda x: "("+str(i)+")" in x)
-        if SiThing:
-            for k in range(SiThing, 0, -1): # go back in the file until you can find out what predicate we're dealing with
-                if self.instanceFileLines[k].split(" ")[0] == "PREDICATE":
-                    if self.instanceFileLines[k].split(" ")[1] == "Falsum":
-                        return "false"
+        if i in self.singletonKind:
+            if self.singletonKind[i] == "false":
+                return "false"
             return self.assignAtom(i)
-        if findInFile(self.instanceFileLines, lambda x: "("+str(i)+"," in x):
-            SiAsMainConnective = findInFile(self.instanceFileLines, lambda x: "("+str(i)+"," in x)
-            for j in range(SiAsMainConnective, 0, -1): # go back in the file until you can find out what predicate we're dealing with
-                if self.instanceFileLines[j].split(" ")[0] == "PREDICATE":
-                    if self.instanceFileLines[j].split(" ")[1] == "SameAtom": # if there are no tuples under SameAtom, then this isn't reached due to SiAsMainConnective
-                        return self.assignAtom(i)
-                    else:
-                        return self.assignSymbol(self.instanceFileLines[j].split(" ")[1]) # if the predicate refers to an operator, then we need to find out which one!
-    
-    def nodeCreation(self, predicate, SiConnective, i):        
-        SiAsOperand = findInFile(self.instanceFileLines, predicate)
-        ParentOfSi = str(self.instanceFileLines[SiAsOperand].split(",")[0].split("(")[1])
-        self.syntaxTree.create_node(SiConnective, str(i), parent=ParentOfSi)        
+        if i in self.mainConnective:
+            if self.mainConnective[i] == "SameAtom": # if there are no tuples under SameAtom, then this isn't reached
+                return self.assignAtom(i)
+            else:
+                return self.assignSymbol(self.mainConnective[i]) # if the predicate refers to an operator, then we need to find out which one!
         
-    def makeSyntaxTreeNode(self, SiConnective, i):  
-        if findInFile(self.instanceFileLines, lambda x: ","+str(i)+"," in x): #find where subformula i appears as second operand, and 
-            self.nodeCreation(lambda x: ","+str(i)+"," in x, SiConnective, i)
-        elif findInFile(self.instanceFileLines, lambda x: ","+str(i)+")" in x):                   
-            self.nodeCreation(lambda x: ","+str(i)+")" in x, SiConnective, i) 
-        else:
-            self.syntaxTree.create_node(SiConnective,str(i))
-                
     def buildTree(self):
         '''
         To build the syntax tree for the formula as laid out in the instance
         file, we need to delve into the formula by means of stripping off the
         main connective of each subformula (starting with the main connective
-        of the formula itself) and labeling a tree node with the symbol
-        corresponding with that connective. Note that each subformula appears
-        exactly once as the first argument of a tuple, and can appear at most
-        once as a second (or third, for binary operators) argument in a tuple.             
+        of the formula itself) and recording it, along with the operands, in
+        the node of the syntax tree for that subformula. Note that each
+        subformula appears exactly once as the first argument of a tuple, and,
+        unless subformulas are shared, at most once as a second (or third, for
+        binary operators) argument in a tuple.
+        
+        All lookups go through the tables built by indexProblemInstanceFile,
+        so the tree is built in time linear in the size of the file. Where
+        subformulas are shared, the syntax tree shares them too.
         '''
-        self.syntaxTree = Tree()
+        self.syntaxTree = syntaxTree(self.numTreeNodes)
         for i in range(1, self.numTreeNodes+1):
-            SiConnective = self.determineConnective(i)
-            self.makeSyntaxTreeNode(SiConnective, i)
+            connective = self.connectiveOf(i)
+            if connective is None:
+                raise ValueError("Subformula "+str(i)+" of "+self.filename+" has no main connective.")
+            atomLabel = self.determineConnective(i) if connective == "atom" else None
+            self.syntaxTree.setNode(i, connective, self.subformulaChildren.get(i, ()), atomLabel)
           
-    def myShowTree(self, tree, root):
+    def myShowTree(self):
         '''
-        In-order depth-first traversal of syntax tree using deep recursion; first
-        layer of recursion receives root of tree, where each sub-layer receives
-        respectively the left child then the right child as roots of those subtrees
-        with visitation of the root node occurring in the middle.
+        Prints the formula in infix notation, every binary subformula and the
+        operand of every unary one in brackets.
         '''
-        rootNID = root.identifier
-        x=self.syntaxTree.children(rootNID)
-        
-        if len(self.syntaxTree.children(rootNID)) == 2:
-            print("(", end=" ")
-            self.myShowTree(self.syntaxTree, self.syntaxTree.children(rootNID)[0])
-            
-        print(self.syntaxTree.get_node(rootNID).tag, end=" ")
-        
-        if len(self.syntaxTree.children(rootNID)) >= 1:
-            if len(self.syntaxTree.children(rootNID)) == 1:
-                print("(", end=" ")
-                self.myShowTree(self.syntaxTree, self.syntaxTree.children(rootNID)[0])
-            else:
-                self.myShowTree(self.syntaxTree, self.syntaxTree.children(rootNID)[1])
-            print(")", end=" ")   
+        print(self.syntaxTree.infix())
                  
 '''
 Testing
@@ -257,7 +317,7 @@ def main(mainDir='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/'):
     thing = verifier(mainDir + "Instance Files/OtherTests/needsNonTransitiveModel.I")
     thing.readProblemInstanceFile()
     thing.parseProblemInstanceFile()
-    thing.myShowTree(thing.syntaxTree, thing.syntaxTree.get_node(thing.syntaxTree.root))
+    thing.myShowTree()
                     
 if __name__ == "__main__":
     plac.call(main)
\ No newline at end of file
@@ -0,0 +1,279 @@
+"""
+Created on Oct 18, 2026
+
+Estimates, from the syntax of the formula alone, how few and how many worlds
+its smallest model may have.
+"""
+import os, tempfile
+import plac
+from verifier import verifier
+from instanceGenerator import formulaToInstance
+
+class worldBounds(object):
+    '''
+    Both bounds are read off the subformulas recorded by the verifier, each
+    occurrence taken with its polarity (whether it sits under an even or odd
+    number of negations, counting the antecedent of an implication as
+    negated and both sides of a biconditional as both) and its modal level
+    (the number of boxes and diamonds above it). A diamond in positive
+    polarity, or a box in negative polarity, demands a successor world; these
+    are the existential subformulas.
+
+    Upper bound: a satisfiable formula of K has a tree model of height at most
+    its modal depth, in which each world at level l needs at most one
+    successor per existential subformula at level l. With b_l such
+    subformulas the tree has at most
+        1 + b_0 + b_0*b_1 + ... + b_0*...*b_(d-1)
+    worlds. This holds for K, i.e. when no conditions are placed on the
+    accessibility relation; upperBound gives the bounds of some other
+    frame classes too.
+
+    Lower bound: the existential subformulas which must hold at the root of
+    any model, because only conjunctions lead to them from the formula,
+    each need a successor. Where the bodies of two of them obviously
+    contradict each other (one forces an atom the other forbids, or one is
+    the negation of the other) they need different successors, so any set of
+    pairwise contradictory demands needs that many distinct worlds. This
+    holds whatever the accessibility relation.
+    '''
+
+    def __init__(self, verifierObject):
+        '''
+        Receives a verifier object whose instance file has been parsed.
+        '''
+        self.verifierObject = verifierObject
+        self.keys = {}
+
+    def children(self, i, polarity):
+        '''
+        The operands of subformula i, each with the polarities it occurs in
+        when i occurs with the given polarity.
+        '''
+        connective = self.verifierObject.connectiveOf(i)
+        operands = self.verifierObject.subformulaChildren.get(i, ())
+        if connective == "Not":
+            return [(operands[0], (not polarity,))]
+        if connective == "Implication":
+            return [(operands[0], (not polarity,)), (operands[1], (polarity,))]
+        if connective == "Biconditional":
+            return [(operand, (True, False)) for operand in operands]
+        return [(operand, (polarity,)) for operand in operands]
+
+    def existentialByLevel(self):
+        '''
+        Returns the list giving, for each modal level, the number of
+        existential subformulas at that level. A subformula shared between
+        several levels counts at each of them.
+        '''
+        counts = []
+        seen = set()
+        stack = [(1, True, 0)]
+        while stack:
+            i, polarity, level = stack.pop()
+            if (i, polarity, level) in seen:
+                continue
+            seen.add((i, polarity, level))
+            connective = self.verifierObject.connectiveOf(i)
+            if connective in ("Box", "Diamond"):
+                if (connective == "Diamond") == polarity:
+                    while len(counts) <= level:
+                        counts.append(0)
+                    counts[level] += 1
+                level += 1
+            for operand, polarities in self.children(i, polarity):
+                stack.extend((operand, operandPolarity, level) for operandPolarity in polarities)
+        return counts
+
+    def existentialSubformulas(self):
+        '''
+        Returns the number of distinct existential subformula occurrences,
+        each subformula counted once per polarity it is existential in,
+        whatever its modal levels.
+        '''
+        existentials = set()
+        seen = set()
+        stack = [(1, True)]
+        while stack:
+            i, polarity = stack.pop()
+            if (i, polarity) in seen:
+                continue
+            seen.add((i, polarity))
+            connective = self.verifierObject.connectiveOf(i)
+            if connective in ("Box", "Diamond") and (connective == "Diamond") == polarity:
+                existentials.add((i, polarity))
+            for operand, polarities in self.children(i, polarity):
+                stack.extend((operand, operandPolarity) for operandPolarity in polarities)
+        return len(existentials)
+
+    def upperBound(self, conditions=frozenset()):
+        '''
+        The upper bound for the frames satisfying the given conditions on the
+        relation, closed as by frameConditions.closeConditions; None where no
+        bound is known.
+
+        On reflexive frames (KT) a box also holds its body at the world
+        itself, so an existential subformula under boxes may need its witness
+        at any level above its own: each world at level l needs at most one
+        successor per existential subformula at level l or deeper, and
+        tree models made reflexive still have height at most the modal
+        depth. Serial frames (KD) need a successor at every level up to the
+        modal depth even without existential subformulas there, and the
+        worlds at the modal depth see themselves.
+
+        Where the relation is transitive and euclidean (K45, KD45, KB5, S5),
+        all the successors of the root form a cluster C in which each world
+        sees all of C, and so does the root. A model then keeps its truth
+        on the root and one witness from C per existential subformula, so
+        the bound is their number plus one; on serial frames that are not
+        reflexive, the root cannot be its own successor, so at least one
+        witness is kept.
+        '''
+        if 'transitive' in conditions and 'euclidean' in conditions:
+            witnesses = self.existentialSubformulas()
+            if 'serial' in conditions and 'reflexive' not in conditions:
+                witnesses = max(witnesses, 1)
+            return witnesses+1
+        if not conditions <= frozenset(['reflexive', 'serial']):
+            return None
+        counts = self.existentialByLevel()
+        if 'reflexive' in conditions:
+            counts = [sum(counts[level:]) for level in range(len(counts))]
+        elif 'serial' in conditions:
+            counts = [max(existentials, 1) for existentials in counts]
+            counts.extend([1]*(self.verifierObject.syntaxTree.modalDepth()-len(counts)))
+        bound, width = 1, 1
+        for existentials in counts:
+            width *= existentials
+            bound += width
+        return bound
+
+    def conjuncts(self, i, polarity, visit):
+        '''
+        Calls visit(j, polarity) on every subformula occurrence j which must
+        hold, in that polarity, wherever subformula i holds in the given
+        polarity: the walk passes through positive conjunctions, negative
+        disjunctions and implications, and negations.
+        '''
+        stack = [(i, polarity)]
+        while stack:
+            i, polarity = stack.pop()
+            visit(i, polarity)
+            connective = self.verifierObject.connectiveOf(i)
+            if connective == "Not" or (connective == "And" and polarity) or (connective in ("Or", "Implication") and not polarity):
+                for operand, polarities in self.children(i, polarity):
+                    stack.append((operand, polarities[0]))
+
+    def rootDemands(self):
+        '''
+        The (body, polarity) pairs for which a successor of the root of any
+        model must make body hold in that polarity.
+        '''
+        demands = []
+        def visit(i, polarity):
+            connective = self.verifierObject.connectiveOf(i)
+            if connective in ("Box", "Diamond") and (connective == "Diamond") == polarity:
+                demands.append((self.verifierObject.subformulaChildren[i][0], polarity))
+        self.conjuncts(1, True, visit)
+        return demands
+
+    def structuralKey(self, i):
+        '''
+        A key equal for subformulas with the same structure, atoms being
+        identified through their SameAtom labels.
+        '''
+        if i not in self.keys:
+            stack = [(i, False)]
+            while stack:
+                j, operandsDone = stack.pop()
+                operands = self.verifierObject.subformulaChildren.get(j, ())
+                if not operandsDone:
+                    stack.append((j, True))
+                    stack.extend((operand, False) for operand in operands if operand not in self.keys)
+                    continue
+                connective = self.verifierObject.connectiveOf(j)
+                if connective == "atom":
+                    self.keys[j] = ("atom", self.verifierObject.atomLabels()[j])
+                else:
+                    self.keys[j] = (connective,)+tuple(self.keys[operand] for operand in operands)
+        return self.keys[i]
+
+    def literals(self, i, polarity):
+        '''
+        The formulas, other than negations, that are forced to hold (True) or
+        fail (False) wherever subformula i holds in the given polarity.
+        '''
+        forced = set()
+        def visit(j, jPolarity):
+            if self.verifierObject.connectiveOf(j) != "Not":
+                forced.add((self.structuralKey(j), jPolarity))
+        self.conjuncts(i, polarity, visit)
+        return forced
+
+    def lowerBound(self):
+        '''
+        Size of a set of pairwise contradictory root demands, chosen greedily
+        starting from the demands contradicting the most others.
+        '''
+        demands = [self.literals(body, polarity) for body, polarity in self.rootDemands()]
+        conflicts = [set() for demand in demands]
+        for a in range(len(demands)):
+            for b in range(a+1, len(demands)):
+                if any((key, not polarity) in demands[b] for key, polarity in demands[a]):
+                    conflicts[a].add(b)
+                    conflicts[b].add(a)
+
+        clique = []
+        for a in sorted(range(len(demands)), key=lambda a: len(conflicts[a]), reverse=True):
+            if all(b in conflicts[a] for b in clique):
+                clique.append(a)
+        return max(1, len(clique))
+
+'''
+Testing
+'''
+# formulas whose smallest models are known, with the conditions they were
+# minimized under, which the upper bound must never fall short of
+regressionCases = [
+    ('box dia p1 & ~p1', frozenset(['reflexive', 'serial']), 2),
+    ('(box box dia (p2 & true)) & ~(box true -> p2)', frozenset(['reflexive', 'serial']), 2),
+    ('dia p1 & dia ~p1', frozenset(), 2),
+    ('dia p1 & dia ~p1', frozenset(['reflexive', 'serial']), 2),
+]
+
+def checkRegressions():
+    '''
+    Checks the upper bound of every regression case against its known
+    minimum, returning the cases it falls short on.
+    '''
+    failures = []
+    for formula, conditions, minimalWorlds in regressionCases:
+        with tempfile.NamedTemporaryFile('w', suffix='.I', delete=False) as instanceFile:
+            instanceFile.write(formulaToInstance(formula))
+        try:
+            thing = verifier(instanceFile.name)
+            thing.readProblemInstanceFile()
+            thing.parseProblemInstanceFile()
+            bound = worldBounds(thing).upperBound(conditions)
+        finally:
+            os.remove(instanceFile.name)
+        if bound is not None and bound < minimalWorlds:
+            failures.append((formula, conditions, minimalWorlds, bound))
+    return failures
+
+@plac.annotations(
+    regressions=("check the upper bounds of the formulas with known smallest models instead", 'flag', None))
+def main(instanceFilePath='/home/wbkboyer/GitHub/MSS-SupplementaryFiles/Instance Files/OtherTests/needs3w.I', regressions=False):
+    if regressions:
+        failures = checkRegressions()
+        for formula, conditions, minimalWorlds, bound in failures:
+            print("Upper bound "+str(bound)+" below the "+str(minimalWorlds)+" worlds needed by "+formula+" under "+(', '.join(sorted(conditions)) or 'no conditions'))
+        print(str(len(regressionCases)-len(failures))+" of "+str(len(regressionCases))+" regression cases bounded correctly.")
+        return
+    thing = verifier(instanceFilePath)
+    thing.readProblemInstanceFile()
+    thing.parseProblemInstanceFile()
+    bounds = worldBounds(thing)
+    print("The smallest model of the formula has between "+str(bounds.lowerBound())+" and "+str(bounds.upperBound())+" worlds (the latter in K).")
+
+if __name__ == "__main__":
+    plac.call(main)